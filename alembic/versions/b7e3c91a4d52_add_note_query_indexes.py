@@ -0,0 +1,64 @@
+"""add note query indexes
+
+Revision ID: b7e3c91a4d52
+Revises: 1066ed34f4e9
+Create Date: 2026-10-18 10:12:31.408215
+
+The indexes are built with CREATE INDEX CONCURRENTLY so the migration can run
+against a live database. That cannot happen inside a transaction, hence the
+autocommit block. If a concurrent build fails it leaves an INVALID index
+behind; drop it before running the upgrade again.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b7e3c91a4d52"
+down_revision: Union[str, None] = "1066ed34f4e9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_notes_user_id_created_at_id",
+            "notes",
+            ["user_id", "created_at", "id"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_notes_expiry",
+            "notes",
+            ["expiry"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_note_label_association_label_id_note_id",
+            "note_label_association",
+            ["label_id", "note_id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_note_label_association_label_id_note_id",
+            table_name="note_label_association",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_notes_expiry",
+            table_name="notes",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_notes_user_id_created_at_id",
+            table_name="notes",
+            postgresql_concurrently=True,
+        )
@@ -1,34 +1,38 @@
 from fastapi import Depends, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from auth.services import decode_token
-from db.database import get_db
+from auth.identity import Identity
+from auth.services import resolve_identity
+from db.database import get_async_db
 from db.redis import token_in_blocklist
+from db.replicas import pin_sticky_reads
 from exceptions.auth import (AccessTokenRequired, InvalidToken,
                              RefreshTokenRequired)
-from queries.user_queries import UserQueries
 
 
 class TokenBearer(HTTPBearer):
     def __init__(self, auto_error=True):
         super().__init__(auto_error=auto_error)
 
-    async def __call__(self, request: Request) -> HTTPAuthorizationCredentials | None:
+    async def __call__(
+        self, request: Request, db: AsyncSession = Depends(get_async_db)
+    ) -> HTTPAuthorizationCredentials | None:
         creds = await super().__call__(request)
 
         token = creds.credentials
 
-        token_data = decode_token(token)
-
-        if token_data is None:
-            raise InvalidToken(message="Invalid token. Please login again.")
+        identity = await resolve_identity(token, db)
+        token_data = identity.token_data
 
         if await token_in_blocklist(token_data["jti"]):
             raise InvalidToken(message="Token is invalid. Please login again.")
 
         self.verify_token_data(token_data)
 
+        request.state.identity = identity
+        await pin_sticky_reads(db, identity.user_id)
+
         return token_data
 
     def verify_token_data(self, token_data):
@@ -47,12 +51,18 @@ class RefreshTokenBearer(TokenBearer):
             raise RefreshTokenRequired(message="Refresh Token required.")
 
 
-async def get_current_user(
-    token_details: dict = Depends(AccessTokenBearer()),
-    db: Session = Depends(get_db),
-):
-    username = token_details["user"]["username"]
+def get_identity(request: Request) -> Identity:
+    return request.state.identity
 
-    user = UserQueries.get_user_by_username(db, username)
 
-    return user
+async def get_access_identity(
+    request: Request, token_details: dict = Depends(AccessTokenBearer())
+) -> Identity:
+    return get_identity(request)
+
+
+async def get_current_user(
+    identity: Identity = Depends(get_access_identity),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await identity.load_user(db)
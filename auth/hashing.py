@@ -0,0 +1,106 @@
+import asyncio
+import time
+from concurrent.futures import (Executor, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
+
+from auth.authentication import Auth
+from config.config_loader import api_settings
+from exceptions.service import ServiceBusy
+
+EXECUTORS = {"thread": ThreadPoolExecutor, "process": ProcessPoolExecutor}
+
+
+class PasswordHasher:
+    """Runs bcrypt off the event loop on a bounded thread or process pool.
+
+    At most ``max_workers`` hashes run at once and at most ``max_queue`` more
+    wait for a worker; anything beyond that is rejected with ``ServiceBusy``
+    instead of piling up behind the pool.
+    """
+
+    def __init__(
+        self, executor: str = "thread", max_workers: int = 4, max_queue: int = 64
+    ):
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown password hasher executor: {executor}")
+
+        self.executor_kind = executor
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Executor | None = None
+        self._pending = 0
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "peak_pending": 0,
+            "total_seconds": 0.0,
+            "max_seconds": 0.0,
+        }
+
+    def _get_executor(self) -> Executor:
+        # Created on first use so that forked workers never inherit a pool.
+        if self._executor is None:
+            self._executor = EXECUTORS[self.executor_kind](
+                max_workers=self.max_workers
+            )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_workers + self.max_queue:
+            self._stats["rejected"] += 1
+            raise ServiceBusy(
+                detail="Too many authentication requests. Please try again shortly."
+            )
+
+        self._pending += 1
+        self._stats["submitted"] += 1
+        self._stats["peak_pending"] = max(self._stats["peak_pending"], self._pending)
+        started = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), fn, *args
+            )
+        except Exception:
+            self._stats["failed"] += 1
+            raise
+        finally:
+            self._pending -= 1
+            elapsed = time.perf_counter() - started
+            self._stats["total_seconds"] += elapsed
+            self._stats["max_seconds"] = max(self._stats["max_seconds"], elapsed)
+
+        self._stats["completed"] += 1
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(Auth.hash_password, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(Auth.check_password, password, hashed_password)
+
+    def stats(self) -> dict:
+        finished = self._stats["completed"] + self._stats["failed"]
+        return {
+            "executor": self.executor_kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "in_flight": min(self._pending, self.max_workers),
+            "queued": max(self._pending - self.max_workers, 0),
+            **self._stats,
+            "avg_seconds": self._stats["total_seconds"] / finished if finished else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    executor=api_settings.PASSWORD_HASHER_EXECUTOR,
+    max_workers=api_settings.PASSWORD_HASHER_MAX_WORKERS,
+    max_queue=api_settings.PASSWORD_HASHER_MAX_QUEUE,
+)
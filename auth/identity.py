@@ -0,0 +1,34 @@
+import uuid
+from dataclasses import dataclass
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from exceptions.auth import InvalidToken
+from models.user import User
+
+
+@dataclass
+class Identity:
+    """The authenticated caller, resolved once per request by ``TokenBearer``."""
+
+    user_id: uuid.UUID
+    username: str
+    token_data: dict
+    user: User | None = None
+
+    @classmethod
+    def from_token(cls, token_data: dict) -> "Identity":
+        return cls(
+            user_id=uuid.UUID(token_data["user"]["user_id"]),
+            username=token_data["user"]["username"],
+            token_data=token_data,
+        )
+
+    async def load_user(self, db: AsyncSession) -> User:
+        # resolve_identity already holds the user when it had to load the
+        # signing key, so a request costs at most one user query.
+        if self.user is None:
+            self.user = await db.get(User, self.user_id)
+        if self.user is None:
+            raise InvalidToken(message="Invalid token. Please login again.")
+        return self.user
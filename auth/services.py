@@ -2,9 +2,11 @@ import uuid
 from datetime import datetime, timedelta
 
 import jwt
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from auth.identity import Identity
+from auth.token_cache import token_cache
 from config.config_loader import api_settings
-from db.database import get_db
 from exceptions.auth import InvalidToken
 from models.user import User
 
@@ -32,19 +34,32 @@ def create_access_token(
     return access_token
 
 
-def decode_token(token):
+async def resolve_identity(token, db: AsyncSession) -> Identity:
     token_data = jwt.decode(
         token, algorithms=[ALGORITHM], options={"verify_signature": False}
     )
-    db = next(get_db())
-    user = db.query(User).filter(User.id == token_data["user"]["user_id"]).first()
-    db.close()
+    cached = token_cache.get_claims(token, token_data)
+    if cached is not None:
+        return Identity.from_token(cached)
 
-    if user is None:
-        raise InvalidToken(message="Invalid token")
+    user = None
+    user_id = token_data["user"]["user_id"]
+    secret_key = token_cache.get_secret(user_id)
+    if secret_key is None:
+        user = await db.get(User, uuid.UUID(user_id))
+
+        if user is None:
+            raise InvalidToken(message="Invalid token")
 
-    verified_token_data = jwt.decode(token, key=user.secret_key, algorithms=[ALGORITHM])
-    if verified_token_data["user"]["user_id"] != token_data["user"]["user_id"]:
+        secret_key = user.secret_key
+        token_cache.set_secret(user_id, secret_key)
+
+    verified_token_data = jwt.decode(token, key=secret_key, algorithms=[ALGORITHM])
+    if verified_token_data["user"]["user_id"] != user_id:
         raise InvalidToken(message="Invalid token")
 
-    return verified_token_data
+    token_cache.set_claims(token, secret_key, verified_token_data)
+
+    identity = Identity.from_token(verified_token_data)
+    identity.user = user
+    return identity
@@ -0,0 +1,60 @@
+import time
+
+from config.config_loader import api_settings
+from utils.ttl_cache import TTLCache
+
+
+class TokenCache:
+    """Per-process cache of verified token claims and user signing keys.
+
+    Claims are keyed by ``jti`` and remember the signing key they were
+    verified with, so dropping a user's key (rotation, deletion) also
+    invalidates every cached token of that user.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._claims = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._secrets = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get_secret(self, user_id: str) -> str | None:
+        return self._secrets.get(user_id)
+
+    def set_secret(self, user_id: str, secret_key: str) -> None:
+        self._secrets.set(user_id, secret_key)
+
+    def get_claims(self, token: str, token_data: dict) -> dict | None:
+        entry = self._claims.get(token_data["jti"])
+        if entry is None:
+            return None
+
+        cached_token, secret_key, claims = entry
+        if cached_token != token:
+            return None
+        if self._secrets.get(claims["user"]["user_id"]) != secret_key:
+            self._claims.pop(token_data["jti"])
+            return None
+        return claims
+
+    def set_claims(self, token: str, secret_key: str, claims: dict) -> None:
+        self._claims.set(
+            claims["jti"], (token, secret_key, claims), ttl=claims["exp"] - time.time()
+        )
+
+    def invalidate_token(self, jti: str) -> None:
+        self._claims.pop(jti)
+
+    def invalidate_user(self, user_id: str | None) -> None:
+        """Drop the user's signing key, or every user's with ``None``."""
+        if user_id is None:
+            self._secrets.clear()
+        else:
+            self._secrets.pop(str(user_id))
+
+    def stats(self) -> dict:
+        return {"claims": self._claims.stats(), "secrets": self._secrets.stats()}
+
+
+token_cache = TokenCache(
+    maxsize=api_settings.TOKEN_CACHE_MAX_SIZE,
+    ttl=api_settings.TOKEN_CACHE_TTL_SECONDS,
+)
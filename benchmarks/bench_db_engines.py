@@ -0,0 +1,215 @@
+"""Requests/sec for ``GET /notes`` and ``POST /notes`` on the sync and async engines.
+
+Runs in-process against the configured Postgres database:
+
+    python -m benchmarks.bench_db_engines --requests 2000 --concurrency 32
+
+Both apps serve the same two endpoints from ``async def`` handlers; the sync
+one runs the same statements on a blocking ``Session`` (the way every route
+worked before the async engine), the async one goes through
+``AsyncNoteQueries`` on an ``AsyncSession``. Auth and Redis are left out so
+only the database path is compared.
+
+Each engine gets its own pool of ``--concurrency`` connections. A smaller
+sync pool deadlocks: a blocked checkout holds the event loop, so the
+requests that would return their connections never finish.
+
+The bench user gets ``--notes`` notes up front. Both GET phases read that
+same list, alternating ``--repeat`` times with the best rate kept, before
+either POST phase adds a note. The bench user and its notes are removed
+afterwards.
+"""
+
+import argparse
+import asyncio
+import secrets
+import time
+import uuid
+from types import SimpleNamespace
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import (AsyncSession, async_sessionmaker,
+                                    create_async_engine)
+from sqlalchemy.orm import Session, sessionmaker
+
+from config.config_loader import db_settings
+from db.database import sessionLocal
+from models.label import Label
+from models.note import Note
+from models.user import User
+from queries.note_queries import (AsyncNoteQueries, clean_label_names,
+                                  collect_labels, load_labels, upsert_labels)
+from schema.note_schema import NoteCreate, NoteRead
+
+
+# Blocking versions of the two AsyncNoteQueries calls compared here. No route
+# uses a sync Session any more, so they live with the benchmark. The bench
+# label exists before anything is timed, so the upsert never races.
+def get_user_notes_sync(db: Session, user) -> list[Note]:
+    query = (
+        select(Note)
+        .where(Note.user_id == user.id)
+        .order_by(Note.created_at.desc(), Note.id.desc())
+        .options(load_labels("selectin"))
+    )
+    return list(db.scalars(query).unique())
+
+
+def create_note_sync(db: Session, user, note_data: NoteCreate) -> Note:
+    names = clean_label_names(note_data.labels)
+    rows = db.execute(upsert_labels(names)).all() if names else []
+    note = Note(
+        title=note_data.title,
+        content=note_data.content,
+        user_id=user.id,
+        labels=collect_labels(db, rows, names),
+    )
+    db.add(note)
+    db.commit()
+    db.refresh(note, ["created_at"])
+    return note
+
+
+def build_sync_app(user, session_factory) -> FastAPI:
+    app = FastAPI()
+
+    def get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @app.get("/notes")
+    async def list_notes(db: Session = Depends(get_db)):
+        return [NoteRead.model_validate(n) for n in get_user_notes_sync(db, user)]
+
+    @app.post("/notes")
+    async def create_note(note_data: NoteCreate, db: Session = Depends(get_db)):
+        return NoteRead.model_validate(create_note_sync(db, user, note_data))
+
+    return app
+
+
+def build_async_app(user, session_factory) -> FastAPI:
+    app = FastAPI()
+
+    async def get_db():
+        async with session_factory() as db:
+            yield db
+
+    @app.get("/notes")
+    async def list_notes(db: AsyncSession = Depends(get_db)):
+        notes = await AsyncNoteQueries.get_user_notes(db, user.id)
+        return [NoteRead.model_validate(n) for n in notes]
+
+    @app.post("/notes")
+    async def create_note(note_data: NoteCreate, db: AsyncSession = Depends(get_db)):
+        note = await AsyncNoteQueries.create_note(db, user, note_data)
+        return NoteRead.model_validate(note)
+
+    return app
+
+
+async def drive(app: FastAPI, method: str, total: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    gate = asyncio.Semaphore(concurrency)
+    body = {"title": "bench", "content": "bench note", "labels": ["bench"]}
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def one():
+            async with gate:
+                if method == "GET":
+                    response = await client.get("/notes")
+                else:
+                    response = await client.post("/notes", json=body)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        return total / (time.perf_counter() - started)
+
+
+def create_bench_user(notes: int) -> SimpleNamespace:
+    with sessionLocal() as db:
+        label = db.query(Label).filter_by(name="bench").first() or Label(name="bench")
+        user = User(
+            username=f"bench_{uuid.uuid4().hex[:8]}",
+            email=f"bench_{uuid.uuid4().hex[:8]}@example.com",
+            first_name="Bench",
+            last_name="User",
+            password_hash="-",
+            secret_key=secrets.token_urlsafe(64),
+            is_verified=True,
+        )
+        db.add(user)
+        db.flush()
+        db.add_all(
+            Note(
+                title=f"bench {i}",
+                content="bench note",
+                user_id=user.id,
+                labels=[label],
+            )
+            for i in range(notes)
+        )
+        db.commit()
+        return SimpleNamespace(id=user.id)
+
+
+def drop_bench_user(user) -> None:
+    with sessionLocal() as db:
+        db.delete(db.get(User, user.id))
+        db.commit()
+
+
+async def main(args):
+    pool = {"pool_size": args.concurrency, "max_overflow": 0}
+    sync_engine = create_engine(str(db_settings.SQLALCHEMY_DATABASE_URI), **pool)
+    async_engine = create_async_engine(
+        str(db_settings.ASYNC_SQLALCHEMY_DATABASE_URI), **pool
+    )
+    user = create_bench_user(args.notes)
+    try:
+        apps = {
+            "sync": build_sync_app(user, sessionmaker(bind=sync_engine)),
+            "async": build_async_app(
+                user, async_sessionmaker(bind=async_engine, expire_on_commit=False)
+            ),
+        }
+        # Opens every pooled connection before anything is timed.
+        for app in apps.values():
+            await drive(app, "GET", args.concurrency, args.concurrency)
+
+        rates = {}
+        for _ in range(args.repeat):
+            for name, app in apps.items():
+                rate = await drive(app, "GET", args.requests, args.concurrency)
+                rates[name, "GET"] = max(rate, rates.get((name, "GET"), 0))
+        for name, app in apps.items():
+            rates[name, "POST"] = await drive(
+                app, "POST", args.requests, args.concurrency
+            )
+
+        print(f"{args.notes} notes, concurrency {args.concurrency}")
+        print(f"{'engine':<8}{'method':<8}{'req/s':>10}")
+        for (name, method), rate in sorted(rates.items(), key=lambda r: r[0][1]):
+            print(f"{name:<8}{method:<8}{rate:>10.1f}")
+    finally:
+        drop_bench_user(user)
+        sync_engine.dispose()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--notes", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,131 @@
+"""Note creation latency against the number of labels on the note.
+
+Runs against the configured Postgres database:
+
+    python -m benchmarks.bench_label_upsert --notes 200 --labels 0 1 5 10 25
+
+For every label count, notes are created one after another through
+``AsyncNoteQueries.create_note`` (one upsert statement for all labels, one
+transaction) and through a copy of the previous per-label path (a SELECT and,
+for new labels, an INSERT and a commit each). Half of each note's labels
+already exist and half are new, which is what a user tagging notes with a
+mix of old and new labels looks like. The bench user, its notes and labels
+are removed afterwards.
+"""
+
+import argparse
+import asyncio
+import secrets
+import statistics
+import time
+import uuid
+
+from sqlalchemy import delete, event, select
+
+from db.database import async_engine, asyncSessionLocal
+from models.label import Label
+from models.note import Note
+from models.user import User
+from queries.note_queries import AsyncNoteQueries
+from schema.note_schema import NoteCreate
+
+
+async def create_note_per_label(db, user, note_data: NoteCreate) -> Note:
+    labels = []
+    for name in note_data.labels:
+        label = await db.scalar(select(Label).filter_by(name=name.strip()))
+        if label is None:
+            label = Label(name=name.strip())
+            db.add(label)
+            await db.commit()
+            await db.refresh(label)
+        labels.append(label)
+
+    note = Note(
+        title=note_data.title,
+        content=note_data.content,
+        user_id=user.id,
+        labels=labels,
+    )
+    db.add(note)
+    await db.commit()
+    await db.refresh(note, ["created_at"])
+    return note
+
+
+async def create_note_bulk(db, user, note_data: NoteCreate) -> Note:
+    return await AsyncNoteQueries.create_note(db, user, note_data)
+
+
+async def run(create, user, prefix: str, notes: int, label_count: int):
+    statements = []
+
+    def count(*args):
+        statements.append(1)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+    latencies = []
+    try:
+        for i in range(notes):
+            # Half of the names were used by the previous note, half are new.
+            first = i * label_count // 2
+            names = [f"{prefix}-{first + j}" for j in range(label_count)]
+            note_data = NoteCreate(title=f"bench {i}", content="bench", labels=names)
+            async with asyncSessionLocal() as db:
+                started = time.perf_counter()
+                await create(db, user, note_data)
+                latencies.append((time.perf_counter() - started) * 1000)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", count)
+
+    latencies.sort()
+    return (
+        statistics.median(latencies),
+        latencies[int(len(latencies) * 0.99) - 1],
+        len(statements) / notes,
+    )
+
+
+async def main(notes: int, label_counts: list[int]):
+    tag = secrets.token_hex(4)
+    async with asyncSessionLocal() as db:
+        user = User(
+            id=uuid.uuid4(),
+            username=f"bench-{tag}",
+            first_name="Bench",
+            last_name="User",
+            email=f"bench-{tag}@example.com",
+            password_hash="x",
+            secret_key=secrets.token_urlsafe(64),
+            is_verified=True,
+        )
+        db.add(user)
+        await db.commit()
+
+    print(f"{'labels':>6} {'path':>10} {'p50 ms':>8} {'p99 ms':>8} {'stmts':>6}")
+    try:
+        for label_count in label_counts:
+            for path, create in (
+                ("per-label", create_note_per_label),
+                ("bulk", create_note_bulk),
+            ):
+                prefix = f"bench-{tag}-{path}-{label_count}"
+                p50, p99, stmts = await run(create, user, prefix, notes, label_count)
+                print(
+                    f"{label_count:>6} {path:>10} {p50:>8.2f} {p99:>8.2f} {stmts:>6.1f}"
+                )
+    finally:
+        async with asyncSessionLocal() as db:
+            await db.execute(delete(Note).where(Note.user_id == user.id))
+            await db.execute(delete(Label).where(Label.name.like(f"bench-{tag}-%")))
+            await db.execute(delete(User).where(User.id == user.id))
+            await db.commit()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notes", type=int, default=200)
+    parser.add_argument("--labels", type=int, nargs="+", default=[0, 1, 5, 10, 25])
+    args = parser.parse_args()
+    asyncio.run(main(args.notes, args.labels))
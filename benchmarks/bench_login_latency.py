@@ -0,0 +1,95 @@
+"""p99 latency of ``GET /notes`` while logins hammer the same worker.
+
+Run against a live server with a verified user:
+
+    python -m benchmarks.bench_login_latency --username alice --password secret
+
+Start the server with ``RATELIMIT_ENABLED=false`` so the 5/minute login limit
+does not turn the flood into a stream of 429s. The hasher stats at the end
+need the server's ``METRICS_TOKEN``; it is read from the same settings unless
+``--metrics-token`` is given.
+
+The probe phase is measured twice: once on an idle server and once while
+``--concurrency`` clients log in back to back. Before bcrypt moved onto the
+password hasher pool the second p99 tracked the bcrypt cost; afterwards it
+should stay close to the idle figure. Trees from before the async engine
+need ``--concurrency`` under the sync pool size (15), or a blocked checkout
+stalls the event loop for the 30s pool timeout.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from benchmarks.stats import percentile
+from config.config_loader import api_settings
+
+
+async def probe_notes(client: httpx.AsyncClient, headers: dict, samples: int):
+    latencies = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        response = await client.get("/api/v1/notes/", headers=headers)
+        latencies.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+    return latencies
+
+
+async def login_flood(
+    client: httpx.AsyncClient, credentials: dict, stop: asyncio.Event
+):
+    while not stop.is_set():
+        await client.post("/api/v1/auth/login", json=credentials)
+
+
+def report(label: str, latencies: list[float]) -> None:
+    print(
+        f"{label:<18} n={len(latencies):<5} "
+        f"p50={statistics.median(latencies):7.2f}ms "
+        f"p99={percentile(latencies, 99):7.2f}ms "
+        f"max={max(latencies):7.2f}ms"
+    )
+
+
+async def main(args):
+    credentials = {"username": args.username, "password": args.password}
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+        response = await client.post("/api/v1/auth/login", json=credentials)
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        report("idle", await probe_notes(client, headers, args.samples))
+
+        stop = asyncio.Event()
+        flood = [
+            asyncio.create_task(login_flood(client, credentials, stop))
+            for _ in range(args.concurrency)
+        ]
+        try:
+            report("during logins", await probe_notes(client, headers, args.samples))
+        finally:
+            stop.set()
+            await asyncio.gather(*flood, return_exceptions=True)
+
+        metrics = await client.get(
+            "/api/v1/metrics/hashing",
+            headers={"Authorization": f"Bearer {args.metrics_token}"},
+        )
+        if metrics.is_success:
+            print("hasher:", metrics.json())
+        else:
+            print("hasher: metrics unavailable,", metrics.status_code)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--metrics-token", default=api_settings.METRICS_TOKEN)
+    asyncio.run(main(parser.parse_args()))
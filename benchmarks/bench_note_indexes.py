@@ -0,0 +1,170 @@
+"""EXPLAIN ANALYZE for the hot note queries, before and after the note indexes.
+
+Seeds a throwaway ``bench_indexes`` schema in the configured Postgres database
+and prints the plans for each query with and without the indexes declared on
+``Note`` and ``note_label_association``:
+
+    python -m benchmarks.bench_note_indexes --notes 10000000 --users 100000
+
+Seeding the default 10M notes is slow and needs several gigabytes of disk;
+smaller ``--notes`` and ``--users`` give a quick check of the plans. Pass
+``--output plans.txt`` to keep the captured plans and ``--keep`` to leave the
+schema in place for further poking. The app's own tables are never touched.
+
+``bench_note_indexes_plans.txt`` holds the plans from a run at the defaults.
+"""
+
+import argparse
+import re
+import time
+
+from sqlalchemy import text
+
+from db.database import Base, engine
+from models.label import Label  # noqa: F401
+from models.note import Note
+from models.note_label import note_label_association
+from models.user import User  # noqa: F401
+
+SCHEMA = "bench_indexes"
+
+INDEXES = [*Note.__table__.indexes, *note_label_association.indexes]
+
+SEED = [
+    """
+    INSERT INTO users (id, username, first_name, last_name, email,
+                       password_hash, secret_key, is_verified, created_at)
+    SELECT gen_random_uuid(), 'bench' || g, 'Bench', 'User',
+           'bench' || g || '@example.com', 'x', 'x', true, now()
+    FROM generate_series(1, :users) AS g
+    """,
+    """
+    INSERT INTO labels (id, name)
+    SELECT gen_random_uuid(), 'label ' || g FROM generate_series(1, :labels) AS g
+    """,
+    # Notes spread over a year of creation times and a year of expiries, so
+    # the one-day expiry window matches well under 1% of the table.
+    """
+    INSERT INTO notes (id, title, content, created_at, expiry, user_id)
+    SELECT gen_random_uuid(), 'note ' || g, 'bench note',
+           now() - make_interval(secs => g % 31536000),
+           now() + make_interval(secs => (g::bigint * 7919) % 31536000 - 86400),
+           u.ids[1 + g % :users]
+    FROM generate_series(1, :notes) AS g,
+         (SELECT array_agg(id) AS ids FROM users) AS u
+    """,
+    # Every other note carries one label.
+    """
+    INSERT INTO note_label_association (note_id, label_id)
+    SELECT n.id, l.ids[1 + abs(hashtext(n.id::text)) % :labels]
+    FROM (SELECT id, row_number() OVER () AS rn FROM notes) AS n,
+         (SELECT array_agg(id) AS ids FROM labels) AS l
+    WHERE n.rn % 2 = 0
+    """,
+]
+
+QUERIES = {
+    "user notes": """
+        SELECT * FROM notes WHERE user_id = :user_id
+        ORDER BY created_at DESC, id DESC
+    """,
+    "note by id": """
+        SELECT * FROM notes WHERE id = :note_id AND user_id = :user_id
+    """,
+    "expiring notes": """
+        SELECT * FROM notes WHERE expiry <= now() + interval '1 day'
+    """,
+    "notes for label": """
+        SELECT note_id FROM note_label_association WHERE label_id = :label_id
+    """,
+}
+
+
+def explain(conn, params: dict) -> dict:
+    plans = {}
+    for name, query in QUERIES.items():
+        rows = conn.execute(
+            text(f"EXPLAIN (ANALYZE, BUFFERS) {query}"), params
+        ).scalars()
+        plans[name] = "\n".join(rows)
+    return plans
+
+
+def summary(plan: str) -> str:
+    # The innermost scan says whether an index was used; the nodes above it
+    # are sorts and gathers.
+    scans = [line for line in plan.splitlines() if "Scan" in line]
+    node = scans[-1].strip().removeprefix("->").split("  (")[0].strip()
+    took = re.search(r"Execution Time: ([\d.]+) ms", plan)
+    return f"{node} ({took.group(1) if took else '?'} ms)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notes", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--labels", type=int, default=1_000)
+    parser.add_argument("--output", help="write the full plans to this file")
+    parser.add_argument("--keep", action="store_true", help="keep the schema")
+    args = parser.parse_args()
+
+    seed_params = {"users": args.users, "labels": args.labels, "notes": args.notes}
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        conn.execute(text(f"SET search_path TO {SCHEMA}"))
+        try:
+            Base.metadata.create_all(conn)
+            for index in INDEXES:
+                index.drop(conn)
+
+            started = time.perf_counter()
+            for statement in SEED:
+                conn.execute(text(statement), seed_params)
+            conn.execute(text("VACUUM ANALYZE"))
+            print(
+                f"seeded {args.notes} notes for {args.users} users "
+                f"in {time.perf_counter() - started:.0f}s"
+            )
+
+            params = dict(
+                conn.execute(
+                    text(
+                        "SELECT n.id AS note_id, n.user_id, a.label_id FROM notes n "
+                        "JOIN note_label_association a ON a.note_id = n.id LIMIT 1"
+                    )
+                )
+                .mappings()
+                .one()
+            )
+            before = explain(conn, params)
+
+            started = time.perf_counter()
+            for index in INDEXES:
+                index.create(conn)
+            conn.execute(text("ANALYZE"))
+            print(
+                f"built {len(INDEXES)} indexes in {time.perf_counter() - started:.0f}s"
+            )
+            after = explain(conn, params)
+        finally:
+            if not args.keep:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+    rows = [(name, summary(before[name]), summary(after[name])) for name in QUERIES]
+    width = max(len(row[1]) for row in rows) + 2
+    print(f"\n{'query':<18}{'without indexes':<{width}}with indexes")
+    for name, without, with_ in rows:
+        print(f"{name:<18}{without:<{width}}{with_}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            for name in QUERIES:
+                f.write(f"== {name}: without indexes ==\n{before[name]}\n\n")
+                f.write(f"== {name}: with indexes ==\n{after[name]}\n\n")
+        print(f"\nfull plans written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
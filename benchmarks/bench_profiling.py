@@ -0,0 +1,105 @@
+"""Per-request cost of the profiling middleware.
+
+Runs in process, without a server, database or Redis:
+
+    python -m benchmarks.bench_profiling --requests 100000
+
+Every request goes through the middleware, so the unsampled path is what all
+traffic pays. The sampled path adds the sampler thread, which holds the GIL
+while it walks stacks, and writing the profile after the response; it is run
+with the app burning ``--work-ms`` of CPU so there is something to sample.
+Times are the best of ``--repeat``.
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+
+from starlette.routing import Route
+
+from middleware.profiling import ProfilingMiddleware
+from utils.sampling_profiler import ProfileStore, SamplingProfiler
+
+ROUTE = Route("/{note_id}", endpoint=None)
+START = {"type": "http.response.start", "status": 200, "headers": []}
+BODY = {"type": "http.response.body", "body": b"{}"}
+
+
+def make_app(work: float):
+    async def app(scope, receive, send):
+        scope["route"] = ROUTE
+        scope["path_params"] = {"note_id": "1"}
+        deadline = time.perf_counter() + work
+        while time.perf_counter() < deadline:
+            pass
+        await send(START)
+        await send(BODY)
+
+    return app
+
+
+async def receive():
+    return {"type": "http.request"}
+
+
+async def send(message):
+    pass
+
+
+async def per_request(asgi_app, requests: int) -> float:
+    started = time.perf_counter()
+    for _ in range(requests):
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/v1/notes/1",
+            "headers": [(b"authorization", b"Bearer x")],
+        }
+        await asgi_app(scope, receive, send)
+    return (time.perf_counter() - started) / requests
+
+
+def report(label: str, bare: float, instrumented: float) -> None:
+    print(
+        f"{label:<10} bare={bare * 1e6:9.2f}us "
+        f"profiled={instrumented * 1e6:9.2f}us "
+        f"overhead={(instrumented - bare) * 1e6:8.2f}us "
+        f"({(instrumented / bare - 1) * 100:5.1f}%)"
+    )
+
+
+async def best(asgi_app, requests: int, repeat: int) -> float:
+    return min([await per_request(asgi_app, requests) for _ in range(repeat)])
+
+
+async def main(args):
+    profiler = SamplingProfiler(interval=args.interval_ms / 1000)
+    with tempfile.TemporaryDirectory() as directory:
+        store = ProfileStore(directory, 100 * 1024 * 1024)
+
+        app = make_app(0)
+        unsampled = ProfilingMiddleware(app, profiler, store)
+        report(
+            "unsampled",
+            await best(app, args.requests, args.repeat),
+            await best(unsampled, args.requests, args.repeat),
+        )
+
+        app = make_app(args.work_ms / 1000)
+        sampled = ProfilingMiddleware(app, profiler, store, sample_rate=1)
+        requests = max(1, args.requests // 1000)
+        report(
+            "sampled",
+            await best(app, requests, args.repeat),
+            await best(sampled, requests, args.repeat),
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--interval-ms", type=float, default=1)
+    parser.add_argument("--work-ms", type=float, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,86 @@
+"""Cost and accuracy of the Redis rate limiter.
+
+Runs against the configured Redis:
+
+    python -m benchmarks.bench_rate_limit --requests 5000 --concurrency 50
+
+The latency phase times ``hit_rate_limit`` one call after another next to a
+bare ``PING``, so the difference is what the script itself costs on top of
+the single round trip every limited request pays. The burst phase fires
+``--concurrency`` checks at once, ``--bursts`` times, at a key allowing
+``--limit`` requests; exactly ``--limit`` of them must be accepted per key no
+matter how many connections (workers) race for it. The bench keys are
+removed afterwards.
+"""
+
+import argparse
+import asyncio
+import secrets
+import statistics
+import time
+
+from benchmarks.stats import percentile
+from db.redis import hit_rate_limit, rate_limit_key, redis_client
+
+
+def report(label: str, latencies: list[float]) -> None:
+    print(
+        f"{label:<14} n={len(latencies):<6} "
+        f"p50={statistics.median(latencies) * 1000:7.1f}us "
+        f"p99={percentile(latencies, 99) * 1000:7.1f}us"
+    )
+
+
+async def timed(call, requests: int) -> list[float]:
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        await call()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def main(args):
+    scope = f"bench:{secrets.token_hex(4)}"
+    try:
+        await redis_client.ping()
+
+        # A limit that is never reached, so every check takes the accept path.
+        key = rate_limit_key(scope, "latency")
+        report("ping", await timed(redis_client.ping, args.requests))
+        report(
+            "rate limit",
+            await timed(
+                lambda: hit_rate_limit(key, args.requests + 1, 60_000), args.requests
+            ),
+        )
+
+        for burst in range(args.bursts):
+            key = rate_limit_key(scope, f"burst:{burst}")
+            results = await asyncio.gather(
+                *(
+                    hit_rate_limit(key, args.limit, 60_000)
+                    for _ in range(args.concurrency)
+                )
+            )
+            accepted = sum(ok for ok, _ in results)
+            waits = [value for ok, value in results if not ok]
+            print(
+                f"burst {burst}: {accepted}/{args.concurrency} accepted "
+                f"(limit {args.limit}), retry after "
+                f"{min(waits, default=0)}-{max(waits, default=0)}ms"
+            )
+    finally:
+        keys = [key async for key in redis_client.scan_iter(f"ratelimit:{scope}:*")]
+        if keys:
+            await redis_client.delete(*keys)
+        await redis_client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--bursts", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
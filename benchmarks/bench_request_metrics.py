@@ -0,0 +1,120 @@
+"""Per-request cost of the request metrics.
+
+Runs in process, without a server or database:
+
+    python -m benchmarks.bench_request_metrics --requests 200000
+
+Three costs are measured, each as the difference between an instrumented and
+a bare run of the same work, best of ``--repeat``:
+
+* the ASGI middleware around an app that answers immediately, with the
+  request matched to a route template the way FastAPI leaves it in the scope;
+* the statement hooks, on an in-memory SQLite engine;
+* the Redis client wrapper, around a command that returns without I/O.
+"""
+
+import argparse
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+import redis.asyncio as redis
+from sqlalchemy import create_engine, text
+from starlette.routing import Route
+
+from db.database import time_statements
+from db.redis import TimedRedis
+from middleware.request_metrics import RequestMetricsMiddleware
+from utils.request_metrics import (RequestMetrics, RequestTimings,
+                                   request_timings)
+
+ROUTE = Route("/{note_id}", endpoint=None)
+START = {"type": "http.response.start", "status": 200, "headers": []}
+BODY = {"type": "http.response.body", "body": b"{}"}
+
+
+async def app(scope, receive, send):
+    scope["route"] = ROUTE
+    scope["path_params"] = {"note_id": "3fa85f64-5717-4562-b3fc-2c963f66afa6"}
+    await send(START)
+    await send(BODY)
+
+
+async def receive():
+    return {"type": "http.request"}
+
+
+async def send(message):
+    pass
+
+
+async def per_request(asgi_app, requests: int) -> float:
+    started = time.perf_counter()
+    for _ in range(requests):
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/v1/notes/3fa85f64-5717-4562-b3fc-2c963f66afa6",
+        }
+        await asgi_app(scope, receive, send)
+    return (time.perf_counter() - started) / requests
+
+
+def per_statement(engine, statements: int) -> float:
+    with engine.connect() as connection:
+        started = time.perf_counter()
+        for _ in range(statements):
+            connection.execute(text("SELECT 1"))
+        return (time.perf_counter() - started) / statements
+
+
+async def per_command(client, commands: int) -> float:
+    started = time.perf_counter()
+    for _ in range(commands):
+        await client.exists("key")
+    return (time.perf_counter() - started) / commands
+
+
+def report(label: str, bare: float, instrumented: float) -> None:
+    print(
+        f"{label:<12} bare={bare * 1e6:7.2f}us "
+        f"instrumented={instrumented * 1e6:7.2f}us "
+        f"overhead={(instrumented - bare) * 1e6:5.2f}us"
+    )
+
+
+async def main(args):
+    middleware = RequestMetricsMiddleware(app, RequestMetrics())
+    bare = min([await per_request(app, args.requests) for _ in range(args.repeat)])
+    timed = min(
+        [await per_request(middleware, args.requests) for _ in range(args.repeat)]
+    )
+    report("middleware", bare, timed)
+
+    # Hooks record only inside a request, so time them inside one.
+    token = request_timings.set(RequestTimings())
+    statements = args.requests // 10
+    plain_engine = create_engine("sqlite://")
+    timed_engine = create_engine("sqlite://")
+    time_statements(timed_engine)
+    bare = min(per_statement(plain_engine, statements) for _ in range(args.repeat))
+    timed = min(per_statement(timed_engine, statements) for _ in range(args.repeat))
+    report("statement", bare, timed)
+
+    with patch.object(redis.Redis, "execute_command", AsyncMock(return_value=1)):
+        plain_client, timed_client = redis.Redis(), TimedRedis()
+        bare = min(
+            [await per_command(plain_client, statements) for _ in range(args.repeat)]
+        )
+        timed = min(
+            [await per_command(timed_client, statements) for _ in range(args.repeat)]
+        )
+    report("redis", bare, timed)
+    request_timings.reset(token)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
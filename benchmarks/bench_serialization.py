@@ -0,0 +1,178 @@
+"""Cost of turning a note list into a JSON response.
+
+Runs in process, without a server, database or Redis:
+
+    python -m benchmarks.bench_serialization --sizes 10 1000 10000
+
+Each path is a FastAPI route serving the same ``NotePage`` of ``n`` notes,
+called through the ASGI app so the framework's own work is included; times
+are per request, best of ``--repeat``:
+
+* ``jsonable_encoder``: no ``response_model``, so the page goes through
+  ``jsonable_encoder`` and ``json.dumps`` in ``JSONResponse``;
+* ``response_model``: how the notes route serves a database read. FastAPI
+  checks the already built page against the field's precompiled adapter,
+  which passes model instances through, and dumps it to bytes in Rust;
+* ``orjson``: ``model_dump`` to Python objects, encoded by orjson;
+* ``cached bytes``: a page already serialized, as served from the cache.
+
+The profile route is measured the same way: a cache hit that validates the
+cached dict into ``UserRead`` again, against wrapping the cached JSON.
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+
+from fastapi import FastAPI, Response
+
+from schema.note_schema import LabelRead, NotePage, NoteRead
+from schema.user_schema import UserRead, UserSuccessResponse
+
+try:
+    import orjson
+except ImportError:  # only compared when installed
+    orjson = None
+
+
+def make_page(size: int) -> NotePage:
+    now = datetime.now(timezone.utc)
+    labels = [LabelRead(id=uuid.uuid4(), name="work")]
+    return NotePage(
+        items=[
+            NoteRead(
+                id=uuid.uuid4(),
+                title=f"Note {i}",
+                content="x" * 200,
+                created_at=now,
+                labels=labels,
+            )
+            for i in range(size)
+        ],
+        next_cursor=None,
+    )
+
+
+def make_app(page: NotePage, user: UserRead) -> FastAPI:
+    app = FastAPI()
+    body = page.model_dump_json().encode()
+    cached_user = user.model_dump_json().encode()
+    cached_dict = user.model_dump(mode="json")
+
+    @app.get("/jsonable_encoder")
+    async def encoder():
+        return page
+
+    @app.get("/response_model", response_model=NotePage)
+    async def response_model():
+        return page
+
+    @app.get("/orjson")
+    async def orjson_dumps():
+        return Response(orjson.dumps(page.model_dump()), media_type="application/json")
+
+    @app.get("/cached_bytes")
+    async def cached_bytes():
+        return Response(body, media_type="application/json")
+
+    @app.get("/profile/validated", response_model=UserSuccessResponse)
+    async def profile_validated():
+        return UserSuccessResponse(
+            message="User Fetched from Cache",
+            payload=UserRead(**cached_dict),
+            status_code=200,
+        )
+
+    @app.get("/profile/wrapped")
+    async def profile_wrapped():
+        return Response(
+            content=b"".join(
+                (
+                    b'{"message":"User Fetched from Cache","payload":',
+                    cached_user,
+                    b',"status_code":200}',
+                )
+            ),
+            media_type="application/json",
+        )
+
+    return app
+
+
+async def per_request(app, path: str, requests: int) -> float:
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [],
+            "server": ("bench", 80),
+        }
+        await app(scope, receive, send)
+    return (time.perf_counter() - started) / requests
+
+
+async def best(app, path: str, requests: int, repeat: int) -> float:
+    return min([await per_request(app, path, requests) for _ in range(repeat)])
+
+
+async def main(args):
+    now = datetime.now(timezone.utc)
+    user = UserRead(
+        id=uuid.uuid4(),
+        username="johndoe",
+        email="johndoe@example.com",
+        created_at=now,
+        updated_at=now,
+    )
+    paths = ["jsonable_encoder", "response_model", "cached_bytes"]
+    if orjson is not None:
+        paths.insert(2, "orjson")
+
+    for size in args.sizes:
+        app = make_app(make_page(size), user)
+        # About the same number of notes serialized at every size.
+        requests = max(3, args.notes // size)
+        timings = {
+            path: await best(app, f"/{path}", requests, args.repeat) for path in paths
+        }
+        baseline = timings["jsonable_encoder"]
+        print(f"{size} notes")
+        for path, seconds in timings.items():
+            print(
+                f"  {path:<17} {seconds * 1e6:10.1f}us "
+                f"{baseline / seconds:6.1f}x vs jsonable_encoder"
+            )
+
+    app = make_app(make_page(1), user)
+    requests = args.notes // 10
+    validated = await best(app, "/profile/validated", requests, args.repeat)
+    wrapped = await best(app, "/profile/wrapped", requests, args.repeat)
+    print("profile cache hit")
+    print(f"  {'validated':<17} {validated * 1e6:10.1f}us")
+    print(f"  {'wrapped':<17} {wrapped * 1e6:10.1f}us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument(
+        "--notes", type=int, default=50000, help="notes serialized per size"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
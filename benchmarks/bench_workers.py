@@ -0,0 +1,127 @@
+"""Throughput of the production launcher against its worker count.
+
+Starts ``python main.py --production`` once per ``--workers`` value on a
+spare port and drives ``GET /notes`` (the cached path) with ``--concurrency``
+keep-alive clients for ``--duration`` seconds:
+
+    python -m benchmarks.bench_workers --username alice --password secret \\
+        --workers 1 4 8
+
+Start from a verified user with some notes. Each server is stopped with
+SIGTERM and the time it takes to drain and exit is reported as well. The
+load generator shares the machine with the server, so leave it cores to run
+on; a machine with fewer cores than workers measures contention, not
+scaling.
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.stats import percentile
+
+
+async def wait_ready(base_url: str, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get("/api/v1/docs")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def drive(base_url: str, headers: dict, concurrency: int, duration: float):
+    latencies = []
+    errors = 0
+    stop_at = time.perf_counter() + duration
+
+    async def client_loop(client: httpx.AsyncClient):
+        nonlocal errors
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            response = await client.get("/api/v1/notes/", headers=headers)
+            if response.status_code == 200:
+                latencies.append((time.perf_counter() - started) * 1000)
+            else:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+async def run(args, workers: int, headers: dict) -> None:
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "main.py",
+            "--production",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(args.port),
+            "--workers",
+            str(workers),
+        ],
+        env={**os.environ, "RATELIMIT_ENABLED": "false"},
+    )
+    try:
+        await wait_ready(base_url)
+        # One login serves every run; the token is valid on any worker.
+        if not headers:
+            async with httpx.AsyncClient(base_url=base_url) as client:
+                response = await client.post(
+                    "/api/v1/auth/login",
+                    json={"username": args.username, "password": args.password},
+                )
+                response.raise_for_status()
+            headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+        # Warm every worker's pools and caches before measuring.
+        await drive(base_url, headers, args.concurrency, 2)
+        latencies, errors, elapsed = await drive(
+            base_url, headers, args.concurrency, args.duration
+        )
+    finally:
+        stopping = time.perf_counter()
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+        shutdown = time.perf_counter() - stopping
+
+    print(
+        f"workers={workers:<3} {len(latencies) / elapsed:8.1f} req/s "
+        f"p50={statistics.median(latencies):7.2f}ms "
+        f"p99={percentile(latencies, 99):7.2f}ms "
+        f"errors={errors} shutdown={shutdown:.2f}s"
+    )
+
+
+async def main(args):
+    headers = {}
+    for workers in args.workers:
+        await run(args, workers, headers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8099)
+    asyncio.run(main(args=parser.parse_args()))
@@ -0,0 +1,8 @@
+"""Helpers shared by the benchmark scripts."""
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples``; ``pct`` runs from 0 to 100."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta
 
 from itsdangerous import URLSafeTimedSerializer
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
 from celery_logic.celery_worker import celery_app
 from config.config_loader import email_settings
@@ -47,7 +47,12 @@ def notify_expiring_notes_task():
     db: Session = next(get_db())
     target_date = datetime.now() + timedelta(days=1)
 
-    notes = db.query(Note).filter(Note.expiry <= target_date).all()
+    notes = (
+        db.query(Note)
+        .filter(Note.expiry <= target_date)
+        .options(joinedload(Note.user))
+        .all()
+    )
 
     for note in notes:
         user = note.user
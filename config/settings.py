@@ -16,9 +16,34 @@ class DBSettings(BaseSettings):
     POSTGRESQL_PORT: int
     POSTGRESQL_DATABASE: str
 
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+
+    # Comma separated DSNs of read replicas; empty keeps every read on the primary.
+    DB_REPLICA_URLS: str = ""
+    DB_REPLICA_STICKY_SECONDS: float = 5
+    DB_REPLICA_HEALTH_INTERVAL: float = 5
+
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
 
+    # Per-worker copies of cached values, kept current over pub/sub.
+    CACHE_L1_MAX_SIZE: int = 10000
+    CACHE_L1_TTL_SECONDS: float = 30
+
+    # Redis expiries per keyspace, refreshed whenever an entry is read.
+    CACHE_USER_TTL_SECONDS: int = 3600
+    CACHE_NOTES_TTL_SECONDS: int = 3600
+    CACHE_LABELS_TTL_SECONDS: int = 86400
+    # Users with more notes than this are served from the database.
+    CACHE_NOTES_MAX_PER_USER: int = 1000
+    # How long one worker may hold the right to rebuild a user's note list.
+    CACHE_REBUILD_LOCK_MS: int = 5000
+
     @property
     def SQLALCHEMY_DATABASE_URI(self) -> str:
         return PostgresDsn.build(
@@ -30,6 +55,17 @@ class DBSettings(BaseSettings):
             path=self.POSTGRESQL_DATABASE,
         )
 
+    @property
+    def ASYNC_SQLALCHEMY_DATABASE_URI(self) -> str:
+        return PostgresDsn.build(
+            scheme="postgresql+asyncpg",
+            username=self.POSTGRESQL_USERNAME,
+            password=self.POSTGRESQL_PASSWORD,
+            host=self.POSTGRESQL_SERVER,
+            port=self.POSTGRESQL_PORT,
+            path=self.POSTGRESQL_DATABASE,
+        )
+
 
 class APISettings(BaseSettings):
     model_config = SettingsConfigDict(
@@ -45,6 +81,44 @@ class APISettings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     REFRESH_TOKEN_EXPIRE_MINUTES: int
 
+    # Production launcher (``python main.py --production``); 0 workers starts
+    # one per CPU. "auto" picks uvloop and httptools when they are installed.
+    API_WORKERS: int = 0
+    API_LOOP: str = "auto"
+    API_HTTP: str = "auto"
+    API_BACKLOG: int = 2048
+    API_KEEPALIVE_SECONDS: int = 5
+    API_GRACEFUL_SHUTDOWN_SECONDS: int = 30
+    # Proxies trusted to report the client address; the rate limiter keys on it.
+    API_FORWARDED_ALLOW_IPS: str = "127.0.0.1"
+
+    PASSWORD_HASHER_EXECUTOR: str = "thread"
+    PASSWORD_HASHER_MAX_WORKERS: int = 4
+    PASSWORD_HASHER_MAX_QUEUE: int = 64
+
+    TOKEN_CACHE_TTL_SECONDS: int = 300
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+
+    NOTES_PAGE_DEFAULT_LIMIT: int = 50
+    NOTES_PAGE_MAX_LIMIT: int = 200
+    NOTES_BATCH_MAX_OPERATIONS: int = 500
+
+    # Per-route limits are counted in Redis; false lets every request through.
+    RATELIMIT_ENABLED: bool = True
+
+    # Bearer token required by every /metrics endpoint. They expose internals
+    # and some are costly to compute, so no token refuses all of them.
+    METRICS_TOKEN: str = ""
+
+    # Sampling profiler: a fraction of requests, plus requests sent with an
+    # X-Profile header signed with the secret, or at the rate set through
+    # PUT /metrics/profiler. No secret disables the header and the toggle.
+    PROFILER_SAMPLE_RATE: float = 0
+    PROFILER_SECRET: str = ""
+    PROFILER_INTERVAL_SECONDS: float = 0.001
+    PROFILER_OUTPUT_DIR: str = "profiles"
+    PROFILER_MAX_DISK_BYTES: int = 100 * 1024 * 1024
+
 
 class EmailSettings(BaseSettings):
     model_config = SettingsConfigDict(
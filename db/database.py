@@ -1,12 +1,125 @@
-from sqlalchemy import create_engine
+import time
+
+from sqlalchemy import create_engine, event, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from config.config_loader import db_settings
+from db.pool_metrics import PoolMetrics, instrumented_pool
+from db.replicas import ReplicaSet, RoutingSession
+from utils.request_metrics import record_db
+
+pool_metrics = {"sync": PoolMetrics("sync"), "async": PoolMetrics("async")}
+
+
+def pool_options(metrics: PoolMetrics, base_pool) -> dict:
+    return {
+        "poolclass": instrumented_pool(base_pool, metrics),
+        "pool_size": db_settings.DB_POOL_SIZE,
+        "max_overflow": db_settings.DB_MAX_OVERFLOW,
+        "pool_timeout": db_settings.DB_POOL_TIMEOUT,
+        "pool_recycle": db_settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": db_settings.DB_POOL_PRE_PING,
+    }
+
+
+def time_statements(engine) -> None:
+    """Adds every statement's run time to the current request's timings.
+
+    Hooks the dialect's execute calls rather than the cursor events: a
+    cursor listener switches on event dispatch for every execution on the
+    engine's connections, which costs several times more than the timing.
+    Returning True tells SQLAlchemy the statement has been executed.
+    """
+
+    @event.listens_for(engine, "do_execute")
+    def do_execute(cursor, statement, parameters, context):
+        started = time.perf_counter()
+        context.dialect.do_execute(cursor, statement, parameters, context)
+        record_db(time.perf_counter() - started)
+        return True
+
+    @event.listens_for(engine, "do_executemany")
+    def do_executemany(cursor, statement, parameters, context):
+        started = time.perf_counter()
+        context.dialect.do_executemany(cursor, statement, parameters, context)
+        record_db(time.perf_counter() - started)
+        return True
+
+    @event.listens_for(engine, "do_execute_no_params")
+    def do_execute_no_params(cursor, statement, context):
+        started = time.perf_counter()
+        context.dialect.do_execute_no_params(cursor, statement, context)
+        record_db(time.perf_counter() - started)
+        return True
+
+
+def statement_timeout_args(async_driver: bool) -> dict:
+    timeout = db_settings.DB_STATEMENT_TIMEOUT_MS
+    if not timeout:
+        return {}
+    if async_driver:
+        return {"server_settings": {"statement_timeout": str(timeout)}}
+    return {"options": f"-c statement_timeout={timeout}"}
+
 
-engine = create_engine(str(db_settings.SQLALCHEMY_DATABASE_URI))
+# Sync engine for Celery tasks, Alembic and scripts.
+engine = create_engine(
+    str(db_settings.SQLALCHEMY_DATABASE_URI),
+    connect_args=statement_timeout_args(async_driver=False),
+    **pool_options(pool_metrics["sync"], QueuePool),
+)
+pool_metrics["sync"].attach(engine)
 
 sessionLocal = sessionmaker(bind=engine)
 
+# Async engine for the API; routes must never block the event loop on I/O.
+async_engine = create_async_engine(
+    str(db_settings.ASYNC_SQLALCHEMY_DATABASE_URI),
+    connect_args=statement_timeout_args(async_driver=True),
+    **pool_options(pool_metrics["async"], AsyncAdaptedQueuePool),
+)
+pool_metrics["async"].attach(async_engine.sync_engine)
+time_statements(async_engine.sync_engine)
+
+
+def create_replica_engine(index: int, url: str):
+    metrics = pool_metrics[f"replica-{index}"] = PoolMetrics(f"replica-{index}")
+    replica = create_async_engine(
+        make_url(url.strip()).set(drivername="postgresql+asyncpg"),
+        connect_args=statement_timeout_args(async_driver=True),
+        **pool_options(metrics, AsyncAdaptedQueuePool),
+    )
+    metrics.attach(replica.sync_engine)
+    time_statements(replica.sync_engine)
+    return replica
+
+
+replica_set = ReplicaSet(
+    [
+        create_replica_engine(index, url)
+        for index, url in enumerate(
+            filter(None, db_settings.DB_REPLICA_URLS.split(","))
+        )
+    ],
+    sticky_seconds=db_settings.DB_REPLICA_STICKY_SECONDS,
+    health_interval=db_settings.DB_REPLICA_HEALTH_INTERVAL,
+)
+
+
+async def dispose_engines() -> None:
+    for db_engine in (async_engine, *replica_set.engines):
+        await db_engine.dispose()
+
+
+asyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    sync_session_class=RoutingSession,
+    replicas=replica_set,
+    expire_on_commit=False,
+)
+
 
 class Base(DeclarativeBase):
     pass
@@ -22,3 +135,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with asyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,127 @@
+import json
+from typing import Callable
+
+from db.subscriber import ChannelSubscriber
+from utils.ttl_cache import TTLCache
+
+INVALIDATION_CHANNEL = "cache_invalidation"
+# Pages kept per entry of a fielded keyspace before the entry starts over.
+MAX_FIELDS = 32
+
+
+class LocalCache(ChannelSubscriber):
+    """Per-worker L1 copies of values cached in Redis, one LRU per keyspace.
+
+    Writers change Redis and publish the keys they touched on the
+    invalidation channel; every worker drops its copies when the message
+    arrives. While the subscription is down (startup, lost connection) a
+    copy could miss an invalidation, so nothing is served or kept locally.
+
+    An entry can hold several fields (e.g. pages of one user's notes) that
+    are invalidated together by the entry's key.
+
+    Other per-worker state can ride on the same channel: invalidations of a
+    keyspace with a listener go to the listener, with ``None`` whenever the
+    whole cache is cleared.
+    """
+
+    channel = INVALIDATION_CHANNEL
+
+    def __init__(self, maxsize: int, ttl: float):
+        super().__init__()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._keyspaces: dict[str, TTLCache] = {}
+        self._generations: dict[str, int] = {}
+        self._counters: dict[str, dict[str, int]] = {}
+        self._listeners: dict[str, Callable[[str | None], None]] = {}
+
+    def _keyspace(self, name: str) -> TTLCache:
+        keyspace = self._keyspaces.get(name)
+        if keyspace is None:
+            keyspace = self._keyspaces[name] = TTLCache(self.maxsize, self.ttl)
+            self._generations[name] = 0
+            self._counters[name] = dict.fromkeys(
+                ("hits", "misses", "redis_hits", "redis_misses"), 0
+            )
+        return keyspace
+
+    def get(self, keyspace: str, key: str, field=None):
+        cache = self._keyspace(keyspace)
+        if not self.ready:
+            return None
+
+        value = cache.get(key)
+        if field is not None and value is not None:
+            value = value.get(field)
+        self._counters[keyspace]["misses" if value is None else "hits"] += 1
+        return value
+
+    def generation(self, keyspace: str) -> int:
+        """Taken before reading Redis and handed back to ``set``, so a value
+        read before an invalidation is not stored after it."""
+        self._keyspace(keyspace)
+        return self._generations[keyspace]
+
+    def set(self, keyspace: str, key: str, value, generation: int, field=None):
+        cache = self._keyspace(keyspace)
+        if not self.ready or generation != self._generations[keyspace]:
+            return
+
+        if field is not None:
+            fields = cache.pop(key) or {}
+            if len(fields) >= MAX_FIELDS:
+                fields = {}
+            value = {**fields, field: value}
+        cache.set(key, value)
+
+    def record_redis(self, keyspace: str, hit: bool) -> None:
+        self._keyspace(keyspace)
+        self._counters[keyspace]["redis_hits" if hit else "redis_misses"] += 1
+
+    def add_listener(
+        self, keyspace: str, listener: Callable[[str | None], None]
+    ) -> None:
+        self._listeners[keyspace] = listener
+
+    def invalidate(self, keyspace: str, key: str) -> None:
+        listener = self._listeners.get(keyspace)
+        if listener is not None:
+            listener(key)
+            return
+        self._keyspace(keyspace).pop(key)
+        self._generations[keyspace] += 1
+
+    @staticmethod
+    def message(keyspace: str, key: str) -> str:
+        return json.dumps([keyspace, key])
+
+    def clear(self) -> None:
+        for name, cache in self._keyspaces.items():
+            cache.clear()
+            self._generations[name] += 1
+        for listener in self._listeners.values():
+            listener(None)
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "size": len(cache),
+                "maxsize": cache.maxsize,
+                **self._counters[name],
+                "evictions": cache.evictions,
+            }
+            for name, cache in self._keyspaces.items()
+        }
+
+    async def on_subscribed(self, client) -> None:
+        # Anything cached before the subscription may have missed its
+        # invalidation.
+        self.clear()
+
+    def on_message(self, data: bytes) -> None:
+        keyspace, key = json.loads(data)
+        self.invalidate(keyspace, key)
+
+    def on_unsubscribed(self) -> None:
+        self.clear()
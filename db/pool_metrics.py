@@ -0,0 +1,106 @@
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import Pool
+
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class PoolMetrics:
+    """Checkout wait times and occupancy for one engine's connection pool."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool: Pool | None = None
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.overflow_checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.peak_in_use = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def record_wait(self, seconds: float) -> None:
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+        millis = seconds * 1000
+        for index, bound in enumerate(WAIT_BUCKETS_MS):
+            if millis <= bound:
+                self.wait_buckets[index] += 1
+                return
+        self.wait_buckets[-1] += 1
+
+    def attach(self, engine) -> None:
+        self.pool = engine.pool
+
+        @event.listens_for(engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            self.connects += 1
+
+        @event.listens_for(engine, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            self.checkouts += 1
+            in_use = self.pool.checkedout()
+            self.peak_in_use = max(self.peak_in_use, in_use)
+            if in_use > self.pool.size():
+                self.overflow_checkouts += 1
+
+        @event.listens_for(engine, "invalidate")
+        def on_invalidate(dbapi_connection, connection_record, exception):
+            self.invalidations += 1
+
+        @event.listens_for(engine, "engine_disposed")
+        def on_dispose(engine):
+            self.pool = engine.pool
+
+    def stats(self) -> dict:
+        stats = {
+            "checkouts": self.checkouts,
+            "checkout_timeouts": self.checkout_timeouts,
+            "overflow_checkouts": self.overflow_checkouts,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "peak_in_use": self.peak_in_use,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_max": self.wait_seconds_max,
+            "wait_ms_buckets": {
+                **{
+                    f"le_{bound}": count
+                    for bound, count in zip(WAIT_BUCKETS_MS, self.wait_buckets)
+                },
+                "le_inf": self.wait_buckets[-1],
+            },
+        }
+        if self.pool is not None and hasattr(self.pool, "checkedout"):
+            stats.update(
+                size=self.pool.size(),
+                in_use=self.pool.checkedout(),
+                idle=self.pool.checkedin(),
+                overflow=max(self.pool.overflow(), 0),
+            )
+        return stats
+
+
+def instrumented_pool(base: type[Pool], metrics: PoolMetrics) -> type[Pool]:
+    """Subclass ``base`` so that every checkout reports how long it waited.
+
+    Pool events fire only once a connection is handed out, so the wait has to
+    be measured around ``_do_get``. ``Pool.recreate`` reuses the class, which
+    keeps the metrics across ``engine.dispose()``.
+    """
+
+    class InstrumentedPool(base):
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                return super()._do_get()
+            except exc.TimeoutError:
+                metrics.checkout_timeouts += 1
+                raise
+            finally:
+                metrics.record_wait(time.perf_counter() - started)
+
+    InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+    return InstrumentedPool
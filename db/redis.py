@@ -1,75 +1,791 @@
 import json
+import secrets
+import time
+from datetime import datetime, timedelta
+from uuid import UUID
 
 import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
 
+from auth.token_cache import token_cache
 from config.config_loader import db_settings
+from db.local_cache import INVALIDATION_CHANNEL, LocalCache
+from db.revoked_tokens import (BLOCKLIST_CHANNEL, BLOCKLIST_PREFIX,
+                               REVOKED_TOKENS_KEY, RevokedTokenFilter)
+from schema.note_schema import NoteRead
+from schema.user_schema import UserRead
+from utils.pagination import encode_cursor
+from utils.request_metrics import record_redis
+from utils.single_flight import SingleFlight
 
-JTI_EXPIRY = 3600
 
-redis_client = redis.Redis(
+class TimedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            record_redis(time.perf_counter() - started)
+
+
+class TimedRedis(redis.Redis):
+    """Adds every command's (or pipeline's) round trip to the current
+    request's timings."""
+
+    async def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            record_redis(time.perf_counter() - started)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> TimedPipeline:
+        return TimedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
+redis_client = TimedRedis(
     host=db_settings.REDIS_HOST, port=db_settings.REDIS_PORT, db=0
 )
 
+revoked_tokens = RevokedTokenFilter()
+
+local_cache = LocalCache(
+    maxsize=db_settings.CACHE_L1_MAX_SIZE, ttl=db_settings.CACHE_L1_TTL_SECONDS
+)
 
-async def add_jti_to_blocklist(jti: str) -> None:
-    await redis_client.set(
-        name=jti,
-        value=jti,
-        ex=JTI_EXPIRY,
-    )
+
+async def add_jti_to_blocklist(jti: str, expires_at: int) -> None:
+    # Scored by exp, so the entry counts exactly as long as the token itself
+    # would be accepted; expired entries are trimmed on the way in.
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.zadd(REVOKED_TOKENS_KEY, {jti: expires_at})
+    pipe.zremrangebyscore(REVOKED_TOKENS_KEY, "-inf", time.time())
+    pipe.publish(BLOCKLIST_CHANNEL, json.dumps({"jti": jti, "exp": expires_at}))
+    await pipe.execute()
+    revoked_tokens.add(jti, expires_at)
 
 
 async def token_in_blocklist(jti: str) -> bool:
-    jti = await redis_client.get(name=jti)
+    if not revoked_tokens.might_contain(jti):
+        return False
+
+    expires_at = await redis_client.zscore(REVOKED_TOKENS_KEY, jti)
+    return expires_at is not None and expires_at > time.time()
+
+
+async def start_blocklist_sync() -> None:
+    revoked_tokens.start(redis_client)
+
+
+async def stop_blocklist_sync() -> None:
+    await revoked_tokens.stop()
+
+
+async def start_cache_sync() -> None:
+    local_cache.start(redis_client)
+
+
+async def stop_cache_sync() -> None:
+    await local_cache.stop()
+
+
+async def close_redis() -> None:
+    await redis_client.aclose()
+
+
+def sticky_key(user_id: str):
+    return f"sticky:{user_id}"
+
+
+async def mark_sticky_user(user_id: str, seconds: float) -> None:
+    await redis_client.set(sticky_key(user_id), 1, px=int(seconds * 1000))
+
+
+async def is_sticky_user(user_id: str) -> bool:
+    return await redis_client.get(sticky_key(user_id)) is not None
+
+
+PROFILER_TOGGLE_KEY = "profiler:sample_rate"
+
+
+async def set_profiler_sample_rate(rate: float, seconds: int) -> None:
+    await redis_client.set(PROFILER_TOGGLE_KEY, rate, ex=seconds)
+
+
+async def get_profiler_sample_rate() -> float:
+    rate = await redis_client.get(PROFILER_TOGGLE_KEY)
+    return float(rate) if rate is not None else 0.0
 
-    return jti is not None
+
+def rate_limit_key(scope: str, client: str):
+    return f"ratelimit:{scope}:{client}"
+
+
+# A sorted set of the accepted requests' times. The clock is Redis's own, so
+# every worker and node slides the same window. Rejected requests are not
+# logged, so a client that keeps retrying is let through at the limit's rate.
+# Returns {1, remaining} or {0, milliseconds until a request is accepted}.
+RATE_LIMIT_SCRIPT = """
+local now = redis.call('TIME')
+now = now[1] * 1000 + math.floor(now[2] / 1000)
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+if count < limit then
+    redis.call('ZADD', KEYS[1], now, now .. ':' .. ARGV[3])
+    redis.call('PEXPIRE', KEYS[1], window)
+    return {1, limit - count - 1}
+end
+local oldest = redis.call('ZRANGE', KEYS[1], count - limit, count - limit, 'WITHSCORES')
+return {0, tonumber(oldest[2]) + window - now}
+"""
+# Scripts run on every request are sent once and then called by their SHA;
+# redis-py loads them again if Redis answers NOSCRIPT. Calls pass the client
+# explicitly, so they go through whichever client this module holds. Scripts
+# queued on a pipeline stay on EVAL: registered ones would cost a SCRIPT EXISTS
+# round trip on every execute.
+rate_limit_script = redis_client.register_script(RATE_LIMIT_SCRIPT)
+
+
+async def hit_rate_limit(key: str, limit: int, window_ms: int) -> tuple[bool, int]:
+    """Count a request against ``key``; returns whether it is accepted and
+    the requests left, or the milliseconds to wait when it is not."""
+    accepted, value = await rate_limit_script(
+        keys=[key],
+        args=[limit, window_ms, secrets.token_hex(4)],
+        client=redis_client,
+    )
+    return bool(accepted), int(value)
 
 
 # Cache keys
-def user_key(username: str):
-    return f"user:{username}"
+#
+# Per-user entries are keyed by the user's id, which every token carries and
+# which, unlike the username, does not change when the user is renamed.
+def user_key(user_id: str):
+    return f"user:{user_id}:profile"
+
+
+def user_etag_key(user_id: str):
+    return f"user:{user_id}:etag"
+
+
+def notes_key(user_id: str):
+    return f"notes:{user_id}"
+
+
+def notes_index_key(user_id: str):
+    return f"notes:{user_id}:index"
+
+
+def notes_lock_key(user_id: str):
+    return f"notes:{user_id}:lock"
+
+
+def notes_version_key(user_id: str):
+    return f"notes:{user_id}:version"
 
 
-def notes_key(username: str):
-    return f"notes:{username}"
+# One copy of the labels table shared by every user, and a counter bumped
+# whenever a label is created so that workers know their copy is stale.
+SHARED_LABELS_KEY = "shared_labels"
+SHARED_LABELS_VERSION_KEY = "shared_labels:version"
 
+# L1 keyspaces; entries are keyed by user id, labels by SHARED_LABELS_KEY.
+USER_KEYSPACE = "user"
+NOTES_KEYSPACE = "notes"
+LABELS_KEYSPACE = "labels"
+# Keyed by the Redis key holding the version token.
+ETAG_KEYSPACE = "etag"
+# Not cached here: invalidations go to every worker's token cache, by user id.
+TOKENS_KEYSPACE = "tokens"
 
-def labels_key(username: str):
-    return f"labels:{username}"
+local_cache.add_listener(TOKENS_KEYSPACE, token_cache.invalidate_user)
+
+# Seconds a Redis entry lives after it was last written or read.
+CACHE_TTLS = {
+    USER_KEYSPACE: db_settings.CACHE_USER_TTL_SECONDS,
+    NOTES_KEYSPACE: db_settings.CACHE_NOTES_TTL_SECONDS,
+    LABELS_KEYSPACE: db_settings.CACHE_LABELS_TTL_SECONDS,
+}
+
+
+# Two-tier reads and writes
+async def read_through(keyspace: str, key: str, fetch, field=None):
+    """The worker's copy of ``key``, else ``await fetch()`` (the Redis read),
+    kept locally unless it is ``None``."""
+    value = local_cache.get(keyspace, key, field)
+    if value is not None:
+        return value
+
+    generation = local_cache.generation(keyspace)
+    value = await fetch()
+    local_cache.record_redis(keyspace, value is not None)
+    if value is not None:
+        local_cache.set(keyspace, key, value, generation, field)
+    return value
+
+
+async def execute_invalidating(pipe, *entries: tuple[str, str]):
+    """Run ``pipe`` with a publish for every ``(keyspace, key)`` it changed,
+    then drop this worker's copies without waiting for the message."""
+    for keyspace, key in entries:
+        pipe.publish(INVALIDATION_CHANNEL, local_cache.message(keyspace, key))
+    result = await pipe.execute()
+    for keyspace, key in entries:
+        local_cache.invalidate(keyspace, key)
+    return result
+
+
+# Versions
+#
+# A user's profile and note list each have a version: a random token that
+# changes on every write and backs the ETag of the matching response. Tokens
+# are random rather than counters so that a version which expired and was
+# created again can never repeat an ETag a client still holds.
+VERSION_SCRIPT = """
+local version = redis.call("GET", KEYS[1])
+if not version then
+    version = ARGV[1]
+    redis.call("SET", KEYS[1], version, "EX", ARGV[2])
+else
+    redis.call("EXPIRE", KEYS[1], ARGV[2])
+end
+return version
+"""
+version_script = redis_client.register_script(VERSION_SCRIPT)
+
+
+def new_version() -> str:
+    return secrets.token_hex(8)
+
+
+async def _read_version(key: str, ttl: int) -> str:
+    """The version at ``key``, started if there is none."""
+    version = await version_script(
+        keys=[key], args=[new_version(), ttl], client=redis_client
+    )
+    return version.decode() if isinstance(version, bytes) else str(version)
+
+
+async def get_user_etag(user_id: str) -> str:
+    """The profile's version, as served to conditional requests."""
+    key = user_etag_key(user_id)
+    return await read_through(
+        ETAG_KEYSPACE,
+        key,
+        lambda: _read_version(key, CACHE_TTLS[USER_KEYSPACE]),
+    )
+
+
+async def get_notes_etag(user_id: str) -> str:
+    """The note list's version, as served to conditional requests."""
+    key = notes_version_key(user_id)
+    return await read_through(
+        ETAG_KEYSPACE,
+        key,
+        lambda: _read_version(key, CACHE_TTLS[NOTES_KEYSPACE]),
+    )
 
 
 # User cache operations
-async def cache_user_data(username: str, user_data: dict):
-    await redis_client.set(user_key(username), json.dumps(user_data, default=str))
+#
+# The profile is kept as its ``UserRead`` JSON, exactly as it appears in a
+# response, so a hit is served without decoding or validating it again.
+def _queue_user_data(pipe, user_id: str, user: UserRead):
+    pipe.set(user_key(user_id), user.model_dump_json(), ex=CACHE_TTLS[USER_KEYSPACE])
+
+
+async def cache_user_data(user_id: str, user: UserRead):
+    """Store changed user data, giving the profile a new version."""
+    pipe = redis_client.pipeline(transaction=False)
+    _queue_user_data(pipe, user_id, user)
+    pipe.set(user_etag_key(user_id), new_version(), ex=CACHE_TTLS[USER_KEYSPACE])
+    await execute_invalidating(
+        pipe, (USER_KEYSPACE, user_id), (ETAG_KEYSPACE, user_etag_key(user_id))
+    )
+
+
+async def get_cached_user(user_id: str) -> bytes | None:
+    """The user's serialized ``UserRead``, or ``None`` when not cached."""
 
+    async def fetch():
+        return await redis_client.getex(user_key(user_id), ex=CACHE_TTLS[USER_KEYSPACE])
 
-async def get_cached_user(username: str):
-    data = await redis_client.get(user_key(username))
-    return json.loads(data) if data else None
+    return await read_through(USER_KEYSPACE, user_id, fetch)
 
 
 # Notes cache
-async def cache_user_notes(username: str, notes: list[dict]):
-    await redis_client.set(notes_key(username), json.dumps(notes, default=str))
+#
+# Each note is a field in the ``notes:`` hash and a member of the sorted
+# ``index``, scored by creation time in microseconds. Ties on the score are
+# ordered by member, i.e. by the note id string, which is the same order
+# Postgres gives ``(created_at, id)``, so pages read off the index line up
+# with the keyset cursor.
+#
+# Hash values are the notes' ``NoteRead`` JSON, exactly as they appear in a
+# response, so a page is served by joining them without decoding any.
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def note_score(created_at: datetime) -> int:
+    return (created_at.replace(tzinfo=None) - _EPOCH) // _MICROSECOND
+
+
+def score_created_at(score: float) -> datetime:
+    return _EPOCH + int(score) * _MICROSECOND
+
+
+# A list with nothing to index keeps its state in the hash's ``_state`` field
+# instead: "empty" for a user without notes, "over_cap" for one with more than
+# a cached list may hold. Reads answer both without a rebuild; the field
+# expires with the list.
+NOTES_EMPTY = "empty"
+NOTES_OVER_CAP = "over_cap"
+
+# Replaces a user's list with notes loaded from the database, unless a note
+# was written since ``version`` was read: that write found no list to update,
+# so the loaded notes would be missing it. ARGV[1] is the version, ARGV[2] the
+# TTL, ARGV[3] the state stored when there are no notes, then id, score and
+# JSON for every note.
+REPLACE_NOTES_SCRIPT = """
+if (redis.call("GET", KEYS[3]) or "") ~= ARGV[1] then
+    return 0
+end
+redis.call("DEL", KEYS[1], KEYS[2])
+if #ARGV < 4 then
+    redis.call("HSET", KEYS[1], "_state", ARGV[3])
+    redis.call("EXPIRE", KEYS[1], ARGV[2])
+    return 1
+end
+for i = 4, #ARGV, 3 do
+    redis.call("HSET", KEYS[1], ARGV[i], ARGV[i + 2])
+    redis.call("ZADD", KEYS[2], ARGV[i + 1], ARGV[i])
+end
+redis.call("EXPIRE", KEYS[1], ARGV[2])
+redis.call("EXPIRE", KEYS[2], ARGV[2])
+return 1
+"""
+
+
+async def get_notes_version(user_id: str) -> str:
+    """Read before loading notes that are handed to ``cache_user_notes``.
+    Always from Redis: the check in the script is against Redis too."""
+    return await _read_version(notes_version_key(user_id), CACHE_TTLS[NOTES_KEYSPACE])
+
+
+def _queue_user_notes(pipe, user_id: str, notes: list[NoteRead], version: str):
+    state = ""
+    if len(notes) > db_settings.CACHE_NOTES_MAX_PER_USER:
+        notes, state = [], NOTES_OVER_CAP
+    elif not notes:
+        state = NOTES_EMPTY
+    pipe.eval(
+        REPLACE_NOTES_SCRIPT,
+        3,
+        notes_key(user_id),
+        notes_index_key(user_id),
+        notes_version_key(user_id),
+        version,
+        CACHE_TTLS[NOTES_KEYSPACE],
+        state,
+        *(
+            item
+            for n in notes
+            for item in (str(n.id), note_score(n.created_at), n.model_dump_json())
+        ),
+    )
+
+
+async def cache_user_notes(user_id: str, notes: list[NoteRead], version: str):
+    """Replace the user's cached list, or mark it as not cached when the user
+    has more notes than a cached list may hold."""
+    pipe = redis_client.pipeline(transaction=False)
+    _queue_user_notes(pipe, user_id, notes, version)
+    await execute_invalidating(pipe, (NOTES_KEYSPACE, user_id))
+
+
+async def warm_user_cache(
+    user_id: str, user: UserRead, notes: list[NoteRead], version: str
+):
+    """``cache_user_data`` and ``cache_user_notes`` in one round trip."""
+    pipe = redis_client.pipeline(transaction=False)
+    _queue_user_data(pipe, user_id, user)
+    _queue_user_notes(pipe, user_id, notes, version)
+    await execute_invalidating(
+        pipe, (USER_KEYSPACE, user_id), (NOTES_KEYSPACE, user_id)
+    )
+
+
+# Applies one note's change to a cached list, but only if the list is cached:
+# writing into a missing index would leave a partial list that pages would
+# then serve as complete. Either way the list gets a new version, so a list
+# loaded before the change is not cached. ARGV[2] is the score, empty for a
+# delete; ARGV[4] the TTL, ARGV[5] the most notes the list may hold before it
+# is marked over the cap and ARGV[6] the new version. A delete drops the
+# over-cap mark, so the next read finds out whether the list fits again.
+NOTE_DELTA_SCRIPT = """
+redis.call("SET", KEYS[3], ARGV[6], "EX", ARGV[4])
+local state = redis.call("HGET", KEYS[1], "_state")
+if state == "over_cap" then
+    if ARGV[2] == "" then
+        redis.call("DEL", KEYS[1])
+    end
+    return 0
+end
+if not state and redis.call("EXISTS", KEYS[2]) == 0 then
+    return 0
+end
+redis.call("HDEL", KEYS[1], "_state")
+if ARGV[2] == "" then
+    redis.call("HDEL", KEYS[1], ARGV[1])
+    redis.call("ZREM", KEYS[2], ARGV[1])
+else
+    redis.call("HSET", KEYS[1], ARGV[1], ARGV[3])
+    redis.call("ZADD", KEYS[2], ARGV[2], ARGV[1])
+end
+local count = redis.call("ZCARD", KEYS[2])
+if count > tonumber(ARGV[5]) then
+    redis.call("DEL", KEYS[1], KEYS[2])
+    redis.call("HSET", KEYS[1], "_state", "over_cap")
+    redis.call("EXPIRE", KEYS[1], ARGV[4])
+    return 0
+end
+if count == 0 then
+    redis.call("HSET", KEYS[1], "_state", "empty")
+end
+redis.call("EXPIRE", KEYS[1], ARGV[4])
+redis.call("EXPIRE", KEYS[2], ARGV[4])
+return 1
+"""
+
+
+async def update_cached_notes(
+    user_id: str,
+    changed: list[NoteRead] = (),
+    deleted: list[str] = (),
+    labels_changed: bool = False,
+):
+    """Apply created/updated and deleted notes to the cache in one round trip,
+    invalidating the shared labels in the same pipeline if any were created."""
+    keys = (
+        notes_key(user_id),
+        notes_index_key(user_id),
+        notes_version_key(user_id),
+    )
+    limits = (CACHE_TTLS[NOTES_KEYSPACE], db_settings.CACHE_NOTES_MAX_PER_USER)
+    # MULTI keeps the version bump and the delete together for readers.
+    pipe = redis_client.pipeline(transaction=True)
+    for note in changed:
+        pipe.eval(
+            NOTE_DELTA_SCRIPT,
+            3,
+            *keys,
+            str(note.id),
+            note_score(note.created_at),
+            note.model_dump_json(),
+            *limits,
+            new_version(),
+        )
+    for note_id in deleted:
+        pipe.eval(
+            NOTE_DELTA_SCRIPT,
+            3,
+            *keys,
+            str(note_id),
+            "",
+            "",
+            *limits,
+            new_version(),
+        )
+    invalidated = [
+        (NOTES_KEYSPACE, user_id),
+        (ETAG_KEYSPACE, notes_version_key(user_id)),
+    ]
+    if labels_changed:
+        pipe.incr(SHARED_LABELS_VERSION_KEY)
+        pipe.delete(SHARED_LABELS_KEY)
+        invalidated.append((LABELS_KEYSPACE, SHARED_LABELS_KEY))
+    await execute_invalidating(pipe, *invalidated)
+
+
+async def get_cached_notes_page(
+    user_id: str, limit: int, after: tuple[datetime, UUID] | None = None
+) -> bytes | None:
+    """The serialized ``NotePage`` of up to ``limit`` cached notes, newest
+    first, strictly after the ``(created_at, id)`` keyset. The body is kept
+    in the worker until the user's notes change.
 
+    Returns ``None`` when the page cannot be answered from the cache, and
+    ``NOTES_NOT_CACHED`` when the user has too many notes for the list to be
+    cached at all.
+    """
+    return await read_through(
+        NOTES_KEYSPACE,
+        user_id,
+        lambda: _read_notes_page(user_id, limit, after),
+        field=(limit, after),
+    )
+
+
+# The state of a list with no notes to page through: its ``_state`` field, or
+# "listed" when the index exists and the page is simply past its end.
+NOTES_STATE_SCRIPT = """
+local state = redis.call("HGET", KEYS[1], "_state")
+if state then
+    redis.call("EXPIRE", KEYS[1], ARGV[1])
+    return state
+end
+if redis.call("EXISTS", KEYS[2]) == 1 then
+    return "listed"
+end
+return false
+"""
+notes_state_script = redis_client.register_script(NOTES_STATE_SCRIPT)
+
+NOTES_NOT_CACHED = b""
+EMPTY_NOTES_PAGE = b'{"items":[],"next_cursor":null}'
+
+
+async def _read_notes_page(
+    user_id: str, limit: int, after: tuple[datetime, UUID] | None
+) -> bytes | None:
+    index = notes_index_key(user_id)
+    # One extra member tells us whether there is a next page.
+    count = limit + 1
+    if after is None:
+        members = await redis_client.zrevrange(index, 0, count - 1, withscores=True)
+    else:
+        score, note_id = note_score(after[0]), str(after[1])
+        # Notes sharing the cursor's timestamp sit at the top of the range and
+        # have to be skipped by id, so fetch enough to cover them.
+        ties = await redis_client.zcount(index, score, score)
+        candidates = await redis_client.zrevrangebyscore(
+            index, score, "-inf", start=0, num=count + ties, withscores=True
+        )
+        members = [
+            (member, member_score)
+            for member, member_score in candidates
+            if (int(member_score), member.decode()) < (score, note_id)
+        ][:count]
+
+    if not members:
+        state = await notes_state_script(
+            keys=[notes_key(user_id), index],
+            args=[CACHE_TTLS[NOTES_KEYSPACE]],
+            client=redis_client,
+        )
+        if state == NOTES_OVER_CAP.encode():
+            return NOTES_NOT_CACHED
+        if state in (NOTES_EMPTY.encode(), b"listed"):
+            return EMPTY_NOTES_PAGE
+        return None
+
+    page = members[:limit]
+    # Reading the page keeps the list alive.
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hmget(notes_key(user_id), [member for member, _ in page])
+    pipe.expire(notes_key(user_id), CACHE_TTLS[NOTES_KEYSPACE])
+    pipe.expire(index, CACHE_TTLS[NOTES_KEYSPACE])
+    data, *_ = await pipe.execute()
+    if None in data:
+        return None
+
+    next_cursor = None
+    if len(members) > limit:
+        member, member_score = page[-1]
+        next_cursor = encode_cursor(
+            score_created_at(member_score), UUID(member.decode())
+        )
+    return b"".join(
+        (
+            b'{"items":[',
+            b",".join(data),
+            b'],"next_cursor":',
+            json.dumps(next_cursor).encode(),
+            b"}",
+        )
+    )
+
+
+# Rebuilding a missing list
+#
+# Concurrent misses in one worker share a single load, and a short lock lets
+# only one worker at a time rebuild a user's list. The others do not wait for
+# it: they answer their page from the database, which the index keeps cheap,
+# and find the list cached once the rebuild commits.
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+release_lock_script = redis_client.register_script(RELEASE_LOCK_SCRIPT)
+
+_notes_rebuilds = SingleFlight()
+
+
+async def rebuild_user_notes(user_id: str, load) -> list[NoteRead] | None:
+    """Load the user's notes with ``load(user_id, count)`` and cache them.
+
+    The load is shared by every request waiting on the rebuild and outlives
+    the one that started it, so it must open its own session rather than use
+    a request's.
 
-async def get_cached_notes(username: str):
-    data = await redis_client.get(notes_key(username))
-    return json.loads(data) if data else []
+    Returns the loaded notes, or ``None`` when another worker holds the
+    rebuild or the user has too many notes to cache.
+    """
+    return await _notes_rebuilds.do(user_id, lambda: _rebuild_user_notes(user_id, load))
+
+
+async def _rebuild_user_notes(user_id: str, load) -> list[NoteRead] | None:
+    lock, token = notes_lock_key(user_id), secrets.token_hex(16)
+    acquired = await redis_client.set(
+        lock, token, nx=True, px=db_settings.CACHE_REBUILD_LOCK_MS
+    )
+    if not acquired:
+        return None
+
+    try:
+        version = await get_notes_version(user_id)
+        notes = await load(user_id, db_settings.CACHE_NOTES_MAX_PER_USER + 1)
+        # Over the cap only the mark is cached, which spares the next
+        # requests from loading a list that would not be cached either.
+        await cache_user_notes(user_id, notes, version)
+        if len(notes) > db_settings.CACHE_NOTES_MAX_PER_USER:
+            return None
+        return notes
+    finally:
+        await release_lock_script(keys=[lock], args=[token], client=redis_client)
 
 
 # Labels cache
-async def cache_user_labels(username: str, labels: list[dict]):
-    await redis_client.set(labels_key(username), json.dumps(labels, default=str))
+#
+# Workers serve their own copy until a label is created; after that the next
+# read costs an HGETALL. A copy loaded from the database is written back only
+# if the version has not moved in the meantime, so a slow reader cannot
+# overwrite a newer invalidation.
+CACHE_LABELS_SCRIPT = """
+if (redis.call("GET", KEYS[2]) or "") ~= ARGV[1] then
+    return 0
+end
+redis.call("DEL", KEYS[1])
+for i = 3, #ARGV, 2 do
+    redis.call("HSET", KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call("EXPIRE", KEYS[1], ARGV[2])
+return 1
+"""
+cache_labels_script = redis_client.register_script(CACHE_LABELS_SCRIPT)
+
+
+async def get_shared_labels(load, refresh: bool = False) -> dict[str, str]:
+    """Label names by id. ``load`` fetches them from the database on a miss,
+    or straight away with ``refresh``, for callers that found the cached copy
+    stale; the loaded copy then replaces it."""
+    if not refresh:
+        labels = local_cache.get(LABELS_KEYSPACE, SHARED_LABELS_KEY)
+        if labels is not None:
+            return labels
+
+    generation = local_cache.generation(LABELS_KEYSPACE)
+    if refresh:
+        version, cached = await redis_client.get(SHARED_LABELS_VERSION_KEY), None
+    else:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.get(SHARED_LABELS_VERSION_KEY)
+        pipe.hgetall(SHARED_LABELS_KEY)
+        pipe.expire(SHARED_LABELS_KEY, CACHE_TTLS[LABELS_KEYSPACE])
+        version, cached, _ = await pipe.execute()
+        local_cache.record_redis(LABELS_KEYSPACE, bool(cached))
+    if cached:
+        labels = {k.decode(): v.decode() for k, v in cached.items()}
+    else:
+        labels = await load()
+        await cache_labels_script(
+            keys=[SHARED_LABELS_KEY, SHARED_LABELS_VERSION_KEY],
+            args=[
+                version or b"",
+                CACHE_TTLS[LABELS_KEYSPACE],
+                *(item for pair in labels.items() for item in pair),
+            ],
+            client=redis_client,
+        )
+
+    local_cache.set(LABELS_KEYSPACE, SHARED_LABELS_KEY, labels, generation)
+    return labels
 
 
-async def get_cached_labels(username: str):
-    data = await redis_client.get(labels_key(username))
-    return json.loads(data) if data else []
+async def invalidate_user_tokens(user_id: str):
+    """Drop the user's signing key, and with it their verified tokens, from
+    every worker's token cache."""
+    pipe = redis_client.pipeline(transaction=False)
+    await execute_invalidating(pipe, (TOKENS_KEYSPACE, user_id))
 
 
 # Clear all
-async def clear_user_cache(username: str):
-    await redis_client.delete(
-        user_key(username), notes_key(username), labels_key(username)
+async def clear_user_cache(user_id: str):
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.delete(
+        user_key(user_id),
+        user_etag_key(user_id),
+        notes_key(user_id),
+        notes_index_key(user_id),
+        notes_version_key(user_id),
     )
+    await execute_invalidating(
+        pipe,
+        (USER_KEYSPACE, user_id),
+        (NOTES_KEYSPACE, user_id),
+        (ETAG_KEYSPACE, user_etag_key(user_id)),
+        (ETAG_KEYSPACE, notes_version_key(user_id)),
+    )
+
+
+# Memory accounting
+def keyspace_of(key: str) -> str:
+    if key.startswith(SHARED_LABELS_KEY):
+        return LABELS_KEYSPACE
+    for prefix in ("user:", "notes:", BLOCKLIST_PREFIX, "sticky:"):
+        if key.startswith(prefix):
+            return prefix.rstrip(":")
+    return "other"
+
+
+async def cache_memory_report(batch: int = 1000, max_keys: int | None = None) -> dict:
+    """Keys and bytes (``MEMORY USAGE``) per keyspace over the whole database,
+    or over the first ``max_keys`` keys SCAN returns, in which case the
+    report is marked ``truncated``.
+
+    SCANs the keys, so it is meant for sizing Redis, not for every request.
+    """
+    keyspaces = {}
+    scanned = 0
+
+    async def account(keys: list[str]):
+        pipe = redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.memory_usage(key)
+        for key, size in zip(keys, await pipe.execute()):
+            entry = keyspaces.setdefault(keyspace_of(key), {"keys": 0, "bytes": 0})
+            entry["keys"] += 1
+            entry["bytes"] += size or 0
+
+    keys = []
+    truncated = False
+    async for key in redis_client.scan_iter(count=batch):
+        if max_keys is not None and scanned >= max_keys:
+            truncated = True
+            break
+        keys.append(key.decode() if isinstance(key, bytes) else key)
+        scanned += 1
+        if len(keys) >= batch:
+            await account(keys)
+            keys = []
+    if keys:
+        await account(keys)
+    return {"keyspaces": keyspaces, "scanned": scanned, "truncated": truncated}
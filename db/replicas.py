@@ -0,0 +1,155 @@
+import asyncio
+from contextlib import contextmanager
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from db.redis import is_sticky_user, mark_sticky_user
+from utils.ttl_cache import TTLCache
+
+HEALTH_CHECK_TIMEOUT = 2
+
+
+class ReplicaSet:
+    """Read replicas for the API plus the read-your-writes bookkeeping.
+
+    Replicas failing the periodic ``SELECT 1`` are taken out of rotation
+    until they pass again. Users who wrote within ``sticky_seconds`` read
+    from the primary; the window lives in Redis so it holds across workers,
+    with a local copy to skip the round trip for this worker's own writers.
+    """
+
+    def __init__(self, engines: list, sticky_seconds: float, health_interval: float):
+        self.engines = engines
+        self.healthy = list(engines)
+        self.sticky_seconds = sticky_seconds
+        self.health_interval = health_interval
+        self._sticky = TTLCache(maxsize=10000, ttl=sticky_seconds)
+        self._next = 0
+        self._task: asyncio.Task | None = None
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def pick(self):
+        healthy = self.healthy
+        if not healthy:
+            return None
+        self._next = (self._next + 1) % len(healthy)
+        return healthy[self._next].sync_engine
+
+    async def stick(self, user_id) -> None:
+        if not self.engines:
+            return
+        self._sticky.set(str(user_id), True)
+        await mark_sticky_user(str(user_id), self.sticky_seconds)
+
+    async def is_sticky(self, user_id) -> bool:
+        if not self.engines:
+            return False
+        if self._sticky.get(str(user_id)):
+            return True
+        return await is_sticky_user(str(user_id))
+
+    async def check(self) -> None:
+        healthy = []
+        for engine in self.engines:
+            try:
+                async with asyncio.timeout(HEALTH_CHECK_TIMEOUT):
+                    async with engine.connect() as connection:
+                        await connection.execute(text("SELECT 1"))
+            except Exception:
+                continue
+            healthy.append(engine)
+        self.healthy = healthy
+
+    async def _monitor(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await self.check()
+
+    async def start(self) -> None:
+        if self.engines and self._task is None:
+            await self.check()
+            self._task = asyncio.create_task(self._monitor())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+class RoutingSession(Session):
+    """Sends reads made under ``replica_reads`` to a healthy replica.
+
+    Everything else, reads inside ``primary_reads``, and every read once the
+    session has written or was pinned with ``use_primary``, goes to the
+    primary bind.
+    """
+
+    def __init__(self, *args, replicas: ReplicaSet | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if (
+            self.replicas
+            and self.info.get("replica")
+            and not self.info.get("primary")
+            and not self._flushing
+        ):
+            replica = self.replicas.pick()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def pin_primary_after_write(session, flush_context):
+    session.info["primary"] = True
+
+
+@contextmanager
+def replica_reads(db: AsyncSession | Session):
+    previous = db.info.get("replica", False)
+    db.info["replica"] = True
+    try:
+        yield
+    finally:
+        db.info["replica"] = previous
+
+
+def use_primary(db: AsyncSession | Session) -> None:
+    db.info["primary"] = True
+
+
+@contextmanager
+def primary_reads(db: AsyncSession | Session):
+    """Keep the reads in the block on the primary, for results that get cached:
+    a lagging replica would be served from the cache long after it caught up."""
+    previous = db.info.get("primary", False)
+    db.info["primary"] = True
+    try:
+        yield
+    finally:
+        db.info["primary"] = previous
+
+
+def _replicas(db: AsyncSession) -> ReplicaSet | None:
+    return getattr(db.sync_session, "replicas", None)
+
+
+async def pin_sticky_reads(db: AsyncSession, user_id) -> None:
+    replicas = _replicas(db)
+    if replicas and await replicas.is_sticky(user_id):
+        use_primary(db)
+
+
+async def commit(db: AsyncSession, user_id) -> None:
+    """Commit and keep ``user_id``'s reads on the primary for the sticky window."""
+    await db.commit()
+    replicas = _replicas(db)
+    if replicas:
+        await replicas.stick(user_id)
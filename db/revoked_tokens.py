@@ -0,0 +1,87 @@
+import json
+import time
+
+from db.subscriber import ChannelSubscriber
+
+BLOCKLIST_PREFIX = "blocklist:"
+# Sorted set of revoked JTIs scored by their token's exp, so a seed reads only
+# the live revocations instead of scanning the keyspace for them.
+REVOKED_TOKENS_KEY = f"{BLOCKLIST_PREFIX}revoked"
+# Entries written before the sorted set sit under the bare JTI, a UUID, and
+# expire an hour after they were written; migrate_legacy_entries moves them
+# over once. Drop it once a release with the set has been out that long.
+LEGACY_BLOCKLIST_PATTERN = "????????-????-????-????-????????????"
+LEGACY_MIGRATED_KEY = f"{BLOCKLIST_PREFIX}legacy-migrated"
+BLOCKLIST_CHANNEL = "blocklist"
+PRUNE_INTERVAL = 60
+
+
+async def migrate_legacy_entries(client) -> None:
+    """Move revocations kept under the bare JTI into the sorted set.
+
+    Scans the whole keyspace, so it is marked done after the first complete
+    pass. The move is idempotent: workers starting together may each make it.
+    Legacy entries hold no exp; each one's remaining TTL stands in for it.
+    """
+    if await client.exists(LEGACY_MIGRATED_KEY):
+        return
+
+    keys = [
+        key
+        async for key in client.scan_iter(match=LEGACY_BLOCKLIST_PATTERN, count=1000)
+    ]
+    if keys:
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            pipe.ttl(key)
+        now = time.time()
+        revoked = {
+            key: now + ttl for key, ttl in zip(keys, await pipe.execute()) if ttl > 0
+        }
+        if revoked:
+            await client.zadd(REVOKED_TOKENS_KEY, revoked)
+    await client.set(LEGACY_MIGRATED_KEY, 1)
+
+
+class RevokedTokenFilter(ChannelSubscriber):
+    """Per-worker copy of the revoked JTIs held in Redis.
+
+    The copy is seeded from Redis and then kept current through the
+    blocklist pub/sub channel. While it is not ``ready`` (startup, lost
+    subscription) every lookup has to be answered by Redis.
+    """
+
+    channel = BLOCKLIST_CHANNEL
+
+    def __init__(self):
+        super().__init__()
+        self._revoked: dict[str, float] = {}
+        self._next_prune = 0.0
+
+    def add(self, jti: str, expires_at: float) -> None:
+        now = time.time()
+        if expires_at > now:
+            self._revoked[jti] = expires_at
+        if now >= self._next_prune:
+            self._revoked = {k: v for k, v in self._revoked.items() if v > now}
+            self._next_prune = now + PRUNE_INTERVAL
+
+    def might_contain(self, jti: str) -> bool:
+        return not self.ready or jti in self._revoked
+
+    async def _seed(self, client) -> None:
+        entries = await client.zrangebyscore(
+            REVOKED_TOKENS_KEY, time.time(), "+inf", withscores=True
+        )
+        self._revoked = {
+            jti.decode() if isinstance(jti, bytes) else jti: exp
+            for jti, exp in entries
+        }
+
+    async def on_subscribed(self, client) -> None:
+        await migrate_legacy_entries(client)
+        await self._seed(client)
+
+    def on_message(self, data: bytes) -> None:
+        entry = json.loads(data)
+        self.add(entry["jti"], entry["exp"])
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+STOP_RETRY_DELAY = 0.05
+RESYNC_DELAY = 5
+
+
+class ChannelSubscriber:
+    """Keeps per-worker state in step with a Redis pub/sub channel.
+
+    A background task subscribes to ``channel``, calls ``on_subscribed`` to
+    resync whatever may have changed while it was not listening, and then
+    hands every message to ``on_message``. When the connection is lost it
+    calls ``on_unsubscribed``, waits ``RESYNC_DELAY`` and starts over; the
+    state is only ``ready`` in between.
+    """
+
+    channel: str
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+        self.ready = False
+
+    async def on_subscribed(self, client) -> None:
+        pass
+
+    def on_message(self, data: bytes) -> None:
+        raise NotImplementedError
+
+    def on_unsubscribed(self) -> None:
+        pass
+
+    async def _sync(self, client) -> None:
+        while True:
+            pubsub = client.pubsub()
+            try:
+                # Subscribe before resyncing so messages published meanwhile
+                # are not lost.
+                await pubsub.subscribe(self.channel)
+                await self.on_subscribed(client)
+                self.ready = True
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.on_message(message["data"])
+            except (RedisError, OSError, ValueError, KeyError):
+                logger.warning(
+                    "Lost the %s subscription, resyncing in %ss",
+                    self.channel,
+                    RESYNC_DELAY,
+                    exc_info=True,
+                )
+            finally:
+                self.ready = False
+                self.on_unsubscribed()
+                await pubsub.aclose()
+            await asyncio.sleep(RESYNC_DELAY)
+
+    def start(self, client) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._sync(client))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            # redis-py occasionally swallows a cancel inside pubsub.listen(),
+            # which would leave shutdown waiting forever; repeat until done.
+            while not self._task.done():
+                self._task.cancel()
+                await asyncio.wait({self._task}, timeout=STOP_RETRY_DELAY)
+            self._task = None
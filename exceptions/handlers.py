@@ -3,6 +3,7 @@ from fastapi.responses import JSONResponse
 
 from exceptions.auth import AuthError
 from exceptions.orm import UserAlreadyExist, UserNotFound
+from exceptions.service import RateLimitExceeded, ServiceBusy
 
 
 def register_all_errors(app: FastAPI):
@@ -25,3 +26,19 @@ def register_all_errors(app: FastAPI):
     @app.exception_handler(AuthError)
     async def auth_error_handler(request: Request, exc: AuthError):
         return JSONResponse(status_code=401, content={"detail": exc.message})
+
+    @app.exception_handler(ServiceBusy)
+    async def service_busy_handler(request: Request, exc: ServiceBusy):
+        return JSONResponse(
+            status_code=exc.status_code,
+            headers={"Retry-After": str(exc.retry_after)},
+            content={"detail": exc.detail},
+        )
+
+    @app.exception_handler(RateLimitExceeded)
+    async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+        return JSONResponse(
+            status_code=exc.status_code,
+            headers={"Retry-After": str(exc.retry_after)},
+            content={"detail": exc.detail},
+        )
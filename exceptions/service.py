@@ -0,0 +1,24 @@
+from fastapi import status
+
+
+class ServiceBusy(Exception):
+    """Custom exception for saturated internal services"""
+
+    def __init__(
+        self,
+        detail: str,
+        status_code: int = status.HTTP_503_SERVICE_UNAVAILABLE,
+        retry_after: int = 1,
+    ):
+        self.detail = detail
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class RateLimitExceeded(Exception):
+    """Custom exception for clients over a route's rate limit"""
+
+    def __init__(self, detail: str, retry_after: int):
+        self.detail = detail
+        self.status_code = status.HTTP_429_TOO_MANY_REQUESTS
+        self.retry_after = retry_after
@@ -1,13 +1,22 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
 
+from auth.hashing import password_hasher
+from config.config_loader import api_settings
+from db.database import dispose_engines, replica_set
+from db.redis import (close_redis, start_blocklist_sync, start_cache_sync,
+                      stop_blocklist_sync, stop_cache_sync)
 from exceptions.handlers import register_all_errors
-from middleware.throttling import limiter, rate_limit_exceeded_handler
+from middleware.profiling import ProfilingMiddleware
+from middleware.request_metrics import RequestMetricsMiddleware
 from routes.auth_router import auth_router
+from routes.metrics_router import metrics_router
 from routes.note_router import note_router
 from routes.user_route import user_router
+from utils.request_metrics import request_metrics
+from utils.sampling_profiler import ProfileStore, SamplingProfiler
 
 version = "v1"
 
@@ -17,6 +26,22 @@ A REST API for Fundoo - A note making application
 
 version_prefix = f"/api/{version}"
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_blocklist_sync()
+    await start_cache_sync()
+    await replica_set.start()
+    yield
+    await replica_set.stop()
+    await stop_cache_sync()
+    await stop_blocklist_sync()
+    password_hasher.shutdown()
+    # Close connections cleanly instead of leaving them to process exit.
+    await dispose_engines()
+    await close_redis()
+
+
 fundoo_api = FastAPI(
     title="Fundoo",
     version=version,
@@ -30,15 +55,11 @@ fundoo_api = FastAPI(
     redoc_url=f"{version_prefix}/redoc",
     openapi_url=f"{version_prefix}/openapi.json",
     license_info={"name": "MIT License", "url": "https://opensource.org/license/mit"},
+    lifespan=lifespan,
 )
 
 register_all_errors(fundoo_api)
 
-fundoo_api.state.limiter = limiter
-fundoo_api.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
-fundoo_api.add_middleware(SlowAPIMiddleware)
-
-
 fundoo_api.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -47,6 +68,20 @@ fundoo_api.add_middleware(
     allow_headers=["*"],
 )
 
+fundoo_api.add_middleware(
+    ProfilingMiddleware,
+    profiler=SamplingProfiler(interval=api_settings.PROFILER_INTERVAL_SECONDS),
+    store=ProfileStore(
+        api_settings.PROFILER_OUTPUT_DIR, api_settings.PROFILER_MAX_DISK_BYTES
+    ),
+    sample_rate=api_settings.PROFILER_SAMPLE_RATE,
+    secret=api_settings.PROFILER_SECRET,
+)
+
+# Added last so it is the outermost layer and times the whole stack.
+fundoo_api.add_middleware(RequestMetricsMiddleware, metrics=request_metrics)
+
 fundoo_api.include_router(user_router, prefix=f"{version_prefix}/users")
 fundoo_api.include_router(auth_router, prefix=f"{version_prefix}/auth")
 fundoo_api.include_router(note_router, prefix=f"{version_prefix}/notes")
+fundoo_api.include_router(metrics_router, prefix=f"{version_prefix}/metrics")
@@ -1,11 +1,79 @@
+"""Starts the API.
+
+    python main.py                           # one process, reloads on change
+    python main.py --production --workers 4  # deployments
+
+Production mode runs ``--workers`` uvicorn processes behind one listening
+socket. The workers are spawned, not forked, and import the app themselves,
+so each one creates its own database engines and Redis pool; this module
+must not import the app for the same reason. On SIGTERM every worker stops
+accepting connections, finishes in-flight requests for up to
+``--graceful-timeout`` seconds and then closes its pools.
+"""
+
+import argparse
+import os
+
 import uvicorn
 
 from config.config_loader import api_settings
 
-if __name__ == "__main__":
-    uvicorn.run(
-        app="fundoo.api:fundoo_api",
-        host=api_settings.API_HOST,
-        port=api_settings.API_PORT,
-        reload=True,
+APP = "fundoo.api:fundoo_api"
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the Fundoo API.")
+    parser.add_argument("--production", action="store_true")
+    parser.add_argument("--host", default=api_settings.API_HOST)
+    parser.add_argument("--port", type=int, default=api_settings.API_PORT)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=api_settings.API_WORKERS,
+        help="worker processes; 0 starts one per CPU",
+    )
+    parser.add_argument(
+        "--loop", choices=["auto", "asyncio", "uvloop"], default=api_settings.API_LOOP
+    )
+    parser.add_argument(
+        "--http", choices=["auto", "h11", "httptools"], default=api_settings.API_HTTP
     )
+    parser.add_argument("--backlog", type=int, default=api_settings.API_BACKLOG)
+    parser.add_argument(
+        "--keep-alive", type=int, default=api_settings.API_KEEPALIVE_SECONDS
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=api_settings.API_GRACEFUL_SHUTDOWN_SECONDS,
+    )
+    parser.add_argument("--access-log", action="store_true")
+    return parser.parse_args(argv)
+
+
+def production_options(args: argparse.Namespace) -> dict:
+    return {
+        "host": args.host,
+        "port": args.port,
+        "workers": args.workers or os.cpu_count() or 1,
+        "loop": args.loop,
+        "http": args.http,
+        "backlog": args.backlog,
+        "timeout_keep_alive": args.keep_alive,
+        "timeout_graceful_shutdown": args.graceful_timeout,
+        "proxy_headers": True,
+        "forwarded_allow_ips": api_settings.API_FORWARDED_ALLOW_IPS,
+        "access_log": args.access_log,
+    }
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    if args.production:
+        uvicorn.run(app=APP, **production_options(args))
+    else:
+        uvicorn.run(app=APP, host=args.host, port=args.port, reload=True)
+
+
+if __name__ == "__main__":
+    main()
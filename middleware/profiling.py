@@ -0,0 +1,128 @@
+import hashlib
+import hmac
+import os
+import random
+import re
+import secrets
+import sys
+import time
+
+from redis.exceptions import RedisError
+from starlette.concurrency import run_in_threadpool
+
+from db.redis import get_profiler_sample_rate
+from middleware.request_metrics import route_template
+from utils.sampling_profiler import ProfileStore, SamplingProfiler
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+# How stale a worker's copy of the admin toggle may get.
+TOGGLE_REFRESH_SECONDS = 5
+
+
+def sign_profile_token(secret: str, ttl: int) -> str:
+    """An ``X-Profile`` header value accepted for the next ``ttl`` seconds."""
+    expires = str(int(time.time()) + ttl)
+    signature = hmac.new(secret.encode(), expires.encode(), hashlib.sha256)
+    return f"{expires}.{signature.hexdigest()}"
+
+
+def verify_profile_token(secret: str, token: str) -> bool:
+    if not secret:
+        return False
+    expires, _, signature = token.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    expected = hmac.new(secret.encode(), expires.encode(), hashlib.sha256)
+    return hmac.compare_digest(expected.hexdigest(), signature)
+
+
+class ProfilingMiddleware:
+    """Profiles a fraction of requests, and any request sent with a valid
+    signed ``X-Profile`` header, and saves each as a collapsed-stack file.
+
+    The fraction is ``sample_rate``, or the rate set with the admin toggle
+    while it lasts. A profiled response carries the file's name in
+    ``X-Profile-Id``; the file is written after the response is sent.
+    """
+
+    def __init__(
+        self,
+        app,
+        profiler: SamplingProfiler,
+        store: ProfileStore,
+        sample_rate: float = 0,
+        secret: str = "",
+    ):
+        self.app = app
+        self.profiler = profiler
+        self.store = store
+        self.sample_rate = sample_rate
+        self.secret = secret
+        self._toggle_rate = 0.0
+        self._toggle_checked = float("-inf")
+
+    async def toggle_rate(self) -> float:
+        # Only operators holding the secret can set the toggle.
+        if not self.secret:
+            return 0.0
+        now = time.monotonic()
+        if now - self._toggle_checked >= TOGGLE_REFRESH_SECONDS:
+            self._toggle_checked = now
+            try:
+                self._toggle_rate = await get_profiler_sample_rate()
+            except (RedisError, OSError, ValueError):
+                self._toggle_rate = 0.0
+        return self._toggle_rate
+
+    async def should_profile(self, scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return verify_profile_token(self.secret, value.decode("latin-1"))
+        rate = max(self.sample_rate, await self.toggle_rate())
+        return rate > 0 and random.random() < rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not await self.should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = "{}-{}-{}".format(
+            time.strftime("%Y%m%dT%H%M%S"), os.getpid(), secrets.token_hex(4)
+        )
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (PROFILE_ID_HEADER, profile_id.encode()),
+                ]
+            await send(message)
+
+        session = self.profiler.start(scope["method"], sys._getframe())
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            self.profiler.stop(session)
+            session.label = f"{scope['method']} {route_template(scope)}"
+            slug = re.sub(r"[^A-Za-z0-9]+", "_", session.label).strip("_")
+            try:
+                await run_in_threadpool(
+                    self.store.save, f"{profile_id}-{slug}", session.folded()
+                )
+            except OSError:
+                # The response is already out; a full disk costs the profile.
+                pass
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from config.config_loader import api_settings
+
+    parser = argparse.ArgumentParser(description="Print an X-Profile header value.")
+    parser.add_argument("--ttl", type=int, default=600, help="seconds it is valid")
+    args = parser.parse_args()
+    if not api_settings.PROFILER_SECRET:
+        parser.error("PROFILER_SECRET is not set")
+    print(sign_profile_token(api_settings.PROFILER_SECRET, args.ttl))
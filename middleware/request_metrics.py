@@ -0,0 +1,69 @@
+import time
+
+from utils.request_metrics import (UNMATCHED_ROUTE, RequestMetrics,
+                                   RequestTimings, request_timings)
+
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    if route is None:
+        return UNMATCHED_ROUTE
+    # Included routers match on their own paths, so the router prefix is
+    # taken from the part of the URL in front of what the route matched.
+    tail = route.path_format.format(**scope.get("path_params", {}))
+    path = scope["path"]
+    if path.endswith(tail):
+        return path[: len(path) - len(tail)] + route.path
+    return route.path
+
+
+class RequestMetricsMiddleware:
+    """Records every HTTP request under the template of the route it matched.
+
+    A plain ASGI middleware: it wraps ``send`` to learn the status and stops
+    the clock at the last body chunk, so background tasks that run after the
+    response are not counted against the route.
+    """
+
+    def __init__(self, app, metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+        started = time.perf_counter()
+        status = 500
+        recorded = False
+
+        def record():
+            nonlocal recorded
+            recorded = True
+            self.metrics.record(
+                scope["method"],
+                route_template(scope),
+                status,
+                time.perf_counter() - started,
+                timings,
+            )
+
+        async def send_recording(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                record()
+
+        try:
+            await self.app(scope, receive, send_recording)
+        finally:
+            if not recorded:
+                record()
+            request_timings.reset(token)
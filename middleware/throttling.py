@@ -1,15 +1,83 @@
+import functools
+import inspect
+import math
+import re
+
 from fastapi import Request
-from fastapi.responses import JSONResponse
-from slowapi import Limiter
-from slowapi.errors import RateLimitExceeded
-from slowapi.util import get_remote_address
+from redis.exceptions import RedisError
+
+from config.config_loader import api_settings
+from db.redis import hit_rate_limit, rate_limit_key
+from exceptions.service import RateLimitExceeded
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_RATE = re.compile(r"(\d+)\s*/\s*(\d+)?\s*(second|minute|hour|day)s?")
+
+
+def parse_rate(rate: str) -> tuple[int, int]:
+    """``"5/minute"`` or ``"100/10 minutes"`` -> (limit, window in ms)."""
+    match = _RATE.fullmatch(rate.strip())
+    if match is None:
+        raise ValueError(f"Invalid rate limit: {rate!r}")
+    count, multiple, period = match.groups()
+    return int(count), int(multiple or 1) * PERIODS[period] * 1000
+
+
+def client_key(request: Request) -> str:
+    identity = getattr(request.state, "identity", None)
+    if identity is not None:
+        return f"user:{identity.user_id}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+class Limiter:
+    """Per-route rate limits kept in Redis and shared by every worker.
+
+    ``limit`` wraps an endpoint that takes ``request: Request``. The check
+    runs when the endpoint is called, after its dependencies, so routes
+    behind a token bearer are limited per user and the others per client IP.
+    Routes passing the same ``scope`` share one budget.
+    """
+
+    def __init__(self, enabled: bool = True, key_func=client_key):
+        self.enabled = enabled
+        self.key_func = key_func
+
+    def limit(self, rate: str, scope: str | None = None):
+        limit, window_ms = parse_rate(rate)
+
+        def decorator(endpoint):
+            if "request" not in inspect.signature(endpoint).parameters:
+                raise TypeError(f"{endpoint.__name__} needs a 'request' parameter")
+            route_scope = scope or f"{endpoint.__module__}.{endpoint.__name__}"
+
+            @functools.wraps(endpoint)
+            async def wrapper(*args, **kwargs):
+                await self.check(kwargs["request"], route_scope, limit, window_ms)
+                return await endpoint(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    async def check(
+        self, request: Request, scope: str, limit: int, window_ms: int
+    ) -> None:
+        if not self.enabled:
+            return
 
-limiter = Limiter(key_func=get_remote_address)
+        key = rate_limit_key(scope, self.key_func(request))
+        try:
+            accepted, value = await hit_rate_limit(key, limit, window_ms)
+        except (RedisError, OSError):
+            # Serving without limits beats failing every request while
+            # Redis is unreachable.
+            return
+        if not accepted:
+            raise RateLimitExceeded(
+                detail="Rate limit exceeded. Try again later.",
+                retry_after=max(1, math.ceil(value / 1000)),
+            )
 
 
-def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
-    return JSONResponse(
-        status_code=exc.status_code,
-        headers=request.headers,
-        content={"detail": "Rate limit exceeded. Try again later."},
-    )
+limiter = Limiter(enabled=api_settings.RATELIMIT_ENABLED)
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime, timedelta
 
-from sqlalchemy import DateTime, ForeignKey, String, func
+from sqlalchemy import DateTime, ForeignKey, Index, String, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -11,6 +11,12 @@ from models.note_label import note_label_association
 
 class Note(Base):
     __tablename__ = "notes"
+    __table_args__ = (
+        # A user's notes, newest first; lookups by id use the primary key.
+        Index("ix_notes_user_id_created_at_id", "user_id", "created_at", "id"),
+        # The expiry reminder scans everything expiring before a cutoff.
+        Index("ix_notes_expiry", "expiry"),
+    )
 
     id: Mapped[UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -34,6 +40,5 @@ class Note(Base):
     labels: Mapped[list["Label"]] = relationship(
         secondary=note_label_association,
         back_populates="notes",
-        cascade="all",
         passive_deletes=True,
     )
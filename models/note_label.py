@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Table
+from sqlalchemy import Column, ForeignKey, Index, Table
 from sqlalchemy.dialects.postgresql import UUID
 
 from db.database import Base
@@ -18,4 +18,6 @@ note_label_association = Table(
         ForeignKey("labels.id", ondelete="CASCADE"),
         primary_key=True,
     ),
+    # The primary key leads with note_id; this serves label -> notes.
+    Index("ix_note_label_association_label_id_note_id", "label_id", "note_id"),
 )
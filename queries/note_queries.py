@@ -1,36 +1,133 @@
+import uuid
+from datetime import datetime
 from typing import List
 from uuid import UUID
 
-from sqlalchemy.orm import Session
+from sqlalchemy import false, select, true, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload, subqueryload
 
+from db.database import asyncSessionLocal
+from db.replicas import commit, replica_reads, use_primary
 from models.label import Label
 from models.note import Note
+from models.note_label import note_label_association
 from models.user import User
-from schema.note_schema import NoteCreate
+from schema.note_schema import NoteBatchOperation, NoteCreate, NoteRead
 
+# How ``Note.labels`` is loaded alongside a note query. Each costs a fixed
+# number of statements however many notes come back:
+#   selectin - one extra SELECT ... WHERE note_id IN (...) per query
+#   joined   - LEFT OUTER JOIN in the same statement, best for a single note
+#   subquery - one extra SELECT that re-runs the note query as a subquery
+LABEL_LOADERS = {
+    "selectin": selectinload,
+    "joined": joinedload,
+    "subquery": subqueryload,
+}
 
-class NoteQueries:
+
+def load_labels(strategy: str):
+    if strategy not in LABEL_LOADERS:
+        raise ValueError(f"Unknown label loading strategy: {strategy}")
+    return LABEL_LOADERS[strategy](Note.labels)
+
+
+def clean_label_names(names: list[str]) -> list[str]:
+    # A note can only carry a label once.
+    return list(dict.fromkeys(name.strip() for name in names))
+
+
+def upsert_labels(names: list[str]):
+    """One statement that creates the missing labels and returns all of them,
+    each with whether it was just created.
+
+    The CTE inserts every name and skips the ones that already exist; the
+    statement's snapshot predates the insert, so the second half of the union
+    sees exactly the labels that were skipped.
+    """
+    inserted = (
+        insert(Label)
+        .values([{"id": uuid.uuid4(), "name": name} for name in names])
+        .on_conflict_do_nothing(index_elements=[Label.name])
+        .returning(Label.id, Label.name)
+        .cte("inserted")
+    )
+    existing = select(Label.id, Label.name, false().label("created")).where(
+        Label.name.in_(names)
+    )
+    labels = select(inserted.c.id, inserted.c.name, true().label("created"))
+    labels = labels.union_all(existing)
+    return select(Label, labels.selected_columns.created).from_statement(labels)
+
+
+def missing_label_names(rows, names: list[str]) -> list[str]:
+    """Names the upsert neither created nor found: another transaction
+    created them after the statement's snapshot. The rows it did return
+    are kept, so the labels it created are still flagged."""
+    found = {label.name for label, _ in rows}
+    return [name for name in names if name not in found]
+
+
+def collect_labels(db, rows, names: list[str]) -> list[Label]:
+    """The labels in the order they were named; flags the session if any of
+    them was created."""
+    by_name = {}
+    for label, created in rows:
+        by_name[label.name] = label
+        if created:
+            db.info["labels_created"] = True
+    return [by_name[name] for name in names]
+
+
+def labels_created(db) -> bool:
+    """Whether the session created labels since it was last asked."""
+    return db.info.pop("labels_created", False)
+
+
+class AsyncNoteQueries:
 
     @staticmethod
-    def get_or_create_label(db: Session, label_name: str) -> Label:
-        label = db.query(Label).filter_by(name=label_name.strip()).first()
-        if label:
-            return label
-        new_label = Label(name=label_name.strip())
-        db.add(new_label)
-        db.commit()
-        db.refresh(new_label)
-        return new_label
+    async def get_or_create_labels(
+        db: AsyncSession, label_names: list[str]
+    ) -> list[Label]:
+        """Resolve label names inside the caller's transaction."""
+        names = clean_label_names(label_names)
+        if not names:
+            return []
+
+        rows = (await db.execute(upsert_labels(names))).all()
+        missing = missing_label_names(rows, names)
+        if missing:
+            # Created by a transaction that committed after our snapshot.
+            rows += (
+                await db.execute(select(Label, false()).where(Label.name.in_(missing)))
+            ).all()
+        return collect_labels(db, rows, names)
 
     @staticmethod
-    def get_all_labels(db: Session) -> list[Label]:
-        return db.query(Label).all()
+    async def get_all_labels(db: AsyncSession) -> list[Label]:
+        """From the primary: the result becomes the shared copy under the
+        current labels version, which a lagging replica could predate."""
+        return list(await db.scalars(select(Label)))
 
     @staticmethod
-    def create_note(db: Session, user: User, note_data: NoteCreate) -> Note:
-        labels = [
-            NoteQueries.get_or_create_label(db, name) for name in note_data.labels
-        ]
+    async def get_user_label_ids(db: AsyncSession, user: User) -> list[UUID]:
+        """Ids of the labels on any of the user's notes."""
+        with replica_reads(db):
+            return list(
+                await db.scalars(
+                    select(note_label_association.c.label_id)
+                    .join(Note, Note.id == note_label_association.c.note_id)
+                    .where(Note.user_id == user.id)
+                    .distinct()
+                )
+            )
+
+    @staticmethod
+    async def create_note(db: AsyncSession, user: User, note_data: NoteCreate) -> Note:
+        labels = await AsyncNoteQueries.get_or_create_labels(db, note_data.labels)
 
         note = Note(
             title=note_data.title,
@@ -40,32 +137,130 @@ class NoteQueries:
         )
 
         db.add(note)
-        db.commit()
-        db.refresh(note)
+        await commit(db, user.id)
+        await db.refresh(note, ["created_at"])
         return note
 
     @staticmethod
-    def get_user_notes(db: Session, user: User) -> List[Note]:
-        return db.query(Note).filter(Note.user_id == user.id).all()
+    async def get_user_notes(
+        db: AsyncSession,
+        user_id: UUID,
+        limit: int | None = None,
+        after: tuple[datetime, UUID] | None = None,
+        labels: str = "selectin",
+    ) -> List[Note]:
+        """Newest first; ``after`` is the (created_at, id) keyset of the last
+        note already seen."""
+        query = (
+            select(Note)
+            .where(Note.user_id == user_id)
+            .order_by(Note.created_at.desc(), Note.id.desc())
+            # Relationships cannot lazy load under asyncio, so labels come eagerly.
+            .options(load_labels(labels))
+        )
+        if after is not None:
+            query = query.where(tuple_(Note.created_at, Note.id) < after)
+        if limit is not None:
+            query = query.limit(limit)
+
+        with replica_reads(db):
+            return list((await db.scalars(query)).unique())
 
     @staticmethod
-    def get_note_by_id(db: Session, note_id: UUID, user: User) -> Note | None:
-        return (
-            db.query(Note).filter(Note.id == note_id, Note.user_id == user.id).first()
+    async def get_note_by_id(
+        db: AsyncSession, note_id: UUID, user: User, labels: str = "joined"
+    ) -> Note | None:
+        query = (
+            select(Note)
+            .where(Note.id == note_id, Note.user_id == user.id)
+            .options(load_labels(labels))
         )
+        with replica_reads(db):
+            return (await db.scalars(query)).unique().one_or_none()
 
     @staticmethod
-    def delete_note(db: Session, note: Note):
-        db.delete(note)
-        db.commit()
+    async def delete_note(db: AsyncSession, note: Note):
+        await db.delete(note)
+        await commit(db, note.user_id)
 
     @staticmethod
-    def update_note(db: Session, note: Note, note_data: NoteCreate):
+    async def update_note(db: AsyncSession, note: Note, note_data: NoteCreate):
         note.title = note_data.title
         note.content = note_data.content
-        note.labels = [
-            NoteQueries.get_or_create_label(db, name) for name in note_data.labels
-        ]
-        db.commit()
-        db.refresh(note)
+        note.labels = await AsyncNoteQueries.get_or_create_labels(db, note_data.labels)
+        await commit(db, note.user_id)
         return note
+
+    @staticmethod
+    async def apply_batch(
+        db: AsyncSession, user: User, operations: list[NoteBatchOperation]
+    ) -> list[Note | None]:
+        """Apply create/update/delete operations in one transaction.
+
+        The target notes are loaded in one query and every label in the batch is
+        resolved in one upsert; the inserts, updates and deletes are batched by
+        the flush. Returns, per operation, the affected note, or ``None`` where
+        the note does not exist (or was deleted earlier in the batch).
+        """
+        ids = {operation.id for operation in operations if operation.op != "create"}
+        notes = {}
+        if ids:
+            notes = {
+                note.id: note
+                for note in await db.scalars(
+                    select(Note)
+                    .where(Note.user_id == user.id, Note.id.in_(ids))
+                    .options(load_labels("selectin"))
+                )
+            }
+
+        labels = {
+            label.name: label
+            for label in await AsyncNoteQueries.get_or_create_labels(
+                db,
+                [
+                    name
+                    for operation in operations
+                    if operation.op != "delete"
+                    for name in operation.note.labels
+                ],
+            )
+        }
+
+        results = []
+        for operation in operations:
+            if operation.op == "create":
+                note = Note(id=uuid.uuid4(), user_id=user.id)
+                db.add(note)
+            else:
+                note = notes.pop(operation.id, None)
+                if note is None:
+                    results.append(None)
+                    continue
+
+            if operation.op == "delete":
+                await db.delete(note)
+            else:
+                note.title = operation.note.title
+                note.content = operation.note.content
+                note.labels = [
+                    labels[name] for name in clean_label_names(operation.note.labels)
+                ]
+                notes[note.id] = note
+            results.append(note)
+
+        await commit(db, user.id)
+        return results
+
+
+async def load_user_notes(user_id: str, count: int) -> list[NoteRead]:
+    """The user's newest ``count`` notes, for the note list cache.
+
+    Opens its own session: the login warm-up runs after the response, and a
+    list rebuild is shared by requests that may each be gone before it ends.
+    Reads from the primary, since the result becomes the cached copy.
+    """
+    async with asyncSessionLocal() as db:
+        use_primary(db)
+        notes = await AsyncNoteQueries.get_user_notes(db, UUID(user_id), count)
+    return [NoteRead.model_validate(note) for note in notes]
@@ -1,9 +1,11 @@
 import secrets
 
 from fastapi import status
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from auth.authentication import Auth
+from db.replicas import commit, replica_reads
 from models.user import User
 from schema.user_schema import UserCreate, UserRead, UserSuccessResponse
 
@@ -22,16 +24,17 @@ class UserQueries:
         return db.query(User).filter(User.email == email).count() > 0
 
     @staticmethod
-    def create_user(db: Session, user_data: UserCreate) -> User | None:
+    def create_user(
+        db: Session, user_data: UserCreate, password_hash: str
+    ) -> User | None:
         user_details = user_data.model_dump()
-        hashed_pw = Auth.hash_password(user_details.get("password"))
         secret_key = secrets.token_urlsafe(64)
         new_user = User(
             username=user_details.get("username"),
             email=user_details.get("email"),
             first_name=user_details.get("first_name"),
             last_name=user_details.get("last_name"),
-            password_hash=hashed_pw,
+            password_hash=password_hash,
             secret_key=secret_key,
         )
 
@@ -46,3 +49,50 @@ class UserQueries:
         db.query(User).filter(User.id == user.id).update({"is_verified": True})
         db.commit()
         db.refresh(user)
+
+
+class AsyncUserQueries:
+    @staticmethod
+    async def get_user_by_email(db: AsyncSession, email: str) -> User | None:
+        return await db.scalar(select(User).where(User.email == email))
+
+    @staticmethod
+    async def get_user_by_username(db: AsyncSession, username: str) -> User | None:
+        with replica_reads(db):
+            return await db.scalar(select(User).where(User.username == username))
+
+    @staticmethod
+    async def user_exists(db: AsyncSession, email: str) -> bool:
+        count = await db.scalar(
+            select(func.count()).select_from(User).where(User.email == email)
+        )
+        return count > 0
+
+    @staticmethod
+    async def create_user(
+        db: AsyncSession, user_data: UserCreate, password_hash: str
+    ) -> User | None:
+        user_details = user_data.model_dump()
+        secret_key = secrets.token_urlsafe(64)
+        new_user = User(
+            username=user_details.get("username"),
+            email=user_details.get("email"),
+            first_name=user_details.get("first_name"),
+            last_name=user_details.get("last_name"),
+            password_hash=password_hash,
+            secret_key=secret_key,
+        )
+
+        db.add(new_user)
+        await db.commit()
+        await db.refresh(new_user)
+
+        return new_user
+
+    @staticmethod
+    async def update_verified_user(user: User, db: AsyncSession):
+        await db.execute(
+            update(User).where(User.id == user.id).values(is_verified=True)
+        )
+        await commit(db, user.id)
+        await db.refresh(user)
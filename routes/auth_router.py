@@ -1,26 +1,29 @@
 from datetime import datetime, timedelta
 
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, BackgroundTasks, Request
 from fastapi.params import Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from starlette.responses import JSONResponse
 
-from auth.authentication import Auth
-from auth.dependencies import AccessTokenBearer, RefreshTokenBearer
+from auth.dependencies import (AccessTokenBearer, RefreshTokenBearer,
+                               get_identity)
+from auth.hashing import password_hasher
 from auth.services import create_access_token
+from auth.token_cache import token_cache
 from celery_logic.celery_tasks import (decode_url_safe_token,
                                        send_verification_email_task)
-from config.config_loader import api_settings
-from db.database import get_db
-from db.redis import (add_jti_to_blocklist, cache_user_data, cache_user_labels,
-                      cache_user_notes, clear_user_cache)
+from config.config_loader import api_settings, db_settings
+from db.database import get_async_db
+from db.redis import (add_jti_to_blocklist, clear_user_cache,
+                      get_notes_version, warm_user_cache)
+from db.replicas import use_primary
 from exceptions.auth import AuthError, InvalidToken
 from exceptions.orm import UserAlreadyExist, UserNotFound
 from middleware.throttling import limiter
-from queries.note_queries import NoteQueries
-from queries.user_queries import UserQueries
-from schema.note_schema import LabelRead, NoteRead
+from models.user import User
+from queries.note_queries import load_user_notes
+from queries.user_queries import AsyncUserQueries
 from schema.token import Token
 from schema.user_schema import (UserCreate, UserLoginModel, UserRead,
                                 UserSuccessResponse)
@@ -30,13 +33,16 @@ auth_router = APIRouter(
 )
 
 
-@auth_router.post("/signup")
+@auth_router.post("/signup", response_model=UserSuccessResponse)
 @limiter.limit("5/minute")
 async def signup(
-    request: Request, user_data: UserCreate, db: Session = Depends(get_db)
+    request: Request, user_data: UserCreate, db: AsyncSession = Depends(get_async_db)
 ):
-    user_by_username = UserQueries.get_user_by_username(db, user_data.username)
-    user_by_email = UserQueries.get_user_by_email(db, user_data.email)
+    use_primary(db)
+    user_by_username = await AsyncUserQueries.get_user_by_username(
+        db, user_data.username
+    )
+    user_by_email = await AsyncUserQueries.get_user_by_email(db, user_data.email)
 
     if user_by_username:
         raise UserAlreadyExist(
@@ -48,7 +54,8 @@ async def signup(
             detail="Email already exists", status_code=status.HTTP_409_CONFLICT
         )
 
-    new_user = UserQueries.create_user(db, user_data)
+    hashed_pw = await password_hasher.hash(user_data.password)
+    new_user = await AsyncUserQueries.create_user(db, user_data, hashed_pw)
 
     send_verification_email_task.delay(new_user.username, new_user.email)
 
@@ -59,15 +66,32 @@ async def signup(
     )
 
 
+async def warm_cache(user: User):
+    """Fill the profile and note list after the login response has gone out,
+    so that the first reads are cache hits."""
+    version = await get_notes_version(str(user.id))
+    notes = await load_user_notes(
+        str(user.id), db_settings.CACHE_NOTES_MAX_PER_USER + 1
+    )
+    await warm_user_cache(str(user.id), UserRead.model_validate(user), notes, version)
+
+
 @auth_router.post("/login", response_model=Token, status_code=status.HTTP_200_OK)
 @limiter.limit("5/minute")
 async def login(
-    request: Request, credentials: UserLoginModel, db: Session = Depends(get_db)
+    request: Request,
+    credentials: UserLoginModel,
+    background_tasks: BackgroundTasks,
+    # Closed when the handler returns, so warm_cache never waits for a second
+    # connection while this one is still checked out.
+    db: AsyncSession = Depends(get_async_db, scope="function"),
 ):
     username = credentials.username
     password = credentials.password
 
-    user = UserQueries.get_user_by_username(db, username)
+    use_primary(db)
+
+    user = await AsyncUserQueries.get_user_by_username(db, username)
 
     if user is None:
         raise AuthError(
@@ -75,7 +99,7 @@ async def login(
         )
     data = {"username": user.username, "user_id": str(user.id)}
 
-    if Auth.check_password(password, user.password_hash):
+    if await password_hasher.verify(password, user.password_hash):
         if not user.is_verified:
             raise AuthError(
                 message="User Not Verified. Please verify your email.",
@@ -89,16 +113,8 @@ async def login(
             expiry=timedelta(minutes=api_settings.REFRESH_TOKEN_EXPIRE_MINUTES),
         )
 
-        # Cache user, notes, and labels
-        await cache_user_data(user.username, UserRead.model_validate(user).model_dump())
-        notes = NoteQueries.get_user_notes(db, user)
-        await cache_user_notes(
-            user.username, [NoteRead.model_validate(n).model_dump() for n in notes]
-        )
-        labels = NoteQueries.get_all_labels(db)
-        await cache_user_labels(
-            user.username, [LabelRead.model_validate(l).model_dump() for l in labels]
-        )
+        # Labels are shared and cached on first use
+        background_tasks.add_task(warm_cache, user)
         return Token(
             access_token=access_token,
             refresh_token=refresh_token,
@@ -115,12 +131,11 @@ async def login(
 async def get_new_access_token(
     request: Request,
     token_data: dict = Depends(RefreshTokenBearer()),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     expiry = token_data["exp"]
-    username = token_data["user"]["username"]
 
-    user = UserQueries.get_user_by_username(db, username)
+    user = await get_identity(request).load_user(db)
 
     if datetime.fromtimestamp(expiry) > datetime.now():
         new_access_token = create_access_token(
@@ -138,10 +153,11 @@ async def get_new_access_token(
 @limiter.limit("5/minute")
 async def logout(request: Request, token_data: dict = Depends(AccessTokenBearer())):
     jti = token_data.get("jti")
-    username = token_data["user"]["username"]
+    user_id = token_data["user"]["user_id"]
 
-    await add_jti_to_blocklist(jti)
-    await clear_user_cache(username)
+    await add_jti_to_blocklist(jti, token_data["exp"])
+    token_cache.invalidate_token(jti)
+    await clear_user_cache(user_id)
 
     return JSONResponse({"message": "You are now logged out."})
 
@@ -149,7 +165,7 @@ async def logout(request: Request, token_data: dict = Depends(AccessTokenBearer(
 @auth_router.get("/verify/{token}")
 @limiter.limit("5/minute")
 async def verify_user_account(
-    request: Request, token: str, db: Session = Depends(get_db)
+    request: Request, token: str, db: AsyncSession = Depends(get_async_db)
 ):
 
     token_data = decode_url_safe_token(token)
@@ -157,14 +173,15 @@ async def verify_user_account(
     user_email = token_data.get("email")
 
     if user_email:
-        user = UserQueries.get_user_by_email(db, user_email)
+        use_primary(db)
+        user = await AsyncUserQueries.get_user_by_email(db, user_email)
 
         if not user:
             raise UserNotFound(
                 detail="User not found", status_code=status.HTTP_404_NOT_FOUND
             )
 
-        UserQueries.update_verified_user(user, db)
+        await AsyncUserQueries.update_verified_user(user, db)
 
         return JSONResponse(
             content={"message": "Account verified successfully"},
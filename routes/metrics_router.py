@@ -0,0 +1,98 @@
+import hmac
+import time
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from starlette.responses import JSONResponse, PlainTextResponse
+
+from auth.hashing import password_hasher
+from auth.token_cache import token_cache
+from config.config_loader import api_settings
+from db.database import pool_metrics
+from db.redis import cache_memory_report, local_cache, set_profiler_sample_rate
+from middleware.profiling import verify_profile_token
+from utils.request_metrics import request_metrics
+from utils.single_flight import SingleFlight
+
+metrics_bearer = HTTPBearer(auto_error=False)
+
+
+async def require_metrics_token(
+    credentials: HTTPAuthorizationCredentials | None = Depends(metrics_bearer),
+):
+    token = api_settings.METRICS_TOKEN
+    if (
+        not token
+        or credentials is None
+        or not hmac.compare_digest(credentials.credentials.encode(), token.encode())
+    ):
+        raise HTTPException(status_code=403, detail="Invalid metrics token")
+
+
+metrics_router = APIRouter(
+    tags=["metrics"],
+    include_in_schema=False,
+    dependencies=[Depends(require_metrics_token)],
+)
+
+# The memory report SCANs Redis, so a worker computes it at most once a
+# minute, for all callers at once, and stops after MEMORY_REPORT_MAX_KEYS.
+MEMORY_REPORT_TTL_SECONDS = 60
+MEMORY_REPORT_MAX_KEYS = 100_000
+
+_memory_reports = SingleFlight()
+_memory_report: tuple[float, dict] | None = None
+
+
+async def _load_memory_report() -> dict:
+    global _memory_report
+    report = await cache_memory_report(max_keys=MEMORY_REPORT_MAX_KEYS)
+    _memory_report = (time.monotonic() + MEMORY_REPORT_TTL_SECONDS, report)
+    return report
+
+
+@metrics_router.get("/hashing")
+async def hashing_metrics():
+    return JSONResponse(password_hasher.stats())
+
+
+@metrics_router.get("/token-cache")
+async def token_cache_metrics():
+    return JSONResponse(token_cache.stats())
+
+
+@metrics_router.get("/db-pool")
+async def db_pool_metrics():
+    return JSONResponse({name: m.stats() for name, m in pool_metrics.items()})
+
+
+@metrics_router.get("/cache")
+async def cache_metrics():
+    return JSONResponse(local_cache.stats())
+
+
+@metrics_router.get("/cache/memory")
+async def cache_memory_metrics():
+    if _memory_report is not None and _memory_report[0] > time.monotonic():
+        return JSONResponse(_memory_report[1])
+    return JSONResponse(await _memory_reports.do("memory", _load_memory_report))
+
+
+@metrics_router.get("/prometheus")
+async def prometheus_metrics():
+    return PlainTextResponse(
+        request_metrics.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
+@metrics_router.put("/profiler")
+async def set_profiler(
+    sample_rate: float = Query(ge=0, le=1),
+    seconds: int = Query(default=300, ge=1, le=86400),
+    x_profile: str = Header(default=""),
+):
+    """Profile ``sample_rate`` of requests in every worker for ``seconds``."""
+    if not verify_profile_token(api_settings.PROFILER_SECRET, x_profile):
+        raise HTTPException(status_code=403, detail="Invalid profile token")
+    await set_profiler_sample_rate(sample_rate, seconds)
+    return JSONResponse({"sample_rate": sample_rate, "seconds": seconds})
@@ -1,15 +1,25 @@
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-
-from auth.dependencies import get_current_user
-from db.database import get_db
-from db.redis import cache_user_labels, cache_user_notes, get_cached_notes
+from fastapi import (APIRouter, Depends, HTTPException, Query, Request,
+                     Response, status)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth.dependencies import get_access_identity, get_current_user
+from auth.identity import Identity
+from config.config_loader import api_settings
+from db.database import get_async_db
+from db.redis import (NOTES_NOT_CACHED, get_cached_notes_page, get_notes_etag,
+                      get_shared_labels, rebuild_user_notes,
+                      update_cached_notes)
+from db.replicas import use_primary
 from models.user import User
-from queries.note_queries import NoteQueries
-from schema.note_schema import (LabelRead, NoteCreate, NoteRead,
-                                NoteSuccessResponse)
+from queries.note_queries import (AsyncNoteQueries, labels_created,
+                                  load_user_notes)
+from schema.note_schema import (LabelRead, NoteBatchRequest, NoteBatchResponse,
+                                NoteBatchResult, NoteCreate, NotePage,
+                                NoteRead, NoteSuccessResponse)
+from utils.etag import etag_matches, format_etag, not_modified
+from utils.pagination import decode_cursor, encode_cursor
 
 note_router = APIRouter(
     tags=["notes"],
@@ -19,90 +29,215 @@ note_router = APIRouter(
 @note_router.post("/", response_model=NoteSuccessResponse)
 async def create_note(
     note_data: NoteCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
 
-    note = NoteQueries.create_note(db, current_user, note_data)
-    # Update cache
-    notes = NoteQueries.get_user_notes(db, current_user)
-    labels = NoteQueries.get_all_labels(db)
-    await cache_user_labels(
-        current_user.username,
-        [LabelRead.model_validate(l).model_dump() for l in labels],
+    note = NoteRead.model_validate(
+        await AsyncNoteQueries.create_note(db, current_user, note_data)
     )
-    await cache_user_notes(
-        current_user.username, [NoteRead.model_validate(n).model_dump() for n in notes]
+    await update_cached_notes(
+        str(current_user.id),
+        changed=[note],
+        labels_changed=labels_created(db),
     )
     return NoteSuccessResponse(
         message="Note Created Successfully",
-        payload=NoteRead.model_validate(note),
+        payload=note,
         status_code=status.HTTP_201_CREATED,
     )
 
 
-@note_router.get("/", response_model=list[NoteRead])
-async def get_notes(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+@note_router.post("/batch", response_model=NoteBatchResponse)
+async def batch_notes(
+    batch: NoteBatchRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
 ):
-    cached_notes = await get_cached_notes(current_user.username)
-    if cached_notes:
-        return [NoteRead(**n) for n in cached_notes]
+    if len(batch.operations) > api_settings.NOTES_BATCH_MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {api_settings.NOTES_BATCH_MAX_OPERATIONS} "
+            "operations per batch",
+        )
+
+    use_primary(db)
+    notes = await AsyncNoteQueries.apply_batch(db, current_user, batch.operations)
+
+    results = []
+    for operation, note in zip(batch.operations, notes):
+        note_id = getattr(operation, "id", note.id if note else None)
+        if note is None:
+            results.append(
+                NoteBatchResult(
+                    op=operation.op,
+                    id=note_id,
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Note not found",
+                )
+            )
+        elif operation.op == "delete":
+            results.append(
+                NoteBatchResult(
+                    op=operation.op,
+                    id=note_id,
+                    status_code=status.HTTP_204_NO_CONTENT,
+                )
+            )
+        else:
+            results.append(
+                NoteBatchResult(
+                    op=operation.op,
+                    id=note_id,
+                    status_code=(
+                        status.HTTP_201_CREATED
+                        if operation.op == "create"
+                        else status.HTTP_200_OK
+                    ),
+                    note=NoteRead.model_validate(note),
+                )
+            )
+
+    # Only the final state of each note matters to the cache.
+    final = {}
+    for result in results:
+        if result.status_code == status.HTTP_204_NO_CONTENT:
+            final[result.id] = None
+        elif result.note is not None:
+            final[result.id] = result.note
+    await update_cached_notes(
+        str(current_user.id),
+        changed=[note for note in final.values() if note is not None],
+        deleted=[note_id for note_id, note in final.items() if note is None],
+        labels_changed=labels_created(db),
+    )
+    return NoteBatchResponse(
+        message="Batch Applied Successfully",
+        payload=results,
+        status_code=status.HTTP_200_OK,
+    )
+
 
-    notes = NoteQueries.get_user_notes(db, current_user)
-    return [NoteRead.model_validate(note) for note in notes]
+@note_router.get("/", response_model=NotePage)
+async def get_notes(
+    request: Request,
+    response: Response,
+    limit: int = Query(
+        default=api_settings.NOTES_PAGE_DEFAULT_LIMIT,
+        ge=1,
+        le=api_settings.NOTES_PAGE_MAX_LIMIT,
+    ),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    identity: Identity = Depends(get_access_identity),
+):
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # Read before the notes: a write in between can only make the ETag older
+    # than the body, never newer.
+    etag = format_etag(await get_notes_etag(str(identity.user_id)))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    cached_page = await get_cached_notes_page(str(identity.user_id), limit, after)
+    if cached_page:
+        # Already a serialized NotePage: no validation, no re-encoding.
+        return Response(
+            content=cached_page, media_type="application/json", headers={"ETag": etag}
+        )
+
+    response.headers["ETag"] = etag
+
+    notes = None
+    # Over the cap the list is never cached, so only the page is loaded.
+    if cached_page != NOTES_NOT_CACHED:
+        notes = await rebuild_user_notes(str(identity.user_id), load_user_notes)
+    if notes is not None:
+        notes = [
+            note
+            for note in notes
+            if after is None or (note.created_at, note.id) < after
+        ][: limit + 1]
+    else:
+        # One extra row tells us whether there is a next page.
+        notes = [
+            NoteRead.model_validate(note)
+            for note in await AsyncNoteQueries.get_user_notes(
+                db, identity.user_id, limit + 1, after
+            )
+        ]
+
+    next_cursor = None
+    if len(notes) > limit:
+        notes = notes[:limit]
+        next_cursor = encode_cursor(notes[-1].created_at, notes[-1].id)
+    return NotePage(items=notes, next_cursor=next_cursor)
+
+
+@note_router.get("/labels", response_model=list[LabelRead])
+async def get_labels(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    async def load():
+        labels = await AsyncNoteQueries.get_all_labels(db)
+        return {str(label.id): label.name for label in labels}
+
+    names = await get_shared_labels(load)
+    label_ids = await AsyncNoteQueries.get_user_label_ids(db, current_user)
+    if any(str(label_id) not in names for label_id in label_ids):
+        # Created after the shared copy was read, or the copy is stale: load
+        # it again and put the fresh copy back for everyone.
+        names = await get_shared_labels(load, refresh=True)
+    return sorted(
+        (LabelRead(id=label_id, name=names[str(label_id)]) for label_id in label_ids),
+        key=lambda label: label.name,
+    )
 
 
 @note_router.delete("/{note_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_note(
     note_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
 
-    note = NoteQueries.get_note_by_id(db, note_id, current_user)
+    use_primary(db)
+    note = await AsyncNoteQueries.get_note_by_id(db, note_id, current_user)
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
 
-    NoteQueries.delete_note(db, note)
-    # Update cache
-    notes = NoteQueries.get_user_notes(db, current_user)
-    labels = NoteQueries.get_all_labels(db)
-    await cache_user_labels(
-        current_user.username,
-        [LabelRead.model_validate(l).model_dump() for l in labels],
-    )
-    await cache_user_notes(
-        current_user.username, [NoteRead.model_validate(n).model_dump() for n in notes]
-    )
+    await AsyncNoteQueries.delete_note(db, note)
+    await update_cached_notes(str(current_user.id), deleted=[note_id])
 
 
 @note_router.patch("/{note_id}", response_model=NoteSuccessResponse)
 async def update_note(
     note_id: UUID,
     note_data: NoteCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
 
-    note = NoteQueries.get_note_by_id(db, note_id, current_user)
+    use_primary(db)
+    note = await AsyncNoteQueries.get_note_by_id(db, note_id, current_user)
 
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
 
-    updated = NoteQueries.update_note(db, note, note_data)
-    # Update cache
-    notes = NoteQueries.get_user_notes(db, current_user)
-    labels = NoteQueries.get_all_labels(db)
-    await cache_user_labels(
-        current_user.username,
-        [LabelRead.model_validate(l).model_dump() for l in labels],
+    updated = NoteRead.model_validate(
+        await AsyncNoteQueries.update_note(db, note, note_data)
     )
-    await cache_user_notes(
-        current_user.username, [NoteRead.model_validate(n).model_dump() for n in notes]
+    await update_cached_notes(
+        str(current_user.id),
+        changed=[updated],
+        labels_changed=labels_created(db),
     )
     return NoteSuccessResponse(
         message="Note Updated Successfully",
-        payload=NoteRead.model_validate(updated),
+        payload=updated,
         status_code=status.HTTP_200_OK,
     )
@@ -1,17 +1,21 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, Response, status
 from fastapi.params import Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from auth.authentication import Auth
-from auth.dependencies import get_current_user
-from db.database import get_db
-from db.redis import cache_user_data, get_cached_user
-from exceptions.orm import UserAlreadyExist, UserNotFound
+from auth.dependencies import get_access_identity, get_current_user
+from auth.hashing import password_hasher
+from auth.identity import Identity
+from db.database import get_async_db
+from db.redis import (cache_user_data, clear_user_cache, get_cached_user,
+                      get_user_etag, invalidate_user_tokens)
+from db.replicas import commit, use_primary
+from exceptions.orm import UserAlreadyExist
 from middleware.throttling import limiter
 from models.user import User
-from queries.user_queries import UserQueries
+from queries.user_queries import AsyncUserQueries
 from schema.user_schema import (UserCreate, UserDeleteResponse, UserRead,
                                 UserSuccessResponse)
+from utils.etag import etag_matches, format_etag, not_modified
 
 user_router = APIRouter(
     tags=["users"],
@@ -20,18 +24,31 @@ user_router = APIRouter(
 
 @user_router.get("/me", response_model=UserSuccessResponse)
 async def get_user(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    identity: Identity = Depends(get_access_identity),
 ):
-    cached = await get_cached_user(current_user.username)
+    etag = format_etag(await get_user_etag(str(identity.user_id)))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
+    cached = await get_cached_user(str(identity.user_id))
     if cached:
-        return UserSuccessResponse(
-            message="User Fetched from Cache",
-            payload=UserRead(**cached),
-            status_code=status.HTTP_200_OK,
+        # Already serialized UserRead: wrapped without validating it again.
+        return Response(
+            content=b"".join(
+                (
+                    b'{"message":"User Fetched from Cache","payload":',
+                    cached,
+                    b',"status_code":200}',
+                )
+            ),
+            media_type="application/json",
+            headers={"ETag": etag},
         )
-    user = UserQueries.get_user_by_username(db=db, username=current_user.username)
-    if not user:
-        raise UserNotFound(status_code=status.HTTP_404_NOT_FOUND)
+    user = await identity.load_user(db)
 
     return UserSuccessResponse(
         message="User Fetched Successfully",
@@ -44,13 +61,14 @@ async def get_user(
     "/me", status_code=status.HTTP_200_OK, response_model=UserDeleteResponse
 )
 async def delete_user(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
 ):
-    user = UserQueries.get_user_by_username(db=db, username=current_user.username)
-    if not user:
-        raise UserNotFound(status_code=status.HTTP_404_NOT_FOUND)
-    db.delete(user)
-    db.commit()
+    user = current_user
+    await db.delete(user)
+    await commit(db, user.id)
+    await invalidate_user_tokens(str(user.id))
+    await clear_user_cache(str(user.id))
 
     return UserDeleteResponse(
         message="User Deleted Successfully", status=status.HTTP_200_OK
@@ -60,18 +78,19 @@ async def delete_user(
 @user_router.patch("/me", response_model=UserSuccessResponse)
 async def update_user(
     user_data: UserCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    user = UserQueries.get_user_by_username(db=db, username=current_user.username)
-    if not user:
-        raise UserNotFound(status_code=status.HTTP_404_NOT_FOUND)
-    user_by_email = UserQueries.get_user_by_email(db=db, email=user_data.email)
+    use_primary(db)
+    user = current_user
+    user_by_email = await AsyncUserQueries.get_user_by_email(
+        db=db, email=user_data.email
+    )
     if user_by_email and user_by_email.email != current_user.email:
         raise UserAlreadyExist(
             detail="Email already exists", status_code=status.HTTP_409_CONFLICT
         )
-    user_by_username = UserQueries.get_user_by_username(
+    user_by_username = await AsyncUserQueries.get_user_by_username(
         db=db, username=user_data.username
     )
     if user_by_username and user_by_username.username != current_user.username:
@@ -80,14 +99,15 @@ async def update_user(
         )
     user.username = user_data.username
     user.email = str(user_data.email)
-    hashed_pw = Auth.hash_password(user_data.password)
+    hashed_pw = await password_hasher.hash(user_data.password)
     user.password_hash = hashed_pw
-    db.commit()
-    db.refresh(user)
+    await commit(db, user.id)
+    await db.refresh(user)
+    user_read = UserRead.model_validate(user)
     # Update cache
-    await cache_user_data(user.username, UserRead.model_validate(user).model_dump())
+    await cache_user_data(str(user.id), user_read)
     return UserSuccessResponse(
         message="User Updated Successfully",
-        payload=UserRead.model_validate(user),
+        payload=user_read,
         status_code=status.HTTP_200_OK,
     )
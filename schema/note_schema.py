@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Annotated, List, Literal, Optional, Union
 from uuid import UUID
 
 from pydantic import BaseModel, Field
@@ -28,7 +28,52 @@ class NoteRead(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class NotePage(BaseModel):
+    items: List[NoteRead]
+    next_cursor: Optional[str] = None
+
+
 class NoteSuccessResponse(BaseModel):
     message: str
     payload: NoteRead
     status_code: int
+
+
+class NoteBatchCreate(BaseModel):
+    op: Literal["create"]
+    note: NoteCreate
+
+
+class NoteBatchUpdate(BaseModel):
+    op: Literal["update"]
+    id: UUID
+    note: NoteCreate
+
+
+class NoteBatchDelete(BaseModel):
+    op: Literal["delete"]
+    id: UUID
+
+
+NoteBatchOperation = Annotated[
+    Union[NoteBatchCreate, NoteBatchUpdate, NoteBatchDelete],
+    Field(discriminator="op"),
+]
+
+
+class NoteBatchRequest(BaseModel):
+    operations: List[NoteBatchOperation] = Field(..., min_length=1)
+
+
+class NoteBatchResult(BaseModel):
+    op: str
+    id: Optional[UUID] = None
+    status_code: int
+    note: Optional[NoteRead] = None
+    detail: Optional[str] = None
+
+
+class NoteBatchResponse(BaseModel):
+    message: str
+    payload: List[NoteBatchResult]
+    status_code: int
@@ -1,28 +1,49 @@
 import asyncio
 import secrets
 import uuid
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, make_url, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 
 from auth.authentication import Auth
-from config.config_loader import db_settings
-from db.database import Base, get_db
+from config.config_loader import api_settings, db_settings
+from db.database import Base, get_async_db
+from db.redis import local_cache
+from db.replicas import ReplicaSet, RoutingSession
 from fundoo.api import fundoo_api
+from middleware.throttling import limiter
 from models.label import Label
 from models.note import Note
 from models.user import User
 
 # Test database setup
-SQLALCHEMY_DATABASE_URL = str(db_settings.SQLALCHEMY_DATABASE_URI)
+#
+# Tests commit their data, so they run against a database of their own next to
+# the configured one, created for the session and dropped after it.
+TEST_DATABASE = f"{db_settings.POSTGRESQL_DATABASE}_test"
+SQLALCHEMY_DATABASE_URL = make_url(str(db_settings.SQLALCHEMY_DATABASE_URI)).set(
+    database=TEST_DATABASE
+)
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Routes run on asyncpg connections opened inside the TestClient's event loop,
+# so the async engine must not pool connections across loops.
+async_engine = create_async_engine(
+    make_url(str(db_settings.ASYNC_SQLALCHEMY_DATABASE_URI)).set(
+        database=TEST_DATABASE
+    ),
+    poolclass=NullPool,
+)
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
 
 @pytest.fixture(scope="session")
 def event_loop():
@@ -32,47 +53,141 @@ def event_loop():
     loop.close()
 
 
+@pytest.fixture(scope="session", autouse=True)
+def test_database():
+    """Create the test database for the session and drop it afterwards."""
+    # Only connects to the configured database to create and drop the other.
+    server = create_engine(
+        str(db_settings.SQLALCHEMY_DATABASE_URI),
+        isolation_level="AUTOCOMMIT",
+        poolclass=NullPool,
+    )
+    with server.connect() as connection:
+        connection.execute(text(f'DROP DATABASE IF EXISTS "{TEST_DATABASE}"'))
+        connection.execute(text(f'CREATE DATABASE "{TEST_DATABASE}"'))
+
+    yield
+
+    engine.dispose()
+    with server.connect() as connection:
+        connection.execute(text(f'DROP DATABASE "{TEST_DATABASE}" WITH (FORCE)'))
+    server.dispose()
+
+
 @pytest.fixture(scope="function")
 def db_session():
     """Create a fresh database session for each test."""
     Base.metadata.create_all(bind=engine)
-    connection = engine.connect()
-    transaction = connection.begin()
-    session = TestingSessionLocal(bind=connection)
+    session = TestingSessionLocal()
 
     yield session
 
     session.close()
-    transaction.rollback()
-    connection.close()
+    # Routes use their own async connections and cannot see an open test
+    # transaction, so test data is committed and removed afterwards.
+    if not engine.url.database.endswith("_test"):
+        raise RuntimeError(f"refusing to empty {engine.url.database!r}")
+    with engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
 
 
 @pytest.fixture(scope="function")
 def client(db_session):
     """Create a test client with dependency overrides."""
 
-    def override_get_db():
-        try:
-            yield db_session
-        finally:
-            db_session.close()
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as session:
+            yield session
 
-    fundoo_api.dependency_overrides[get_db] = override_get_db
-    with TestClient(fundoo_api) as test_client:
+    fundoo_api.dependency_overrides[get_async_db] = override_get_async_db
+    # Note lists for the cache are loaded on their own sessions, not a dependency.
+    with (
+        patch("queries.note_queries.asyncSessionLocal", TestingAsyncSessionLocal),
+        TestClient(fundoo_api) as test_client,
+    ):
         yield test_client
     fundoo_api.dependency_overrides.clear()
 
 
+@pytest.fixture
+def async_session_factory(db_session):
+    """Sessions on the async test engine, for calling query classes directly."""
+    return TestingAsyncSessionLocal
+
+
+@pytest.fixture
+def replica_session_factory(db_session, tmp_path):
+    """Routing sessions whose only replica is an empty database, so any read
+    sent to a replica fails."""
+    replica = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}", poolclass=NullPool
+    )
+    return async_sessionmaker(
+        bind=async_engine,
+        sync_session_class=RoutingSession,
+        replicas=ReplicaSet([replica], sticky_seconds=5, health_interval=5),
+        expire_on_commit=False,
+    )
+
+
+@pytest.fixture
+def query_counter():
+    """Record the SQL statements executed on the test engine."""
+
+    @contextmanager
+    def _count():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        target = async_engine.sync_engine
+        event.listen(target, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(target, "before_cursor_execute", before_cursor_execute)
+
+    return _count
+
+
 @pytest.fixture
 def mock_redis():
     """Mock Redis operations."""
     with patch("db.redis.redis_client") as mock_client:
         mock_client.set = AsyncMock()
         mock_client.get = AsyncMock(return_value=None)
+        mock_client.getex = AsyncMock(return_value=None)
+        mock_client.exists = AsyncMock(return_value=0)
         mock_client.delete = AsyncMock()
+        mock_client.publish = AsyncMock()
+        mock_client.pipeline = MagicMock()
+        mock_client.pipeline.return_value.execute = AsyncMock(return_value=[])
+        mock_client.zrevrange = AsyncMock(return_value=[])
+        mock_client.zcount = AsyncMock(return_value=0)
+        mock_client.zrevrangebyscore = AsyncMock(return_value=[])
+        mock_client.zscore = AsyncMock(return_value=None)
+        mock_client.eval = AsyncMock(return_value=b"0")
+        mock_client.evalsha = AsyncMock(return_value=b"0")
+        local_cache.clear()
         yield mock_client
 
 
+@pytest.fixture
+def metrics_headers():
+    """Headers accepted by the /metrics endpoints."""
+    with patch.object(api_settings, "METRICS_TOKEN", "metrics-test-token"):
+        yield {"Authorization": "Bearer metrics-test-token"}
+
+
+@pytest.fixture(autouse=True)
+def disable_rate_limits():
+    """Rate limits are counted in Redis and would carry over between runs."""
+    with patch.object(limiter, "enabled", False):
+        yield
+
+
 @pytest.fixture
 def mock_celery():
     """Mock Celery tasks."""
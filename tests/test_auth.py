@@ -5,6 +5,7 @@ import pytest
 from fastapi import status
 
 from auth.services import create_access_token
+from routes.auth_router import warm_cache
 
 
 class TestAuthRoutes:
@@ -52,9 +53,9 @@ class TestAuthRoutes:
         """Test successful login."""
         _ = create_test_user(username="testuser", password="testpass", is_verified=True)
 
-        with patch("db.redis.cache_user_data", new_callable=AsyncMock), patch(
-            "db.redis.cache_user_notes", new_callable=AsyncMock
-        ), patch("db.redis.cache_user_labels", new_callable=AsyncMock):
+        with patch(
+            "routes.auth_router.warm_user_cache", new_callable=AsyncMock
+        ) as warm:
             response = client.post(
                 "/api/v1/auth/login",
                 json={"username": "testuser", "password": "testpass"},
@@ -65,6 +66,50 @@ class TestAuthRoutes:
         assert "access_token" in data
         assert "refresh_token" in data
         assert data["token_type"] == "bearer"
+        warm.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_login_warms_cache_on_own_session(
+        self, client, create_test_user, mock_redis, async_session_factory
+    ):
+        """Test that the warm-up does not use the request's session."""
+        _ = create_test_user(username="testuser", password="testpass", is_verified=True)
+        sessions = []
+
+        def factory():
+            session = async_session_factory()
+            sessions.append(session)
+            return session
+
+        with (
+            patch("queries.note_queries.asyncSessionLocal", factory),
+            patch("routes.auth_router.warm_user_cache", new_callable=AsyncMock) as warm,
+        ):
+            response = client.post(
+                "/api/v1/auth/login",
+                json={"username": "testuser", "password": "testpass"},
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(sessions) == 1
+        warm.assert_awaited_once()
+        assert warm.await_args.args[1].username == "testuser"
+
+    @pytest.mark.asyncio
+    async def test_warm_cache_reads_primary(
+        self, create_test_user, create_test_note, mock_redis, replica_session_factory
+    ):
+        """Test that the note list cached at login is not read from a replica."""
+        user = create_test_user(username="testuser", is_verified=True)
+        note = create_test_note(user)
+
+        with (
+            patch("queries.note_queries.asyncSessionLocal", replica_session_factory),
+            patch("routes.auth_router.warm_user_cache", new_callable=AsyncMock) as warm,
+        ):
+            await warm_cache(user)
+
+        assert [n.id for n in warm.await_args.args[2]] == [note.id]
 
     @pytest.mark.asyncio
     async def test_login_invalid_username(self, client, mock_redis):
@@ -111,7 +156,7 @@ class TestAuthRoutes:
         response = client.get("/api/v1/auth/refresh_token", headers=headers)
 
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
-        assert "Invalid token" in response.json()["detail"]
+        assert "Refresh Token required" in response.json()["detail"]
 
 
 def test_print_token(auth_headers):
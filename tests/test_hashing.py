@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+import pytest
+
+from auth.hashing import PasswordHasher
+from exceptions.service import ServiceBusy
+
+
+class TestPasswordHasher:
+    """Test the pooled password hasher."""
+
+    @pytest.mark.asyncio
+    async def test_hash_and_verify(self):
+        """Test hashing and verification through the pool."""
+        hasher = PasswordHasher(max_workers=2)
+        hashed = await hasher.hash("testpassword")
+
+        assert await hasher.verify("testpassword", hashed) is True
+        assert await hasher.verify("wrongpassword", hashed) is False
+        assert hasher.stats()["completed"] == 3
+        hasher.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_queue_is_full(self):
+        """Test that work beyond the worker and queue limits is rejected."""
+        hasher = PasswordHasher(max_workers=1, max_queue=1)
+
+        running = [
+            asyncio.create_task(hasher._run(time.sleep, 0.2)) for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+
+        with pytest.raises(ServiceBusy):
+            await hasher._run(time.sleep, 0)
+
+        await asyncio.gather(*running)
+        stats = hasher.stats()
+        assert stats["rejected"] == 1
+        assert stats["peak_pending"] == 2
+        assert stats["pending"] == 0
+        hasher.shutdown()
+
+    def test_unknown_executor(self):
+        """Test that an unknown executor kind is refused."""
+        with pytest.raises(ValueError):
+            PasswordHasher(executor="fibers")
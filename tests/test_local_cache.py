@@ -0,0 +1,57 @@
+from db.local_cache import LocalCache
+
+
+def ready_cache(**kwargs):
+    cache = LocalCache(**{"maxsize": 10, "ttl": 60, **kwargs})
+    cache.ready = True
+    return cache
+
+
+class TestLocalCache:
+    """Test the per-worker L1 in front of Redis."""
+
+    def test_not_ready_defers_to_redis(self):
+        """Test that nothing is served or kept before the subscription is up."""
+        cache = LocalCache(maxsize=10, ttl=60)
+        cache.set("user", "alice", {"id": 1}, cache.generation("user"))
+
+        assert cache.get("user", "alice") is None
+        cache.ready = True
+        assert cache.get("user", "alice") is None
+
+    def test_invalidation_during_read_is_not_overwritten(self):
+        """Test that a value read before an invalidation is not stored."""
+        cache = ready_cache()
+        generation = cache.generation("user")
+        cache.invalidate("user", "alice")
+        cache.set("user", "alice", {"id": 1}, generation)
+
+        assert cache.get("user", "alice") is None
+
+    def test_invalidate_drops_every_field(self):
+        """Test that all pages of an entry go with its key."""
+        cache = ready_cache()
+        cache.set("notes", "alice", ["p1"], cache.generation("notes"), field=1)
+        cache.set("notes", "alice", ["p2"], cache.generation("notes"), field=2)
+        cache.set("notes", "bob", ["p1"], cache.generation("notes"), field=1)
+
+        assert cache.get("notes", "alice", field=2) == ["p2"]
+        cache.invalidate("notes", "alice")
+
+        assert cache.get("notes", "alice", field=1) is None
+        assert cache.get("notes", "bob", field=1) == ["p1"]
+
+    def test_stats_per_keyspace(self):
+        """Test that hits, misses and evictions are counted per keyspace."""
+        cache = ready_cache(maxsize=1)
+        cache.set("user", "alice", 1, cache.generation("user"))
+        cache.set("user", "bob", 2, cache.generation("user"))
+        cache.get("user", "bob")
+        cache.get("user", "alice")
+        cache.record_redis("user", hit=True)
+
+        stats = cache.stats()
+        assert stats["user"]["hits"] == 1
+        assert stats["user"]["misses"] == 1
+        assert stats["user"]["evictions"] == 1
+        assert stats["user"]["redis_hits"] == 1
@@ -0,0 +1,63 @@
+import subprocess
+import sys
+from unittest.mock import patch
+
+import main
+
+
+class TestLauncher:
+    """Test the server entry point."""
+
+    def test_default_is_single_reloading_process(self):
+        """Test that running without flags keeps the development server."""
+        with patch("main.uvicorn.run") as run:
+            main.main([])
+
+        assert run.call_args.kwargs["reload"] is True
+        assert "workers" not in run.call_args.kwargs
+
+    def test_production_options(self):
+        """Test that production flags reach uvicorn."""
+        with patch("main.uvicorn.run") as run:
+            main.main(
+                [
+                    "--production",
+                    "--workers",
+                    "4",
+                    "--loop",
+                    "uvloop",
+                    "--http",
+                    "httptools",
+                    "--backlog",
+                    "4096",
+                    "--keep-alive",
+                    "15",
+                    "--graceful-timeout",
+                    "20",
+                ]
+            )
+
+        options = run.call_args.kwargs
+        assert options["app"] == main.APP
+        assert "reload" not in options
+        assert options["workers"] == 4
+        assert (options["loop"], options["http"]) == ("uvloop", "httptools")
+        assert options["backlog"] == 4096
+        assert options["timeout_keep_alive"] == 15
+        assert options["timeout_graceful_shutdown"] == 20
+
+    def test_zero_workers_means_one_per_cpu(self):
+        """Test that the default worker count follows the CPUs."""
+        with patch("main.os.cpu_count", return_value=6):
+            options = main.production_options(main.parse_args(["--workers", "0"]))
+
+        assert options["workers"] == 6
+
+    def test_launcher_does_not_import_app(self):
+        """Test that engines and pools are left for the workers to create."""
+        code = "import sys, main; print('db.database' in sys.modules)"
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+
+        assert result.stdout.strip() == "False"
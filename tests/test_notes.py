@@ -0,0 +1,452 @@
+import uuid
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import Request, status
+
+from db.redis import cache_labels_script, note_score, notes_state_script
+from models.label import Label
+from queries.note_queries import (LABEL_LOADERS, AsyncNoteQueries,
+                                  labels_created)
+from schema.note_schema import NoteRead
+from utils.etag import etag_matches, format_etag
+from utils.pagination import decode_cursor, encode_cursor
+
+
+class TestCursor:
+    """Test keyset cursor encoding."""
+
+    def test_round_trip(self):
+        """Test that a cursor decodes back to the keyset it was built from."""
+        created_at = datetime(2026, 1, 1, 12, 0, 0, 123456)
+        note_id = uuid.uuid4()
+
+        assert decode_cursor(encode_cursor(created_at, note_id)) == (
+            created_at,
+            note_id,
+        )
+
+    @pytest.mark.parametrize(
+        "cursor",
+        [
+            "",
+            "not-a-cursor",
+            "bm8tc2VwYXJhdG9y",
+            # 2024-01-01T00:00:00+00:00|<uuid>: an offset-aware time.
+            "MjAyNC0wMS0wMVQwMDowMDowMCswMDowMHwzZmE4NWY2NC01NzE3LTQ1NjItYjNmYy0yYzk2M2Y2NmFmYTY",
+        ],
+    )
+    def test_rejects_garbage(self, cursor):
+        """Test that malformed cursors raise ValueError."""
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+class TestEtag:
+    """Test If-None-Match handling."""
+
+    @pytest.mark.parametrize(
+        "header, matches",
+        [
+            (None, False),
+            ('W/"v1"', True),
+            ('"v1"', True),
+            ('W/"v0", W/"v1"', True),
+            ("*", True),
+            ('W/"v2"', False),
+        ],
+    )
+    def test_weak_comparison(self, header, matches):
+        """Test that any listed tag or a wildcard matches, weak or strong."""
+        headers = [(b"if-none-match", header.encode())] if header else []
+        request = Request({"type": "http", "headers": headers})
+
+        assert etag_matches(request, format_etag("v1")) is matches
+
+
+class TestNoteRoutes:
+    """Test note routes."""
+
+    @pytest.mark.asyncio
+    async def test_get_notes_not_modified(
+        self, client, auth_headers, create_test_note, mock_redis, query_counter
+    ):
+        """Test that a matching ETag is a 304 without touching Postgres."""
+        headers, user = auth_headers()
+        create_test_note(user)
+        response = client.get("/api/v1/notes/", headers=headers)
+        etag = response.headers["ETag"]
+
+        with query_counter() as statements:
+            response = client.get(
+                "/api/v1/notes/", headers={**headers, "If-None-Match": etag}
+            )
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.headers["ETag"] == etag
+        assert response.content == b""
+        assert statements == []
+
+    @pytest.mark.asyncio
+    async def test_get_notes_pages_newest_first(
+        self, client, auth_headers, create_test_note, mock_redis
+    ):
+        """Test that following next_cursor walks every note exactly once."""
+        headers, user = auth_headers()
+        for i in range(5):
+            create_test_note(user, title=f"note {i}")
+
+        titles, cursor = [], None
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            response = client.get("/api/v1/notes/", params=params, headers=headers)
+            assert response.status_code == status.HTTP_200_OK
+            page = response.json()
+            assert len(page["items"]) <= 2
+            titles += [note["title"] for note in page["items"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        assert titles == [f"note {i}" for i in reversed(range(5))]
+
+    @pytest.mark.asyncio
+    async def test_get_notes_miss_skips_user_lookup(
+        self, client, auth_headers, create_test_note, mock_redis, query_counter
+    ):
+        """Test that a cache miss goes by the token's user id and does not
+        load the user row."""
+        headers, user = auth_headers()
+        create_test_note(user)
+        # The first request verifies the token; the second is served from
+        # the token cache without the user.
+        client.get("/api/v1/notes/", headers=headers)
+
+        with query_counter() as statements:
+            response = client.get("/api/v1/notes/", headers=headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()["items"]) == 1
+        assert not any("FROM users" in statement for statement in statements)
+
+    @pytest.mark.asyncio
+    async def test_get_notes_serves_cached_bytes(
+        self, client, auth_headers, create_test_note, mock_redis
+    ):
+        """Test that a cache hit returns the stored JSON without building models."""
+        headers, user = auth_headers()
+        notes = [
+            NoteRead.model_validate(create_test_note(user, title=f"note {i}"))
+            for i in range(2)
+        ]
+        notes.sort(key=lambda n: (n.created_at, str(n.id)), reverse=True)
+        expected = client.get(
+            "/api/v1/notes/", params={"limit": 1}, headers=headers
+        ).json()
+
+        mock_redis.zrevrange.return_value = [
+            (str(n.id).encode(), note_score(n.created_at)) for n in notes
+        ]
+        mock_redis.pipeline.return_value.execute.return_value = [
+            [notes[0].model_dump_json().encode()],
+            True,
+            True,
+        ]
+        with patch.object(NoteRead, "model_validate", side_effect=AssertionError):
+            response = client.get(
+                "/api/v1/notes/", params={"limit": 1}, headers=headers
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == expected
+        assert expected["next_cursor"] is not None
+
+    @pytest.mark.asyncio
+    async def test_get_notes_over_cap_skips_rebuild(
+        self, client, auth_headers, create_test_note, mock_redis
+    ):
+        """Test that a list marked over the cap is read from Postgres without
+        taking the rebuild lock."""
+        headers, user = auth_headers()
+        create_test_note(user)
+        mock_redis.evalsha.side_effect = lambda sha, *args: (
+            b"over_cap" if sha == notes_state_script.sha else b"v1"
+        )
+
+        response = client.get("/api/v1/notes/", headers=headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()["items"]) == 1
+        mock_redis.set.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_get_notes_rebuild_reads_primary(
+        self,
+        client,
+        auth_headers,
+        create_test_note,
+        mock_redis,
+        replica_session_factory,
+    ):
+        """Test that the list cached by a rebuild is not read from a replica."""
+        headers, user = auth_headers()
+        create_test_note(user)
+
+        with patch("queries.note_queries.asyncSessionLocal", replica_session_factory):
+            response = client.get("/api/v1/notes/", headers=headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()["items"]) == 1
+
+    @pytest.mark.asyncio
+    async def test_get_notes_rejects_invalid_cursor(
+        self, client, auth_headers, mock_redis
+    ):
+        """Test that a malformed cursor is a 400, not a server error."""
+        headers, _ = auth_headers()
+
+        response = client.get(
+            "/api/v1/notes/", params={"cursor": "garbage"}, headers=headers
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.asyncio
+    async def test_batch_applies_all_operations(
+        self, client, auth_headers, create_test_note, mock_redis
+    ):
+        """Test that a batch creates, updates and deletes with per-item results."""
+        headers, user = auth_headers()
+        kept = create_test_note(user, title="kept")
+        removed = create_test_note(user, title="removed")
+        missing = uuid.uuid4()
+
+        response = client.post(
+            "/api/v1/notes/batch",
+            json={
+                "operations": [
+                    {"op": "create", "note": {"title": "new", "labels": ["a", "b"]}},
+                    {
+                        "op": "update",
+                        "id": str(kept.id),
+                        "note": {"title": "edited", "labels": ["b"]},
+                    },
+                    {"op": "delete", "id": str(removed.id)},
+                    {"op": "delete", "id": str(missing)},
+                ]
+            },
+            headers=headers,
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        results = response.json()["payload"]
+        assert [r["status_code"] for r in results] == [201, 200, 204, 404]
+        assert results[0]["note"]["title"] == "new"
+        assert [l["name"] for l in results[0]["note"]["labels"]] == ["a", "b"]
+        assert results[1]["note"]["title"] == "edited"
+        assert results[3]["id"] == str(missing)
+
+        listed = client.get("/api/v1/notes/", headers=headers).json()["items"]
+        assert sorted(note["title"] for note in listed) == ["edited", "new"]
+
+    @pytest.mark.asyncio
+    async def test_create_note_updates_cache_incrementally(
+        self,
+        client,
+        auth_headers,
+        create_test_user,
+        create_test_note,
+        mock_redis,
+        query_counter,
+    ):
+        """Test that a write costs the same with 1 or 20 notes and one Redis trip."""
+        counts = []
+        for total in (1, 20):
+            headers, user = auth_headers(
+                create_test_user(
+                    username=f"writer{total}", email=f"writer{total}@example.com"
+                )
+            )
+            for i in range(total):
+                create_test_note(user, title=f"note {i}")
+            mock_redis.pipeline.return_value.execute.reset_mock()
+
+            with query_counter() as statements:
+                response = client.post(
+                    "/api/v1/notes/",
+                    json={"title": "new", "labels": ["a"]},
+                    headers=headers,
+                )
+
+            assert response.status_code == status.HTTP_200_OK
+            mock_redis.pipeline.return_value.execute.assert_awaited_once()
+            counts.append(len(statements))
+
+        assert counts[0] == counts[1]
+
+    @pytest.mark.asyncio
+    async def test_delete_note_keeps_shared_labels(
+        self, client, auth_headers, create_test_note, mock_redis
+    ):
+        """Test that deleting a note leaves labels other notes still use."""
+        headers, user = auth_headers()
+        removed = create_test_note(user, title="removed", labels=["shared"])
+        create_test_note(user, title="kept", labels=["shared"])
+
+        response = client.delete(f"/api/v1/notes/{removed.id}", headers=headers)
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        listed = client.get("/api/v1/notes/", headers=headers).json()["items"]
+        assert [label["name"] for label in listed[0]["labels"]] == ["shared"]
+
+    @pytest.mark.asyncio
+    async def test_get_labels_lists_only_own_labels(
+        self, client, auth_headers, create_test_user, create_test_note, mock_redis
+    ):
+        """Test that the shared label cache is narrowed to the user's labels."""
+        headers, user = auth_headers()
+        other = create_test_user(username="other", email="other@example.com")
+        create_test_note(user, labels=["work", "home"])
+        create_test_note(other, labels=["work", "secret"])
+        # Version, shared hash and its refreshed expiry: nothing cached yet.
+        mock_redis.pipeline.return_value.execute.return_value = [None, {}, 0]
+
+        response = client.get("/api/v1/notes/labels", headers=headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [label["name"] for label in response.json()] == ["home", "work"]
+        mock_redis.evalsha.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_get_labels_repairs_stale_shared_copy(
+        self, client, auth_headers, create_test_note, mock_redis
+    ):
+        """Test that a shared copy missing the user's labels is reloaded and
+        written back instead of being worked around on every request."""
+        headers, user = auth_headers()
+        create_test_note(user, labels=["work"])
+        mock_redis.pipeline.return_value.execute.return_value = [
+            b"v1",
+            {str(uuid.uuid4()).encode(): b"stale"},
+            1,
+        ]
+        mock_redis.get.return_value = b"v1"
+
+        response = client.get("/api/v1/notes/labels", headers=headers)
+
+        assert [label["name"] for label in response.json()] == ["work"]
+        (write,) = mock_redis.evalsha.await_args_list
+        assert write.args[0] == cache_labels_script.sha
+        assert write.args[4] == b"v1"
+        assert "work" in write.args[6:]
+
+    @pytest.mark.asyncio
+    async def test_create_note_invalidates_labels_only_when_new(
+        self, client, auth_headers, create_test_note, mock_redis
+    ):
+        """Test that the shared labels are dropped only when a label is created."""
+        headers, user = auth_headers()
+        create_test_note(user, labels=["work"])
+        pipe = mock_redis.pipeline.return_value
+
+        client.post(
+            "/api/v1/notes/", json={"title": "a", "labels": ["work"]}, headers=headers
+        )
+        pipe.incr.assert_not_called()
+
+        client.post(
+            "/api/v1/notes/", json={"title": "b", "labels": ["new"]}, headers=headers
+        )
+        pipe.incr.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_batch_rejects_empty(self, client, auth_headers, mock_redis):
+        """Test that a batch needs at least one operation."""
+        headers, _ = auth_headers()
+
+        response = client.post(
+            "/api/v1/notes/batch", json={"operations": []}, headers=headers
+        )
+
+        assert response.status_code == 422
+
+
+class TestNoteQueries:
+    """Test note query label loading."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("strategy", sorted(LABEL_LOADERS))
+    async def test_label_loading_is_constant(
+        self,
+        strategy,
+        create_test_user,
+        create_test_note,
+        async_session_factory,
+        query_counter,
+    ):
+        """Test that listing notes with labels costs the same at 2 and 20 notes."""
+        counts = []
+        for total in (2, 20):
+            user = create_test_user(
+                username=f"user{total}", email=f"user{total}@example.com"
+            )
+            for i in range(total):
+                create_test_note(user, labels=[f"{user.username}-{i}", "shared"])
+
+            async with async_session_factory() as db:
+                with query_counter() as statements:
+                    notes = await AsyncNoteQueries.get_user_notes(
+                        db, user.id, labels=strategy
+                    )
+                    payload = [NoteRead.model_validate(n) for n in notes]
+
+            assert len(payload) == total
+            assert all(len(note.labels) == 2 for note in payload)
+            counts.append(len(statements))
+
+        assert counts[0] == counts[1] <= 2
+
+    @pytest.mark.asyncio
+    async def test_label_resolution_is_one_statement(
+        self, create_test_user, create_test_note, async_session_factory, query_counter
+    ):
+        """Test that existing and new labels resolve in a single statement."""
+        user = create_test_user()
+        create_test_note(user, labels=["work", "home"])
+
+        async with async_session_factory() as db:
+            with query_counter() as statements:
+                labels = await AsyncNoteQueries.get_or_create_labels(
+                    db, ["home", " travel ", "work", "home", "ideas"]
+                )
+            await db.commit()
+
+        assert [label.name for label in labels] == ["home", "travel", "work", "ideas"]
+        assert len(statements) == 1
+
+    @pytest.mark.asyncio
+    async def test_label_race_keeps_created_flag(self):
+        """Test that labels created by the upsert are still reported when
+        another transaction created some of the others concurrently."""
+        created, raced = Label(id=uuid.uuid4(), name="new"), Label(name="raced")
+        db = MagicMock(info={})
+        db.execute = AsyncMock(
+            side_effect=[
+                MagicMock(all=lambda: [(created, True)]),
+                MagicMock(all=lambda: [(raced, False)]),
+            ]
+        )
+
+        labels = await AsyncNoteQueries.get_or_create_labels(db, ["raced", "new"])
+
+        assert labels == [raced, created]
+        assert labels_created(db) is True
+
+    @pytest.mark.asyncio
+    async def test_unknown_label_strategy(self, create_test_user):
+        """Test that an unknown loading strategy is rejected up front."""
+        with pytest.raises(ValueError):
+            await AsyncNoteQueries.get_user_notes(
+                None, create_test_user().id, labels="lazy"
+            )
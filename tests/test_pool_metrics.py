@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import QueuePool
+
+from db.pool_metrics import PoolMetrics, instrumented_pool
+
+
+@pytest.fixture
+def instrumented_engine(tmp_path):
+    """A small SQLite engine on an instrumented QueuePool."""
+    metrics = PoolMetrics("test")
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=instrumented_pool(QueuePool, metrics),
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.05,
+    )
+    metrics.attach(engine)
+    yield engine, metrics
+    engine.dispose()
+
+
+class TestPoolMetrics:
+    """Test connection pool instrumentation."""
+
+    def test_records_checkouts_and_occupancy(self, instrumented_engine):
+        """Test that checkouts, in-use and overflow are tracked."""
+        engine, metrics = instrumented_engine
+
+        with engine.connect() as first, engine.connect() as second:
+            first.execute(text("SELECT 1"))
+            second.execute(text("SELECT 1"))
+            stats = metrics.stats()
+            assert stats["in_use"] == 2
+            assert stats["overflow"] == 1
+
+        stats = metrics.stats()
+        assert stats["checkouts"] == 2
+        assert stats["overflow_checkouts"] == 1
+        assert stats["peak_in_use"] == 2
+        assert stats["in_use"] == 0
+        assert sum(stats["wait_ms_buckets"].values()) == 2
+
+    def test_counts_checkout_timeouts(self, instrumented_engine):
+        """Test that an exhausted pool records the timeout."""
+        engine, metrics = instrumented_engine
+
+        with engine.connect(), engine.connect():
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+
+        assert metrics.stats()["checkout_timeouts"] == 1
+
+    def test_metrics_survive_dispose(self, instrumented_engine):
+        """Test that a recreated pool keeps reporting to the same metrics."""
+        engine, metrics = instrumented_engine
+        engine.dispose()
+
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+        assert metrics.checkouts == 1
+        assert metrics.stats()["size"] == 1
@@ -0,0 +1,233 @@
+import asyncio
+import os
+import sys
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi import status
+from sqlalchemy.util import greenlet_spawn
+from starlette.routing import Route
+
+from config.config_loader import api_settings
+from middleware.profiling import (ProfilingMiddleware, sign_profile_token,
+                                  verify_profile_token)
+from utils.sampling_profiler import WAITING, ProfileStore, SamplingProfiler
+
+SECRET = "profiling-test-secret"
+
+
+def burn_cpu(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def app(scope, receive, send):
+    scope["route"] = Route("/notes/{note_id}", endpoint=None)
+    scope["path_params"] = {"note_id": "1"}
+    burn_cpu(0.05)
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def call(middleware, headers=()):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/notes/1",
+        "headers": list(headers),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware(scope, receive, send)
+    return dict(messages[0]["headers"])
+
+
+@pytest.fixture
+def profiler():
+    return SamplingProfiler(interval=0.001)
+
+
+class TestProfileTokens:
+    """Test the signed header that asks for a request to be profiled."""
+
+    def test_valid_token(self):
+        """Test that a fresh token signed with the secret is accepted."""
+        assert verify_profile_token(SECRET, sign_profile_token(SECRET, 60))
+
+    @pytest.mark.parametrize(
+        "secret, token",
+        [
+            (SECRET, sign_profile_token(SECRET, -1)),
+            (SECRET, sign_profile_token("another-secret", 60)),
+            (SECRET, "not-a-token"),
+            ("", sign_profile_token("", 60)),
+        ],
+        ids=["expired", "wrong-secret", "malformed", "no-secret"],
+    )
+    def test_rejected_token(self, secret, token):
+        """Test that expired, forged or unusable tokens are refused."""
+        assert not verify_profile_token(secret, token)
+
+
+class TestSamplingProfiler:
+    """Test stack sampling and where samples are attributed."""
+
+    @pytest.mark.asyncio
+    async def test_samples_attributed_to_request(self, profiler):
+        """Test that code run by the request is sampled below its root."""
+        session = profiler.start("GET /", sys._getframe())
+        burn_cpu(0.1)
+        await asyncio.sleep(0.05)
+        profiler.stop(session)
+
+        stacks = {";".join(stack): count for stack, count in session.samples.items()}
+        assert any("burn_cpu" in stack for stack in stacks)
+        assert stacks.get(WAITING, 0) > 0
+
+    @pytest.mark.asyncio
+    async def test_greenlet_work_joined_to_request(self, profiler):
+        """Test that sync work run through greenlet_spawn, as SQLAlchemy's
+        async engine does, is attributed to the request that started it."""
+        session = profiler.start("GET /", sys._getframe())
+        await greenlet_spawn(burn_cpu, 0.1)
+        profiler.stop(session)
+
+        greenlet_stacks = [
+            stack
+            for stack in session.samples
+            if stack
+            and "burn_cpu" in stack[-1]
+            and any("greenlet_spawn" in frame for frame in stack)
+        ]
+        assert greenlet_stacks
+
+    def test_folded_output(self):
+        """Test the collapsed-stack lines written for each profile."""
+        profiler = SamplingProfiler(interval=1)
+        session = profiler.start("GET /notes;x", None)
+        profiler.stop(session)
+        session.samples[("outer", "inner")] = 3
+        session.samples[(WAITING,)] = 2
+
+        assert session.folded().splitlines() == [
+            "GET /notes:x;[waiting] 2",
+            "GET /notes:x;outer;inner 3",
+        ]
+
+
+class TestProfilingMiddleware:
+    """Test which requests are profiled and what is written for them."""
+
+    @pytest.mark.asyncio
+    async def test_sampled_request_writes_profile(self, profiler, tmp_path):
+        """Test that a sampled request is saved under its route template."""
+        middleware = ProfilingMiddleware(
+            app, profiler, ProfileStore(str(tmp_path), 1 << 20), sample_rate=1
+        )
+
+        headers = await call(middleware)
+
+        profile_id = headers[b"x-profile-id"].decode()
+        (path,) = tmp_path.iterdir()
+        assert path.name == f"{profile_id}-GET_notes_note_id.folded"
+        lines = path.read_text().splitlines()
+        assert all(line.startswith("GET /notes/{note_id};") for line in lines)
+        assert any("burn_cpu" in line for line in lines)
+
+    @pytest.mark.asyncio
+    async def test_unsampled_request_untouched(self, profiler, tmp_path):
+        """Test that requests outside the sample are not profiled."""
+        middleware = ProfilingMiddleware(
+            app, profiler, ProfileStore(str(tmp_path), 1 << 20)
+        )
+
+        headers = await call(middleware)
+
+        assert b"x-profile-id" not in headers
+        assert not list(tmp_path.iterdir())
+
+    @pytest.mark.asyncio
+    async def test_signed_header_forces_profile(self, profiler, tmp_path, mock_redis):
+        """Test that a valid X-Profile header profiles the request and an
+        invalid one does not."""
+        middleware = ProfilingMiddleware(
+            app, profiler, ProfileStore(str(tmp_path), 1 << 20), secret=SECRET
+        )
+
+        forged = await call(middleware, [(b"x-profile", b"1.forged")])
+        signed = await call(
+            middleware, [(b"x-profile", sign_profile_token(SECRET, 60).encode())]
+        )
+
+        assert b"x-profile-id" not in forged
+        assert b"x-profile-id" in signed
+
+    @pytest.mark.asyncio
+    async def test_admin_toggle_read_from_redis(self, profiler, tmp_path, mock_redis):
+        """Test that the rate set with the toggle applies to every request."""
+        mock_redis.get.return_value = b"1"
+        middleware = ProfilingMiddleware(
+            app, profiler, ProfileStore(str(tmp_path), 1 << 20), secret=SECRET
+        )
+
+        headers = await call(middleware)
+
+        assert b"x-profile-id" in headers
+        mock_redis.get.assert_awaited_once_with("profiler:sample_rate")
+
+
+class TestProfileStore:
+    """Test the on-disk cap for saved profiles."""
+
+    def test_oldest_profiles_removed_over_cap(self, tmp_path):
+        """Test that the oldest files go first once the cap is exceeded."""
+        store = ProfileStore(str(tmp_path), max_bytes=350)
+        for age, name in enumerate(["c", "b", "a"]):
+            path = store.save(name, "x" * 100)
+            os.utime(path, (1000 - age * 10, 1000 - age * 10))
+        store.save("d", "x" * 100)
+
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            "b.folded",
+            "c.folded",
+            "d.folded",
+        ]
+
+
+class TestProfilerToggle:
+    """Test the endpoint that turns on sampling across workers."""
+
+    def test_toggle_requires_token(self, client, mock_redis, metrics_headers):
+        """Test that the toggle is refused without a signed token."""
+        with patch.object(api_settings, "PROFILER_SECRET", SECRET):
+            response = client.put(
+                "/api/v1/metrics/profiler",
+                params={"sample_rate": 0.5},
+                headers=metrics_headers,
+            )
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        mock_redis.set.assert_not_awaited()
+
+    def test_toggle_sets_rate(self, client, mock_redis, metrics_headers):
+        """Test that a signed request stores the rate with an expiry."""
+        with patch.object(api_settings, "PROFILER_SECRET", SECRET):
+            response = client.put(
+                "/api/v1/metrics/profiler",
+                params={"sample_rate": 0.5, "seconds": 60},
+                headers={
+                    **metrics_headers,
+                    "X-Profile": sign_profile_token(SECRET, 60),
+                },
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        mock_redis.set.assert_awaited_once_with("profiler:sample_rate", 0.5, ex=60)
@@ -0,0 +1,94 @@
+from unittest.mock import patch
+
+import pytest
+from fastapi import status
+from redis.exceptions import ConnectionError
+
+from db.redis import rate_limit_script
+from middleware.throttling import limiter, parse_rate
+
+
+@pytest.fixture
+def rate_limits():
+    with patch.object(limiter, "enabled", True):
+        yield
+
+
+class TestRateLimit:
+    """Test the Redis backed per-route rate limits."""
+
+    @pytest.mark.parametrize(
+        "rate, expected",
+        [
+            ("5/minute", (5, 60_000)),
+            ("100 / hour", (100, 3_600_000)),
+            ("10/5 seconds", (10, 5_000)),
+            ("1/day", (1, 86_400_000)),
+        ],
+    )
+    def test_parse_rate(self, rate, expected):
+        """Test that rates parse into a limit and a window in milliseconds."""
+        assert parse_rate(rate) == expected
+
+    def test_parse_rate_invalid(self):
+        """Test that an unknown period is rejected when the route is defined."""
+        with pytest.raises(ValueError):
+            parse_rate("5/fortnight")
+
+    @pytest.mark.asyncio
+    async def test_anonymous_requests_keyed_by_ip(
+        self, client, mock_redis, rate_limits
+    ):
+        """Test that routes without a token count against the client IP."""
+        mock_redis.evalsha.return_value = [1, 4]
+
+        client.post("/api/v1/auth/login", json={"username": "a", "password": "b"})
+
+        sha, _, key, limit, window_ms, _ = mock_redis.evalsha.await_args.args
+        assert sha == rate_limit_script.sha
+        assert key == "ratelimit:routes.auth_router.login:ip:testclient"
+        assert (limit, window_ms) == (5, 60_000)
+
+    @pytest.mark.asyncio
+    async def test_authenticated_requests_keyed_by_user(
+        self, client, auth_headers, mock_redis, rate_limits
+    ):
+        """Test that routes behind a token count against the user, not the IP."""
+        headers, user = auth_headers()
+        mock_redis.evalsha.return_value = [1, 4]
+
+        response = client.get("/api/v1/auth/logout", headers=headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        key = next(
+            call.args[2]
+            for call in mock_redis.evalsha.await_args_list
+            if call.args[0] == rate_limit_script.sha
+        )
+        assert key == f"ratelimit:routes.auth_router.logout:user:{user.id}"
+
+    @pytest.mark.asyncio
+    async def test_rejected_with_retry_after(self, client, mock_redis, rate_limits):
+        """Test that a request over the limit gets 429 and when to retry."""
+        mock_redis.evalsha.return_value = [0, 1500]
+
+        response = client.post(
+            "/api/v1/auth/login", json={"username": "a", "password": "b"}
+        )
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert response.headers["Retry-After"] == "2"
+        assert "Rate limit exceeded" in response.json()["detail"]
+
+    @pytest.mark.asyncio
+    async def test_redis_unavailable_lets_requests_through(
+        self, client, mock_redis, rate_limits
+    ):
+        """Test that the limiter fails open when Redis cannot be reached."""
+        mock_redis.evalsha.side_effect = ConnectionError()
+
+        response = client.post(
+            "/api/v1/auth/login", json={"username": "a", "password": "b"}
+        )
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,230 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+
+from config.config_loader import db_settings
+from db.redis import (EMPTY_NOTES_PAGE, NOTES_NOT_CACHED, NOTES_OVER_CAP,
+                      cache_memory_report, cache_user_data, cache_user_notes,
+                      get_cached_notes_page, notes_state_script,
+                      rebuild_user_notes, release_lock_script)
+from schema.note_schema import NoteRead
+from schema.user_schema import UserRead
+from utils.single_flight import SingleFlight
+
+
+def make_notes(count):
+    now = datetime.now()
+    return [
+        NoteRead(
+            id=uuid.uuid4(),
+            title=f"note {i}",
+            content=None,
+            created_at=now + timedelta(i),
+            labels=[],
+        )
+        for i in range(count)
+    ]
+
+
+class TestCacheLimits:
+    """Test expiry and size limits of the Redis cache."""
+
+    @pytest.mark.asyncio
+    async def test_notes_cached_with_expiry(self, mock_redis):
+        """Test that a cached list expires after the notes TTL."""
+        notes = make_notes(2)
+
+        await cache_user_notes("alice", notes, "v1")
+
+        args = mock_redis.pipeline.return_value.eval.call_args.args
+        assert args[5:8] == ("v1", db_settings.CACHE_NOTES_TTL_SECONDS, "")
+        assert args[8::3] == tuple(str(n.id) for n in notes)
+
+    @pytest.mark.asyncio
+    async def test_user_cached_as_response_json(self, mock_redis):
+        """Test that the profile is stored exactly as it is served."""
+        now = datetime.now()
+        user = UserRead(
+            id=uuid.uuid4(),
+            username="alice",
+            email="alice@example.com",
+            created_at=now,
+            updated_at=now,
+        )
+
+        await cache_user_data("alice", user)
+
+        first_set = mock_redis.pipeline.return_value.set.call_args_list[0]
+        assert first_set.args == ("user:alice:profile", user.model_dump_json())
+        assert first_set.kwargs == {"ex": db_settings.CACHE_USER_TTL_SECONDS}
+
+    @pytest.mark.asyncio
+    async def test_notes_over_cap_not_cached(self, mock_redis, monkeypatch):
+        """Test that a user above the cap only has the list marked as such."""
+        monkeypatch.setattr(db_settings, "CACHE_NOTES_MAX_PER_USER", 2)
+
+        await cache_user_notes("alice", make_notes(3), "v1")
+
+        args = mock_redis.pipeline.return_value.eval.call_args.args
+        assert args[2:] == (
+            "notes:alice",
+            "notes:alice:index",
+            "notes:alice:version",
+            "v1",
+            db_settings.CACHE_NOTES_TTL_SECONDS,
+            NOTES_OVER_CAP,
+        )
+
+    @pytest.mark.parametrize(
+        "state, page",
+        [
+            (b"empty", EMPTY_NOTES_PAGE),
+            (b"listed", EMPTY_NOTES_PAGE),
+            (b"over_cap", NOTES_NOT_CACHED),
+            (None, None),
+        ],
+        ids=["no-notes", "past-the-end", "over-cap", "missing"],
+    )
+    @pytest.mark.asyncio
+    async def test_list_without_members(self, mock_redis, state, page):
+        """Test that an empty or over-cap list is answered without a rebuild,
+        and only a missing one is reported as a miss."""
+        mock_redis.evalsha.return_value = state
+
+        assert await get_cached_notes_page("alice", 10) == page
+        assert mock_redis.evalsha.await_args.args[0] == notes_state_script.sha
+
+    @pytest.mark.asyncio
+    async def test_memory_report_by_keyspace(self, mock_redis):
+        """Test that keys and bytes are summed per keyspace."""
+        keys = [b"user:a", b"user:b", b"notes:a", b"notes:a:index", b"celery"]
+
+        async def scan_iter(count):
+            for key in keys:
+                yield key
+
+        mock_redis.scan_iter = scan_iter
+        mock_redis.pipeline.return_value.execute.return_value = [10, 20, 300, 40, 5]
+
+        assert await cache_memory_report() == {
+            "keyspaces": {
+                "user": {"keys": 2, "bytes": 30},
+                "notes": {"keys": 2, "bytes": 340},
+                "other": {"keys": 1, "bytes": 5},
+            },
+            "scanned": 5,
+            "truncated": False,
+        }
+
+    @pytest.mark.asyncio
+    async def test_memory_report_stops_at_max_keys(self, mock_redis):
+        """Test that a capped report scans no further and says so."""
+
+        async def scan_iter(count):
+            for key in [b"user:a", b"user:b", b"notes:a"]:
+                yield key
+
+        mock_redis.scan_iter = scan_iter
+        mock_redis.pipeline.return_value.execute.return_value = [10, 20]
+
+        report = await cache_memory_report(max_keys=2)
+
+        assert report["keyspaces"] == {"user": {"keys": 2, "bytes": 30}}
+        assert report["truncated"]
+
+
+class TestSingleFlight:
+    """Test request coalescing."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_run(self):
+        """Test that callers arriving during a run get its result."""
+        flight, runs = SingleFlight(), []
+
+        async def load():
+            runs.append(1)
+            await asyncio.sleep(0.01)
+            return len(runs)
+
+        results = await asyncio.gather(*(flight.do("alice", load) for _ in range(10)))
+
+        assert results == [1] * 10
+        assert len(flight) == 0
+        assert await flight.do("alice", load) == 2
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        """Test that the run outlives a caller that gives up."""
+        flight = SingleFlight()
+
+        async def load():
+            await asyncio.sleep(0.01)
+            return "notes"
+
+        first = asyncio.ensure_future(flight.do("alice", load))
+        second = asyncio.ensure_future(flight.do("alice", load))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await second == "notes"
+
+
+class TestNotesRebuild:
+    """Test rebuilding a missing note list."""
+
+    @pytest.mark.asyncio
+    async def test_rebuild_caches_and_releases_lock(self, mock_redis):
+        """Test that the lock holder caches what it loaded and lets go."""
+        load = AsyncMock(return_value=make_notes(2))
+
+        assert await rebuild_user_notes("alice", load) == load.return_value
+        mock_redis.pipeline.return_value.eval.assert_called_once()
+        assert mock_redis.evalsha.await_args.args[0] == release_lock_script.sha
+
+    @pytest.mark.asyncio
+    async def test_rebuild_outlives_cancelled_caller(self, mock_redis):
+        """Test that cancelling the request that started a rebuild, as when its
+        client disconnects, still answers the requests waiting on it."""
+        started, release = asyncio.Event(), asyncio.Event()
+        notes = make_notes(2)
+
+        async def load(user_id, count):
+            started.set()
+            await release.wait()
+            return notes
+
+        first = asyncio.ensure_future(rebuild_user_notes("alice", load))
+        await started.wait()
+        second = asyncio.ensure_future(rebuild_user_notes("alice", load))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+
+        assert await second == notes
+        assert first.cancelled()
+        assert mock_redis.evalsha.await_args.args[0] == release_lock_script.sha
+
+    @pytest.mark.asyncio
+    async def test_rebuild_skipped_while_locked(self, mock_redis):
+        """Test that only the worker holding the lock loads the list."""
+        mock_redis.set.return_value = None
+        load = AsyncMock()
+
+        assert await rebuild_user_notes("alice", load) is None
+        load.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_rebuild_over_cap_marks_list(self, mock_redis, monkeypatch):
+        """Test that a list too large to cache is marked so that it is not
+        reloaded, and the lock is let go."""
+        monkeypatch.setattr(db_settings, "CACHE_NOTES_MAX_PER_USER", 2)
+        load = AsyncMock(return_value=make_notes(3))
+
+        assert await rebuild_user_notes("alice", load) is None
+        load.assert_awaited_once_with("alice", 3)
+        args = mock_redis.pipeline.return_value.eval.call_args.args
+        assert args[7:] == (NOTES_OVER_CAP,)
+        assert mock_redis.evalsha.await_args.args[0] == release_lock_script.sha
@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+
+from db.replicas import (ReplicaSet, RoutingSession, primary_reads,
+                         replica_reads, use_primary)
+
+
+@pytest.fixture
+def routing(tmp_path):
+    """A primary and one replica engine behind a routing session."""
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    replicas = ReplicaSet(
+        [SimpleNamespace(sync_engine=replica)], sticky_seconds=5, health_interval=5
+    )
+    session = RoutingSession(bind=primary, replicas=replicas)
+    yield session, primary, replica, replicas
+    session.close()
+    primary.dispose()
+    replica.dispose()
+
+
+class TestRoutingSession:
+    """Test read replica routing."""
+
+    def test_reads_default_to_primary(self, routing):
+        """Test that reads outside replica_reads stay on the primary."""
+        session, primary, _, _ = routing
+
+        assert session.get_bind() is primary
+
+    def test_replica_reads_use_replica(self, routing):
+        """Test that marked reads go to a replica."""
+        session, primary, replica, _ = routing
+
+        with replica_reads(session):
+            assert session.get_bind() is replica
+        assert session.get_bind() is primary
+
+    def test_pinned_session_stays_on_primary(self, routing):
+        """Test that a session pinned after a write reads from the primary."""
+        session, primary, _, _ = routing
+        use_primary(session)
+
+        with replica_reads(session):
+            assert session.get_bind() is primary
+
+    def test_primary_reads_scoped_to_block(self, routing):
+        """Test that primary_reads overrides replica reads only inside it."""
+        session, primary, replica, _ = routing
+
+        with replica_reads(session):
+            with primary_reads(session):
+                assert session.get_bind() is primary
+            assert session.get_bind() is replica
+
+    def test_unhealthy_replicas_fall_back_to_primary(self, routing):
+        """Test that reads fall back when no replica is healthy."""
+        session, primary, _, replicas = routing
+        replicas.healthy = []
+
+        with replica_reads(session):
+            assert session.get_bind() is primary
+
+    def test_no_replicas_configured(self, tmp_path):
+        """Test that an empty replica set never reroutes."""
+        primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+        session = RoutingSession(
+            bind=primary,
+            replicas=ReplicaSet([], sticky_seconds=5, health_interval=5),
+        )
+
+        with replica_reads(session):
+            assert session.get_bind() is primary
+        session.close()
@@ -0,0 +1,145 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import redis.asyncio as redis
+from fastapi import status
+from sqlalchemy import create_engine, text
+
+from db.database import time_statements
+from db.redis import TimedRedis
+from routes import metrics_router
+from utils.request_metrics import (Histogram, RequestMetrics, RequestTimings,
+                                   request_metrics, request_timings)
+
+
+@pytest.fixture
+def timings():
+    """Attribute work to a request, as the middleware does."""
+    timings = RequestTimings()
+    token = request_timings.set(timings)
+    yield timings
+    request_timings.reset(token)
+
+
+class TestRequestMetrics:
+    """Test per-route request metrics and their Prometheus rendering."""
+
+    def test_histogram_buckets_are_upper_bounds(self):
+        """Test that a value on a bucket bound counts in that bucket."""
+        histogram = Histogram((0.1, 1))
+        for value in (0.05, 0.1, 0.5, 5):
+            histogram.observe(value)
+
+        assert histogram.counts == [2, 1, 1]
+        assert histogram.sum == pytest.approx(5.65)
+
+    def test_render_prometheus_text(self):
+        """Test counters and cumulative histogram buckets per route."""
+        metrics = RequestMetrics()
+        metrics.record("GET", "/notes/{note_id}", 200, 0.003, RequestTimings())
+        metrics.record("GET", "/notes/{note_id}", 404, 0.2, RequestTimings())
+
+        lines = metrics.render().splitlines()
+
+        labels = 'method="GET",route="/notes/{note_id}"'
+        assert f'fundoo_http_requests_total{{{labels},status="200"}} 1' in lines
+        assert f'fundoo_http_requests_total{{{labels},status="404"}} 1' in lines
+        name = "fundoo_http_request_duration_seconds"
+        assert f'{name}_bucket{{{labels},le="0.005"}} 1' in lines
+        assert f'{name}_bucket{{{labels},le="0.25"}} 2' in lines
+        assert f'{name}_bucket{{{labels},le="+Inf"}} 2' in lines
+        assert f"{name}_count{{{labels}}} 2" in lines
+        assert "# TYPE fundoo_db_seconds histogram" in lines
+
+    @pytest.mark.asyncio
+    async def test_routes_recorded_by_template(self, client, auth_headers, mock_redis):
+        """Test that requests are labelled with the route, not the raw path."""
+        headers, _ = auth_headers()
+        request_metrics.clear()
+
+        client.get(
+            "/api/v1/notes/3fa85f64-5717-4562-b3fc-2c963f66afa6", headers=headers
+        )
+        client.get("/api/v1/no-such-route")
+
+        routes = {
+            (route, code)
+            for (_, route), metrics in request_metrics.routes.items()
+            for code in metrics.statuses
+        }
+        assert ("/api/v1/notes/{note_id}", status.HTTP_405_METHOD_NOT_ALLOWED) in routes
+        assert ("<unmatched>", status.HTTP_404_NOT_FOUND) in routes
+
+    @pytest.mark.asyncio
+    async def test_prometheus_endpoint(self, client, mock_redis, metrics_headers):
+        """Test that the metrics endpoint serves the text format."""
+        client.get("/api/v1/no-such-route")
+
+        response = client.get("/api/v1/metrics/prometheus", headers=metrics_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "fundoo_http_requests_total{" in response.text
+
+    def test_statements_timed_per_request(self, tmp_path, timings):
+        """Test that engine hooks add statement time to the current request."""
+        engine = create_engine(f"sqlite:///{tmp_path / 'timing.db'}")
+        time_statements(engine)
+
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT 2"))
+        engine.dispose()
+
+        assert timings.db_statements == 2
+        assert timings.db_seconds > 0
+
+    @pytest.mark.asyncio
+    async def test_redis_commands_timed_per_request(self, timings):
+        """Test that the client wrapper adds command time to the request."""
+        with patch.object(redis.Redis, "execute_command", AsyncMock(return_value=1)):
+            await TimedRedis().exists("key")
+
+        assert timings.redis_commands == 1
+
+
+class TestMetricsAccess:
+    """Test who may read the /metrics endpoints."""
+
+    @pytest.mark.parametrize(
+        "path", ["hashing", "token-cache", "db-pool", "cache", "prometheus"]
+    )
+    @pytest.mark.parametrize(
+        "headers",
+        [{}, {"Authorization": "Bearer wrong-token"}],
+        ids=["anonymous", "wrong-token"],
+    )
+    def test_refused_without_token(self, client, metrics_headers, path, headers):
+        """Test that every endpoint needs the metrics token."""
+        response = client.get(f"/api/v1/metrics/{path}", headers=headers)
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_refused_when_no_token_configured(self, client, mock_redis):
+        """Test that an unset METRICS_TOKEN does not let an empty bearer in."""
+        response = client.get(
+            "/api/v1/metrics/cache", headers={"Authorization": "Bearer "}
+        )
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_memory_report_computed_once(
+        self, client, mock_redis, metrics_headers, monkeypatch
+    ):
+        """Test that repeated reads within a minute share one SCAN."""
+        monkeypatch.setattr(metrics_router, "_memory_report", None)
+        report = AsyncMock(return_value={"keyspaces": {}, "truncated": False})
+        monkeypatch.setattr(metrics_router, "cache_memory_report", report)
+
+        for _ in range(3):
+            response = client.get(
+                "/api/v1/metrics/cache/memory", headers=metrics_headers
+            )
+            assert response.status_code == status.HTTP_200_OK
+
+        report.assert_awaited_once_with(max_keys=metrics_router.MEMORY_REPORT_MAX_KEYS)
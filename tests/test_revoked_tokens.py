@@ -0,0 +1,103 @@
+import time
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from db.redis import token_in_blocklist
+from db.revoked_tokens import (LEGACY_BLOCKLIST_PATTERN, LEGACY_MIGRATED_KEY,
+                               REVOKED_TOKENS_KEY, RevokedTokenFilter,
+                               migrate_legacy_entries)
+
+
+class TestRevokedTokenFilter:
+    """Test the per-worker revoked JTI filter."""
+
+    def test_not_ready_defers_to_redis(self):
+        """Test that an unsynced filter reports every jti as a candidate."""
+        revoked = RevokedTokenFilter()
+
+        assert revoked.might_contain("any-jti") is True
+
+    def test_ready_filter_skips_unknown_jti(self):
+        """Test that a synced filter only flags revoked jtis."""
+        revoked = RevokedTokenFilter()
+        revoked.ready = True
+        revoked.add("revoked-jti", time.time() + 60)
+
+        assert revoked.might_contain("revoked-jti") is True
+        assert revoked.might_contain("live-jti") is False
+
+    def test_expired_entries_are_ignored(self):
+        """Test that revocations of already expired tokens are not kept."""
+        revoked = RevokedTokenFilter()
+        revoked.ready = True
+        revoked.add("old-jti", time.time() - 1)
+
+        assert revoked.might_contain("old-jti") is False
+
+    @pytest.mark.asyncio
+    async def test_seeded_from_live_revocations(self):
+        """Test that the seed reads the revoked set from now on, without
+        scanning the keyspace."""
+        client = MagicMock()
+        client.exists = AsyncMock(return_value=1)
+        client.zrangebyscore = AsyncMock(
+            return_value=[(b"revoked-jti", time.time() + 60)]
+        )
+        revoked = RevokedTokenFilter()
+
+        await revoked.on_subscribed(client)
+        revoked.ready = True
+
+        assert client.zrangebyscore.await_args.args[0] == REVOKED_TOKENS_KEY
+        assert client.zrangebyscore.await_args.args[2] == "+inf"
+        client.scan_iter.assert_not_called()
+        assert revoked.might_contain("revoked-jti") is True
+        assert revoked.might_contain("live-jti") is False
+
+    @pytest.mark.asyncio
+    async def test_legacy_entries_migrated_once(self):
+        """Test that revocations stored under the bare JTI are moved into the
+        set with their remaining TTL, and the scan is not repeated."""
+        legacy, expired = str(uuid.uuid4()), str(uuid.uuid4())
+
+        async def scan_iter(match, count):
+            assert match == LEGACY_BLOCKLIST_PATTERN
+            for key in (legacy.encode(), expired.encode()):
+                yield key
+
+        client = MagicMock()
+        client.exists = AsyncMock(return_value=0)
+        client.scan_iter = scan_iter
+        client.pipeline.return_value.execute = AsyncMock(return_value=[600, -2])
+        client.zadd = AsyncMock()
+        client.set = AsyncMock()
+
+        await migrate_legacy_entries(client)
+
+        key, revoked = client.zadd.await_args.args
+        assert key == REVOKED_TOKENS_KEY
+        assert list(revoked) == [legacy.encode()]
+        assert revoked[legacy.encode()] > time.time() + 590
+        client.set.assert_awaited_once_with(LEGACY_MIGRATED_KEY, 1)
+
+        client.exists.return_value = 1
+        client.zadd.reset_mock()
+        await migrate_legacy_entries(client)
+        client.zadd.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_lookup_reads_revoked_set(self, mock_redis):
+        """Test that Redis is asked for the jti's score in the revoked set."""
+        mock_redis.zscore.return_value = time.time() + 60
+
+        assert await token_in_blocklist("some-jti") is True
+        mock_redis.zscore.assert_awaited_once_with(REVOKED_TOKENS_KEY, "some-jti")
+
+    @pytest.mark.asyncio
+    async def test_lookup_ignores_expired_entry(self, mock_redis):
+        """Test that an entry not yet trimmed no longer counts past its exp."""
+        mock_redis.zscore.return_value = time.time() - 1
+
+        assert await token_in_blocklist("old-jti") is False
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from redis.exceptions import ConnectionError
+
+from db import subscriber
+from db.subscriber import ChannelSubscriber
+
+
+class Recorder(ChannelSubscriber):
+    channel = "test"
+
+    def __init__(self):
+        super().__init__()
+        self.events = []
+        self.received = asyncio.Event()
+
+    async def on_subscribed(self, client):
+        self.events.append("subscribed")
+
+    def on_message(self, data):
+        self.events.append(data)
+        self.received.set()
+
+    def on_unsubscribed(self):
+        self.events.append("unsubscribed")
+
+
+def fake_client(*sessions):
+    """A client whose successive subscriptions yield ``sessions``: a list of
+    messages, or an exception raised while listening."""
+    pubsubs = []
+    for session in sessions:
+
+        async def listen(session=session):
+            if isinstance(session, Exception):
+                raise session
+            for data in session:
+                yield {"type": "message", "data": data}
+            await asyncio.Event().wait()
+
+        pubsub = MagicMock()
+        pubsub.subscribe = AsyncMock()
+        pubsub.aclose = AsyncMock()
+        pubsub.listen = listen
+        pubsubs.append(pubsub)
+
+    client = MagicMock()
+    client.pubsub.side_effect = pubsubs
+    return client
+
+
+class TestChannelSubscriber:
+    """Test the reconnect loop shared by the pub/sub backed worker state."""
+
+    @pytest.mark.asyncio
+    async def test_lost_subscription_logged_and_resynced(self, monkeypatch, caplog):
+        """Test that a dropped connection is logged, the state is reset and
+        resynced, and messages are applied again."""
+        monkeypatch.setattr(subscriber, "RESYNC_DELAY", 0)
+        recorder = Recorder()
+        client = fake_client(ConnectionError("gone"), [b"hello"])
+
+        with caplog.at_level(logging.WARNING, logger="db.subscriber"):
+            recorder.start(client)
+            await asyncio.wait_for(recorder.received.wait(), 1)
+
+        assert recorder.ready is True
+        assert recorder.events == [
+            "subscribed",
+            "unsubscribed",
+            "subscribed",
+            b"hello",
+        ]
+        (record,) = caplog.records
+        assert "test subscription" in record.getMessage()
+        assert isinstance(record.exc_info[1], ConnectionError)
+
+        await recorder.stop()
+        assert recorder.ready is False
@@ -0,0 +1,132 @@
+import time
+import uuid
+
+from auth.token_cache import TokenCache, token_cache
+from db.redis import TOKENS_KEYSPACE, local_cache
+from utils.ttl_cache import TTLCache
+
+
+def make_claims(user_id="user-1", jti=None, exp_in=600):
+    return {
+        "user": {"username": "testuser", "user_id": user_id},
+        "jti": jti or str(uuid.uuid4()),
+        "exp": int(time.time()) + exp_in,
+        "refresh": False,
+    }
+
+
+class TestTTLCache:
+    """Test the in-process TTL/LRU cache."""
+
+    def test_evicts_least_recently_used(self):
+        """Test that the oldest untouched entry is evicted first."""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.evictions == 1
+
+    def test_entries_expire(self):
+        """Test that entries are dropped after their TTL."""
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("a", 1, ttl=0.01)
+        time.sleep(0.02)
+
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+
+class TestTokenCache:
+    """Test the verified token cache."""
+
+    def test_claims_hit_requires_same_token(self):
+        """Test that a cached jti is only served for the exact token."""
+        cache = TokenCache(maxsize=10, ttl=60)
+        claims = make_claims()
+        cache.set_secret("user-1", "secret")
+        cache.set_claims("token-a", "secret", claims)
+
+        assert cache.get_claims("token-a", claims) == claims
+        assert cache.get_claims("token-b", claims) is None
+
+    def test_invalidate_user_drops_claims(self):
+        """Test that dropping the signing key invalidates cached tokens."""
+        cache = TokenCache(maxsize=10, ttl=60)
+        claims = make_claims()
+        cache.set_secret("user-1", "secret")
+        cache.set_claims("token-a", "secret", claims)
+
+        cache.invalidate_user("user-1")
+
+        assert cache.get_secret("user-1") is None
+        assert cache.get_claims("token-a", claims) is None
+
+    def test_rotated_secret_drops_claims(self):
+        """Test that claims verified with an old key are not served."""
+        cache = TokenCache(maxsize=10, ttl=60)
+        claims = make_claims()
+        cache.set_secret("user-1", "old-secret")
+        cache.set_claims("token-a", "old-secret", claims)
+
+        cache.set_secret("user-1", "new-secret")
+
+        assert cache.get_claims("token-a", claims) is None
+
+    def test_invalidate_token(self):
+        """Test that logging out removes the token's claims."""
+        cache = TokenCache(maxsize=10, ttl=60)
+        claims = make_claims()
+        cache.set_secret("user-1", "secret")
+        cache.set_claims("token-a", "secret", claims)
+
+        cache.invalidate_token(claims["jti"])
+
+        assert cache.get_claims("token-a", claims) is None
+
+    def test_expired_token_not_cached(self):
+        """Test that already expired claims are never stored."""
+        cache = TokenCache(maxsize=10, ttl=60)
+        claims = make_claims(exp_in=-1)
+        cache.set_secret("user-1", "secret")
+        cache.set_claims("token-a", "secret", claims)
+
+        assert cache.get_claims("token-a", claims) is None
+
+
+class TestTokenInvalidationAcrossWorkers:
+    """Test that dropping a user's signing key reaches every worker."""
+
+    def test_invalidation_message_drops_secret(self):
+        """Test that a message from another worker drops the key here."""
+        token_cache.set_secret("user-1", "secret")
+        token_cache.set_secret("user-2", "secret")
+
+        local_cache.on_message(local_cache.message(TOKENS_KEYSPACE, "user-1"))
+
+        assert token_cache.get_secret("user-1") is None
+        assert token_cache.get_secret("user-2") == "secret"
+
+    def test_resync_drops_every_secret(self):
+        """Test that keys are dropped when invalidations may have been missed."""
+        token_cache.set_secret("user-1", "secret")
+
+        local_cache.clear()
+
+        assert token_cache.get_secret("user-1") is None
+
+    def test_delete_user_publishes_invalidation(self, client, auth_headers, mock_redis):
+        """Test that deleting a user tells the other workers to drop the key."""
+        headers, user = auth_headers()
+
+        response = client.delete("/api/v1/users/me", headers=headers)
+
+        assert response.status_code == 200
+        published = [
+            c.args[1] for c in mock_redis.pipeline.return_value.publish.call_args_list
+        ]
+        assert local_cache.message(TOKENS_KEYSPACE, str(user.id)) in published
+        assert token_cache.get_secret(str(user.id)) is None
@@ -0,0 +1,126 @@
+import pytest
+from fastapi import status
+
+from auth.token_cache import token_cache
+from db.redis import local_cache
+from schema.user_schema import UserRead
+
+
+class TestUserRoutes:
+    """Test user routes."""
+
+    @pytest.mark.asyncio
+    async def test_get_me_resolves_identity_once(
+        self, client, auth_headers, mock_redis, query_counter
+    ):
+        """Test that an authenticated profile read costs at most one query."""
+        headers, user = auth_headers()
+        token_cache.invalidate_user(str(user.id))
+
+        with query_counter() as statements:
+            response = client.get("/api/v1/users/me", headers=headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["payload"]["username"] == user.username
+        assert len(statements) <= 1
+
+    @pytest.mark.asyncio
+    async def test_get_me_with_cached_signing_key(
+        self, client, auth_headers, mock_redis, query_counter
+    ):
+        """Test that a warm token cache leaves only the profile load."""
+        headers, _ = auth_headers()
+        client.get("/api/v1/users/me", headers=headers)
+
+        with query_counter() as statements:
+            response = client.get("/api/v1/users/me", headers=headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(statements) <= 1
+
+    @pytest.mark.asyncio
+    async def test_get_me_served_from_worker_cache(
+        self, client, auth_headers, mock_redis, monkeypatch
+    ):
+        """Test that a repeated profile read skips Redis until invalidated."""
+        headers, user = auth_headers()
+        monkeypatch.setattr(local_cache, "ready", True)
+        mock_redis.getex.side_effect = lambda key, ex: (
+            UserRead.model_validate(user).model_dump_json().encode()
+            if key == f"user:{user.id}:profile"
+            else None
+        )
+
+        for _ in range(3):
+            response = client.get("/api/v1/users/me", headers=headers)
+            assert response.json()["message"] == "User Fetched from Cache"
+        user_reads = [c for c in mock_redis.getex.await_args_list if "user:" in str(c)]
+        assert len(user_reads) == 1
+
+        local_cache.invalidate("user", str(user.id))
+        client.get("/api/v1/users/me", headers=headers)
+        user_reads = [c for c in mock_redis.getex.await_args_list if "user:" in str(c)]
+        assert len(user_reads) == 2
+
+    @pytest.mark.asyncio
+    async def test_get_me_cache_hit_matches_database_read(
+        self, client, auth_headers, mock_redis
+    ):
+        """Test that the wrapped cached profile has the shape of a fresh read."""
+        headers, user = auth_headers()
+        fresh = client.get("/api/v1/users/me", headers=headers)
+        mock_redis.getex.side_effect = lambda key, ex: (
+            UserRead.model_validate(user).model_dump_json().encode()
+            if key == f"user:{user.id}:profile"
+            else None
+        )
+        local_cache.clear()
+
+        cached = client.get("/api/v1/users/me", headers=headers)
+
+        assert cached.headers["content-type"] == "application/json"
+        assert cached.headers["ETag"] == fresh.headers["ETag"]
+        assert cached.json() == {
+            **fresh.json(),
+            "message": "User Fetched from Cache",
+        }
+
+    @pytest.mark.asyncio
+    async def test_get_me_not_modified(
+        self, client, auth_headers, mock_redis, query_counter
+    ):
+        """Test that a matching ETag is a 304 without touching Postgres."""
+        headers, _ = auth_headers()
+        etag = client.get("/api/v1/users/me", headers=headers).headers["ETag"]
+
+        with query_counter() as statements:
+            response = client.get(
+                "/api/v1/users/me", headers={**headers, "If-None-Match": etag}
+            )
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert statements == []
+
+    @pytest.mark.asyncio
+    async def test_renamed_user_reads_refreshed_profile(
+        self, client, auth_headers, mock_redis, sample_user_data
+    ):
+        """Test that a token issued before a rename reads the profile cached by
+        the rename, not an entry under the old username."""
+        headers, user = auth_headers()
+
+        response = client.patch(
+            "/api/v1/users/me",
+            json={**sample_user_data, "username": "renamed"},
+            headers=headers,
+        )
+        assert response.status_code == status.HTTP_200_OK
+        written = {
+            c.args[0] for c in mock_redis.pipeline.return_value.set.call_args_list
+        }
+
+        client.get("/api/v1/users/me", headers=headers)
+
+        (read,) = [c.args[0] for c in mock_redis.getex.await_args_list]
+        assert read in written
+        assert user.username not in read
@@ -0,0 +1,22 @@
+from fastapi import Request, Response, status
+
+
+def format_etag(version: str) -> str:
+    # Weak: the body carries a message that differs between cache hits and
+    # misses, while the payload it describes is the same.
+    return f'W/"{version}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison of ``etag`` against the request's ``If-None-Match``."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
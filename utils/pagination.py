@@ -0,0 +1,23 @@
+import base64
+from datetime import datetime
+from uuid import UUID
+
+
+def encode_cursor(created_at: datetime, note_id: UUID) -> str:
+    """Opaque keyset cursor pointing just past the given note."""
+    raw = f"{created_at.isoformat()}|{note_id}".encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """Inverse of ``encode_cursor``; raises ``ValueError`` on anything else."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, note_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        created_at = datetime.fromisoformat(created_at)
+        # Note times are stored naive and cannot be compared with an aware one.
+        if created_at.tzinfo is not None:
+            raise ValueError("cursor time has an offset")
+        return created_at, UUID(note_id)
+    except ValueError as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
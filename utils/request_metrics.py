@@ -0,0 +1,169 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+
+# Prometheus' default latency buckets, in seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Database and Redis time per request sits well below the request itself.
+IO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class RequestTimings:
+    """Time the current request spent waiting on the database and Redis."""
+
+    __slots__ = ("db_seconds", "db_statements", "redis_seconds", "redis_commands")
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.db_statements = 0
+        self.redis_seconds = 0.0
+        self.redis_commands = 0
+
+
+# Set by the metrics middleware for the duration of a request; work done
+# outside a request (startup, background sync tasks) is not attributed.
+request_timings: ContextVar[RequestTimings | None] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def record_db(seconds: float) -> None:
+    timings = request_timings.get()
+    if timings is not None:
+        timings.db_seconds += seconds
+        timings.db_statements += 1
+
+
+def record_redis(seconds: float) -> None:
+    timings = request_timings.get()
+    if timings is not None:
+        timings.redis_seconds += seconds
+        timings.redis_commands += 1
+
+
+class RouteMetrics:
+    __slots__ = (
+        "statuses",
+        "latency",
+        "db",
+        "redis",
+        "db_statements",
+        "redis_commands",
+    )
+
+    def __init__(self):
+        self.statuses: dict[int, int] = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.db = Histogram(IO_BUCKETS)
+        self.redis = Histogram(IO_BUCKETS)
+        self.db_statements = 0
+        self.redis_commands = 0
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _format_bound(bound: float) -> str:
+    return repr(float(bound))
+
+
+class RequestMetrics:
+    """Per-process request counts and latency histograms by route template.
+
+    Each worker keeps its own figures; a scrape sees the worker it lands on.
+    """
+
+    def __init__(self):
+        self.routes: dict[tuple[str, str], RouteMetrics] = {}
+
+    def record(
+        self,
+        method: str,
+        route: str,
+        status: int,
+        seconds: float,
+        timings: RequestTimings,
+    ) -> None:
+        metrics = self.routes.get((method, route))
+        if metrics is None:
+            metrics = self.routes[(method, route)] = RouteMetrics()
+        metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+        metrics.latency.observe(seconds)
+        metrics.db.observe(timings.db_seconds)
+        metrics.redis.observe(timings.redis_seconds)
+        metrics.db_statements += timings.db_statements
+        metrics.redis_commands += timings.redis_commands
+
+    def clear(self) -> None:
+        self.routes.clear()
+
+    def render(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        routes = sorted(self.routes.items())
+        labels = {
+            key: f'method="{_escape(key[0])}",route="{_escape(key[1])}"'
+            for key, _ in routes
+        }
+        lines = [
+            "# HELP fundoo_http_requests_total Requests by route and status.",
+            "# TYPE fundoo_http_requests_total counter",
+        ]
+        for key, metrics in routes:
+            for status, count in sorted(metrics.statuses.items()):
+                lines.append(
+                    f'fundoo_http_requests_total{{{labels[key]},status="{status}"}}'
+                    f" {count}"
+                )
+
+        for name, attribute, help_text in (
+            (
+                "fundoo_http_request_duration_seconds",
+                "latency",
+                "Time to the last byte of the response.",
+            ),
+            ("fundoo_db_seconds", "db", "Time in SQL statements per request."),
+            ("fundoo_redis_seconds", "redis", "Time in Redis commands per request."),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for key, metrics in routes:
+                histogram = getattr(metrics, attribute)
+                cumulative = 0
+                for bound, count in zip(histogram.bounds, histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        f'{name}_bucket{{{labels[key]},le="{_format_bound(bound)}"}}'
+                        f" {cumulative}"
+                    )
+                total = cumulative + histogram.counts[-1]
+                lines += [
+                    f'{name}_bucket{{{labels[key]},le="+Inf"}} {total}',
+                    f"{name}_sum{{{labels[key]}}} {histogram.sum}",
+                    f"{name}_count{{{labels[key]}}} {total}",
+                ]
+
+        for name, attribute, help_text in (
+            ("fundoo_db_statements_total", "db_statements", "SQL statements run."),
+            ("fundoo_redis_commands_total", "redis_commands", "Redis commands sent."),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for key, metrics in routes:
+                lines.append(f"{name}{{{labels[key]}}} {getattr(metrics, attribute)}")
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()
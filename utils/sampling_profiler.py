@@ -0,0 +1,164 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from greenlet import getcurrent
+
+WAITING = "[waiting]"
+
+
+class ProfileSession:
+    """Stacks sampled while one request was being served.
+
+    ``anchor`` is a frame of the request's own task; a sample belongs to the
+    request when that frame is on the sampled stack. Samples taken while the
+    task was suspended are counted under ``[waiting]``.
+    """
+
+    def __init__(self, label: str, anchor, thread_id: int, main_greenlet):
+        self.label = label
+        self.anchor = anchor
+        self.thread_id = thread_id
+        self.main_greenlet = main_greenlet
+        self.started = time.perf_counter()
+        self.samples: Counter[tuple[str, ...]] = Counter()
+
+    def add(self, stack: list, labels) -> None:
+        for depth, frame in enumerate(stack):
+            if frame is self.anchor:
+                self.samples[tuple(labels(f) for f in reversed(stack[:depth]))] += 1
+                return
+        self.samples[(WAITING,)] += 1
+
+    def folded(self) -> str:
+        """The samples in the collapsed-stack format read by flamegraph.pl,
+        speedscope and inferno: ``root;caller;callee count`` per line."""
+        root = self.label.replace(";", ":")
+        return "".join(
+            f"{';'.join((root, *stack))} {count}\n"
+            for stack, count in sorted(self.samples.items())
+        )
+
+
+class SamplingProfiler:
+    """Samples the stacks of the threads serving profiled requests.
+
+    One daemon thread per process wakes every ``interval`` seconds while a
+    session is open. Work SQLAlchemy runs synchronously in a greenlet has a
+    stack of its own; it is joined to the stack of the suspended task that
+    started it, so database work shows up under the request that did it.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._sessions: set[ProfileSession] = set()
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._labels: dict = {}
+
+    def start(self, label: str, anchor) -> ProfileSession:
+        session = ProfileSession(label, anchor, threading.get_ident(), getcurrent())
+        with self._lock:
+            self._sessions.add(session)
+            self._active.set()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="sampling-profiler", daemon=True
+                )
+                self._thread.start()
+        return session
+
+    def stop(self, session: ProfileSession) -> None:
+        with self._lock:
+            self._sessions.discard(session)
+            if not self._sessions:
+                self._active.clear()
+
+    def _label(self, frame) -> str:
+        code = frame.f_code
+        label = self._labels.get(code)
+        if label is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            path = os.path.relpath(code.co_filename)
+            if path.startswith(".."):
+                path = os.path.basename(code.co_filename)
+            label = self._labels[code] = f"{name} ({path}:{code.co_firstlineno})"
+        return label
+
+    @staticmethod
+    def _stack(frame, main_greenlet) -> list:
+        stack = []
+        while frame is not None:
+            stack.append(frame)
+            frame = frame.f_back
+        # gr_frame is only set while the greenlet is suspended, i.e. while a
+        # child greenlet runs on its behalf.
+        frame = main_greenlet.gr_frame
+        while frame is not None:
+            stack.append(frame)
+            frame = frame.f_back
+        return stack
+
+    def sample(self) -> None:
+        with self._lock:
+            sessions = list(self._sessions)
+        if not sessions:
+            return
+
+        frames = sys._current_frames()
+        stacks = {}
+        for session in sessions:
+            stack = stacks.get(session.thread_id)
+            if stack is None:
+                stack = stacks[session.thread_id] = self._stack(
+                    frames.get(session.thread_id), session.main_greenlet
+                )
+            session.add(stack, self._label)
+
+    def _run(self) -> None:
+        while True:
+            self._active.wait()
+            time.sleep(self.interval)
+            self.sample()
+
+
+class ProfileStore:
+    """Profiles written to ``directory``, oldest removed beyond ``max_bytes``."""
+
+    SUFFIX = ".folded"
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def save(self, name: str, content: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, name + self.SUFFIX)
+        with open(path, "w") as profile:
+            profile.write(content)
+        self.prune()
+        return path
+
+    def prune(self) -> None:
+        profiles = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.SUFFIX):
+                # Another worker may remove the same files concurrently.
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                profiles.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in profiles)
+        for _, size, path in sorted(profiles):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -0,0 +1,24 @@
+import asyncio
+
+
+class SingleFlight:
+    """Runs one call per key at a time; callers arriving while it runs await
+    the same result instead of starting their own."""
+
+    def __init__(self):
+        self._calls: dict[object, asyncio.Future] = {}
+
+    async def do(self, key, fn):
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = asyncio.ensure_future(fn())
+            call.add_done_callback(lambda done: self._forget(key, done))
+        # A cancelled caller must not cancel the call the others are awaiting.
+        return await asyncio.shield(call)
+
+    def _forget(self, key, call: asyncio.Future) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def __len__(self) -> int:
+        return len(self._calls)